@@ -1,55 +1,155 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_from_directory
+from flask import (Flask, Blueprint, current_app, render_template, request, jsonify, session, redirect,
+                   url_for, send_from_directory, abort, get_template_attribute, stream_with_context)
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager, defer, load_only
+from markupsafe import Markup
 from werkzeug.utils import secure_filename
-import fitz  # PyMuPDF
+from werkzeug.middleware.proxy_fix import ProxyFix
+from previews import PreviewRenderer
+from ocr import OcrQueue, FAILED as OCR_FAILED
+from cache import create_cache, CacheSessionInterface
+from colleges import load_colleges
+from assets import AssetManifest, build_assets
+from responses import FastJSONProvider, compress_response, dumps_json
+from logs import configure_logging, StageTimer
+from transcript import (parse_transcript, parse_transcript_with_stats, parse_transcript_guarded,
+                        validate_withdrawal, WithdrawalHistory, TranscriptTooComplex, TranscriptUnreadable,
+                        ImageOnlyTranscript)
+import click
+import logging
 import os
-import re
+import math
+import time
 import json
 import uuid
-import unicodedata
-from datetime import datetime
-
-app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
 
 # Database config: use DATABASE_URL (PostgreSQL on Railway) or fallback to SQLite
 database_url = os.environ.get('DATABASE_URL', 'sqlite:///withdrawals.db')
 # Railway PostgreSQL uses postgres:// but SQLAlchemy needs postgresql://
 if database_url.startswith('postgres://'):
     database_url = database_url.replace('postgres://', 'postgresql://', 1)
-app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-# Admin password (set via env var in production)
+# Admin password (set via env var in production): ADMIN_PASSWORD_<COLLEGE ID> per
+# college, and ADMIN_PASSWORD for the default college
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'admin123')
 
-# Fixed college name
-COLLEGE_NAME = 'كلية الحاسبات وتقنية المعلومات'
+# Colleges served by this deployment, their majors and rule limits (see colleges.py)
+COLLEGES_FILE = os.environ.get('COLLEGES_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                              'colleges.json'))
+
+db = SQLAlchemy()
 
-db = SQLAlchemy(app)
+logger = logging.getLogger('withdrawals')
+
+bp = Blueprint('main', __name__)
 
 ALLOWED_EXTENSIONS = {'pdf', 'faces'}
 
+# Shared cache and sessions (Redis protocol); unset = per-process memory cache
+REDIS_URL = os.environ.get('REDIS_URL')
+
+# Parsed transcripts are cached by content hash: entries in the memory cache, lifetime in seconds
+PARSE_CACHE_SIZE = 256
+PARSE_CACHE_TTL = 24 * 3600
+
+# Rendered admin fragments (table rows, detail blocks), keyed by request id and
+# version; entries per college, so one college's traffic cannot evict another's
+FRAGMENT_CACHE_SIZE = 2048
+FRAGMENT_CACHE_TTL = 7 * 24 * 3600
+
+# Worker processes for PDF parsing (0 = parse in the request thread); used when the guard is off
+PARSE_WORKERS = int(os.environ.get('PARSE_WORKERS', '0'))
+
+# Guarded parse: each parse runs in its own child process, killed after this
+# many seconds of wall-clock or CPU time (0 = no guard)
+PARSE_TIMEOUT = float(os.environ.get('PARSE_TIMEOUT', '20'))
+
+# Scanned transcripts are read by Tesseract on a background queue: the OCR
+# child's wall-clock limit and CPU niceness, how long results and failures
+# are kept, how long a queued document counts as pending before a poll
+# queues it again, and the poll interval suggested to the browser (seconds).
+# The queue's state must be seen by every worker that answers a poll, so OCR
+# is only on with a shared cache (REDIS_URL); without one scans are refused.
+OCR_TIMEOUT = float(os.environ.get('OCR_TIMEOUT', '180'))
+OCR_NICENESS = 10
+OCR_CACHE_TTL = 7 * 24 * 3600
+OCR_FAILED_TTL = 3600
+OCR_PENDING_TTL = 15 * 60
+OCR_POLL_INTERVAL = 3
+
+# Admission control on the upload endpoints. Counters live in the cache, so
+# they are shared by all workers when REDIS_URL is set.
+# Uploads per client (IP and session each) per minute, and the burst allowed on top
+RATE_LIMIT_PER_MINUTE = float(os.environ.get('RATE_LIMIT_PER_MINUTE', '12'))
+RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', '6'))
+# Transcript parses running at once, how long a request waits for a free slot,
+# and after how long a slot held by a crashed worker is reclaimed (seconds)
+MAX_CONCURRENT_PARSES = int(os.environ.get('MAX_CONCURRENT_PARSES', '4'))
+PARSE_SLOT_WAIT = float(os.environ.get('PARSE_SLOT_WAIT', '5'))
+PARSE_SLOT_LEASE = 120
+# Longest transcript accepted, checked by the parser before text extraction,
+# and the most lines of extracted text the parser will go through
+MAX_TRANSCRIPT_PAGES = int(os.environ.get('MAX_TRANSCRIPT_PAGES', '20'))
+MAX_TRANSCRIPT_LINES = int(os.environ.get('MAX_TRANSCRIPT_LINES', '20000'))
+# Reverse proxies in front of the app (Railway: 1), so rate limits see the client IP
+PROXY_COUNT = int(os.environ.get('PROXY_COUNT', '0'))
+
+# Structured JSON logs on stderr at this level and above
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+
+# Browser cache lifetime for stored PDFs (content-addressed, so never stale)
+DOCUMENT_MAX_AGE = 7 * 24 * 3600
+
+# Admin change feed: how often a stream checks for new events, how long the
+# Flask stream stays open before the browser reconnects (the ASGI stream stays
+# open), keep-alive comment interval, and how long a gap in event ids is
+# waited for (an earlier transaction may still be committing) before it is skipped
+ADMIN_FEED_POLL = 1.0
+ADMIN_FEED_STREAM_SECONDS = 25
+ADMIN_FEED_KEEPALIVE = 15
+ADMIN_FEED_GAP_WAIT = 5
+
+# Rows per page of /admin/api/requests, by default and at most
+ADMIN_PAGE_SIZE = 50
+ADMIN_MAX_PAGE_SIZE = 200
+
 
 # ============ Database Models ============
 
+# Every tenant table carries college_id, and it leads every index on the
+# table: each college's queries read a contiguous index range of their own,
+# the same size as in a single-college install however many colleges share
+# the database.
+
 class Student(db.Model):
     __tablename__ = 'students'
     id = db.Column(db.Integer, primary_key=True)
-    student_id = db.Column(db.String(20), unique=True, nullable=False)
+    college_id = db.Column(db.String(32), nullable=False)
+    student_id = db.Column(db.String(20), nullable=False)
     student_name = db.Column(db.String(200))
-    major = db.Column(db.String(100))  # علوم الحاسب / تقنية المعلومات / هندسة الحاسب
+    major = db.Column(db.String(100))  # one of the college's majors (colleges.json)
     degree = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     requests = db.relationship('WithdrawalRequest', backref='student', lazy=True)
 
+    __table_args__ = (
+        db.Index('uq_college_student', 'college_id', 'student_id', unique=True),
+    )
+
 
 class WithdrawalRequest(db.Model):
     __tablename__ = 'withdrawal_requests'
     id = db.Column(db.Integer, primary_key=True)
+    college_id = db.Column(db.String(32), nullable=False)  # the student's college
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
     course_code = db.Column(db.String(50), nullable=False)
     course_name = db.Column(db.String(200))
@@ -62,14 +162,27 @@ class WithdrawalRequest(db.Model):
     errors = db.Column(db.Text, default='[]')  # JSON list
     warnings = db.Column(db.Text, default='[]')  # JSON list
     rules_checked = db.Column(db.Text, default='[]')  # JSON list of rule check results
-    transcript_file = db.Column(db.String(300))  # stored PDF filename
-    supporting_doc = db.Column(db.String(300))  # stored supporting document filename
+    transcript_file = db.Column(db.String(300))  # SHA-256 of the stored PDF (legacy rows: filename)
+    supporting_doc = db.Column(db.String(300))  # SHA-256 of the supporting document (legacy rows: filename)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-    # Unique constraint: one request per student per course per semester/year
+    # Bumped whenever anything shown in the admin fragments changes (see bump_request_versions)
+    version = db.Column(db.Integer, default=1, server_default='1', nullable=False)
+
+    # Unique index: one request per student per course per semester/year.
+    # Partial unique index: at most one withdrawal per student per semester (rule 7)
+    # among the requests that count (see counts_as_withdrawal).
+    # The dashboard lists a college's requests newest first, pages through
+    # them by id, and counts them by status.
     __table_args__ = (
-        db.UniqueConstraint('student_id', 'course_code', 'semester', 'year',
-                            name='uq_student_course_semester_year'),
+        db.Index('uq_college_student_course_semester_year',
+                 'college_id', 'student_id', 'course_code', 'semester', 'year', unique=True),
+        db.Index('uq_college_student_semester_withdrawal', 'college_id', 'student_id', 'semester', 'year',
+                 unique=True,
+                 sqlite_where=db.text("status = 'approved' OR (status = 'pending' AND eligible)"),
+                 postgresql_where=db.text("status = 'approved' OR (status = 'pending' AND eligible)")),
+        db.Index('ix_withdrawal_requests_college_created', 'college_id', 'created_at'),
+        db.Index('ix_withdrawal_requests_college_id', 'college_id', 'id'),
+        db.Index('ix_withdrawal_requests_college_status', 'college_id', 'status', 'id'),
     )
 
     def get_errors(self):
@@ -91,15 +204,275 @@ class WithdrawalRequest(db.Model):
             return []
 
 
+class StoredFile(db.Model):
+    """Content-addressed upload shared by every request that references it."""
+    __tablename__ = 'stored_files'
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)
+    size = db.Column(db.Integer)
+    ref_count = db.Column(db.Integer, default=0, nullable=False)  # withdrawal requests using this blob
+    # Uploads of this content stored but not yet retained or discarded
+    pending = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class StudentWithdrawalStats(db.Model):
+    """Running count of a student's withdrawals on record (see counts_as_withdrawal)."""
+    __tablename__ = 'student_withdrawal_stats'
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+
+class StudentWithdrawnCourse(db.Model):
+    """Courses a student has a withdrawal on record for."""
+    __tablename__ = 'student_withdrawn_courses'
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), primary_key=True)
+    course_code = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+
+class StudentSemesterWithdrawals(db.Model):
+    """A student's withdrawals on record per semester."""
+    __tablename__ = 'student_semester_withdrawals'
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), primary_key=True)
+    semester = db.Column(db.String(50), primary_key=True)
+    year = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+
+# Per-student withdrawal counts kept in step with withdrawal_requests
+HISTORY_MODELS = (StudentWithdrawalStats, StudentWithdrawnCourse, StudentSemesterWithdrawals)
+
+
+class AdminEvent(db.Model):
+    """Admin change feed: one row per new request or status change, in commit order."""
+    __tablename__ = 'admin_events'
+    id = db.Column(db.Integer, primary_key=True)
+    college_id = db.Column(db.String(32), nullable=False)
+    request_id = db.Column(db.Integer, db.ForeignKey('withdrawal_requests.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # created / status
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
 # ============ Helper Functions ============
 
+def get_colleges():
+    return current_app.extensions['colleges']
+
+
+def student_college():
+    """College of the upload in progress (chosen in step 1), else the default college."""
+    return get_colleges()[session.get('college_id')]
+
+
+def admin_college():
+    """College the admin signed in to (sessions from before colleges existed: the default)."""
+    return get_colleges()[session.get('admin_college')]
+
+
+def admin_password(college):
+    """ADMIN_PASSWORD_<ID> for the college; the default college also accepts ADMIN_PASSWORD."""
+    password = os.environ.get(f'ADMIN_PASSWORD_{college.id.upper()}')
+    if password is None and college is get_colleges().default:
+        password = ADMIN_PASSWORD
+    return password
+
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-def get_or_create_student(student_id_str, student_name, major, degree):
-    """Get existing student or create a new one."""
-    student = Student.query.filter_by(student_id=student_id_str).first()
+def blob_filename(ref):
+    """Map a stored file reference to its filename inside UPLOAD_FOLDER.
+
+    New rows reference the SHA-256 of the content; rows created before
+    deduplication hold the uuid filename itself.
+    """
+    return ref if ref.endswith('.pdf') else f"{ref}.pdf"
+
+
+def ref_digest(ref):
+    """Content identity of a stored file reference (legacy rows use their uuid)."""
+    return ref[:-len('.pdf')] if ref.endswith('.pdf') else ref
+
+
+def blob_path(ref):
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], blob_filename(ref))
+
+
+def store_upload(file):
+    """Save an uploaded file content-addressed by SHA-256 and return the hash.
+
+    Identical uploads share one file on disk and one StoredFile row. The
+    upload counts as pending on the row until retain_blob() or
+    discard_upload(), so a failed submission sharing the content cannot
+    delete it from under this one.
+    """
+    os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
+    hasher = hashlib.sha256()
+    size = 0
+    tmp_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f".{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, 'wb') as out:
+        for chunk in iter(lambda: file.stream.read(64 * 1024), b''):
+            hasher.update(chunk)
+            out.write(chunk)
+            size += len(chunk)
+    digest = hasher.hexdigest()
+
+    # Register before placing the file: a discard_upload() deleting the row
+    # holds its lock until the old file is gone, and ours replaces it after.
+    insert = _UPSERT_INSERTS[db.session.get_bind().dialect.name]
+    db.session.execute(insert(StoredFile).values(
+        sha256=digest, size=size, ref_count=0, pending=1, created_at=datetime.utcnow(),
+    ).on_conflict_do_update(index_elements=['sha256'], set_={'pending': StoredFile.pending + 1}))
+    db.session.commit()
+    os.replace(tmp_path, blob_path(digest))
+    return digest
+
+
+def retain_blob(digest):
+    """Add a reference to a stored file (committed with the caller's transaction).
+
+    Raises FileNotFoundError if the file is gone, so the request is not
+    committed pointing at it.
+    """
+    updated = StoredFile.query.filter_by(sha256=digest).update({
+        StoredFile.ref_count: StoredFile.ref_count + 1,
+        StoredFile.pending: db.case((StoredFile.pending > 0, StoredFile.pending - 1), else_=0),
+    }, synchronize_session=False)
+    if not os.path.exists(blob_path(digest)):
+        raise FileNotFoundError(f"stored file {digest} is missing")
+    if updated != 1:
+        # The row went away without the file; register it again
+        db.session.add(StoredFile(sha256=digest, size=os.path.getsize(blob_path(digest)), ref_count=1))
+
+
+def discard_upload(digest):
+    """Delete a stored file that no withdrawal request or pending upload uses, and its preview."""
+    if digest == session.get('transcript_file'):
+        return  # still awaiting the validate step
+    StoredFile.query.filter(StoredFile.sha256 == digest, StoredFile.pending > 0).update(
+        {StoredFile.pending: StoredFile.pending - 1}, synchronize_session=False)
+    deleted = StoredFile.query.filter_by(sha256=digest, ref_count=0, pending=0).delete(synchronize_session=False)
+    if deleted:
+        current_app.extensions['parse_cache'].delete(digest)
+        current_app.extensions['previews'].delete(digest)
+        # Remove the file before committing: an upload of the same content
+        # waits on the deleted row and puts its copy back afterwards.
+        if os.path.exists(blob_path(digest)):
+            os.remove(blob_path(digest))
+    db.session.commit()
+
+
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def run_parse(filepath, stats=None):
+    """Run the CPU-bound PDF parse under the page and line budgets.
+
+    With PARSE_TIMEOUT set (the default) every parse runs in a child process
+    with CPU and wall-clock limits; otherwise in a worker process when
+    PARSE_WORKERS is set, or in the request thread. Either way the parse is
+    off the GIL of the server process, and the children only import the
+    transcript package, not Flask or the database. Raises TranscriptTooComplex
+    for files over budget. stats receives the parser's page/line counts and timings.
+    """
+    global _parse_pool
+    budgets = {'keep_raw_text': False, 'max_pages': MAX_TRANSCRIPT_PAGES, 'max_lines': MAX_TRANSCRIPT_LINES}
+    if PARSE_TIMEOUT > 0:
+        return parse_transcript_guarded(filepath, timeout=PARSE_TIMEOUT, stats=stats, **budgets)
+    if PARSE_WORKERS <= 0:
+        return parse_transcript(filepath, stats=stats, **budgets)
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # spawn, not fork: the server process is multi-threaded by now
+            _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS,
+                                              mp_context=multiprocessing.get_context('spawn'))
+    transcript, parse_stats = _parse_pool.submit(parse_transcript_with_stats, filepath, **budgets).result()
+    if stats is not None:
+        stats.update(parse_stats)
+    return transcript
+
+
+def run_ocr_parse(filepath, stats=None):
+    """Parse a scanned transcript with OCR, for the background queue.
+
+    Always in a guarded child process, reniced so the OCR yields the CPU to
+    the parses of people waiting on the upload form.
+    """
+    return parse_transcript_guarded(filepath, timeout=OCR_TIMEOUT, stats=stats, ocr=True, niceness=OCR_NICENESS,
+                                    keep_raw_text=False, max_pages=MAX_TRANSCRIPT_PAGES,
+                                    max_lines=MAX_TRANSCRIPT_LINES)
+
+
+class ParseBusy(Exception):
+    """No parse slot became free within PARSE_SLOT_WAIT."""
+
+
+def acquire_parse_slot():
+    """Wait up to PARSE_SLOT_WAIT for one of the MAX_CONCURRENT_PARSES slots."""
+    admission = current_app.extensions['admission']
+    deadline = time.monotonic() + PARSE_SLOT_WAIT
+    while True:
+        token = admission.acquire_slot('parse-slots', MAX_CONCURRENT_PARSES, PARSE_SLOT_LEASE)
+        if token:
+            return token
+        if time.monotonic() >= deadline:
+            raise ParseBusy()
+        time.sleep(0.1)
+
+
+def parse_stored_transcript(ref, timer=None, stats=None):
+    """Parse a stored transcript, reusing the result for repeat uploads of the same content.
+
+    On a cache miss the parse waits for a slot; raises TranscriptTooComplex
+    or ParseBusy when it is not admitted, TranscriptUnreadable
+    (ImageOnlyTranscript for a scan) when it has no text. The PDF is only
+    opened by the parser, so the page limit is checked in the guarded child.
+    timer gets the slot stage; stats gets cached=True/False and,
+    on a miss, the parser's page/line counts and extract/parse times.
+
+    The cache is shared by all workers when REDIS_URL is set, and also holds
+    the results of the OCR queue. Hits are unpickled copies, so callers may
+    annotate them (withdrawn_courses).
+    """
+    timer = timer or StageTimer()
+    stats = {} if stats is None else stats
+    cache = current_app.extensions['parse_cache']
+    transcript = cache.get(ref)
+    stats['cached'] = transcript is not None
+    if transcript is None:
+        path = blob_path(ref)
+        with timer('slot'):
+            token = acquire_parse_slot()
+        try:
+            with timer('parse_total'):
+                transcript = run_parse(path, stats)
+        finally:
+            current_app.extensions['admission'].release_slot('parse-slots', token)
+        cache.set(ref, transcript, ttl=PARSE_CACHE_TTL)
+    return transcript
+
+
+def request_status_payload(req):
+    """Public status fields of a withdrawal request (shared with the ASGI server)."""
+    return {
+        'id': req.id,
+        'course_code': req.course_code,
+        'course_name': req.course_name,
+        'semester': req.semester,
+        'year': req.year,
+        'status': req.status,
+        'eligible': req.eligible,
+        'created_at': req.created_at.isoformat() if req.created_at else None
+    }
+
+
+def get_or_create_student(college_id, student_id_str, student_name, major, degree):
+    """Get the college's existing student or create a new one."""
+    student = Student.query.filter_by(college_id=college_id, student_id=student_id_str).first()
     if student:
         if student_name:
             student.student_name = student_name
@@ -107,9 +480,13 @@ def get_or_create_student(student_id_str, student_name, major, degree):
             student.major = major
         if degree:
             student.degree = degree
+        if db.session.is_modified(student):
+            # The student's name and major appear in the cached fragments of their requests
+            bump_request_versions(WithdrawalRequest.student_id == student.id)
         db.session.commit()
     else:
         student = Student(
+            college_id=college_id,
             student_id=student_id_str,
             student_name=student_name,
             major=major,
@@ -120,16 +497,78 @@ def get_or_create_student(student_id_str, student_name, major, degree):
     return student
 
 
+def counts_as_withdrawal(req):
+    """Whether a request counts toward the student's withdrawal history.
+
+    Must match the condition of the uq_college_student_semester_withdrawal index.
+    """
+    return req.status == 'approved' or (req.status == 'pending' and bool(req.eligible))
+
+
+# INSERT ... ON CONFLICT DO UPDATE for the databases the app runs on
+_UPSERT_INSERTS = {'postgresql': postgresql_insert, 'sqlite': sqlite_insert}
+
+
+def _bump_history_row(model, key, delta):
+    """Add delta to a history counter, creating the row if it is missing.
+
+    One upsert, incremented in SQL: two transactions creating the same row
+    at once both count, instead of the second failing on the primary key.
+    """
+    insert = _UPSERT_INSERTS[db.session.get_bind().dialect.name]
+    db.session.execute(insert(model).values(**key, count=delta).on_conflict_do_update(
+        index_elements=list(key), set_={'count': model.count + delta}))
+
+
+def record_withdrawal_change(req, was_withdrawal):
+    """Keep the withdrawal history tables in step after inserting or updating a request.
+
+    Call within the same transaction as the change to the request.
+    """
+    delta = int(counts_as_withdrawal(req)) - int(was_withdrawal)
+    if not delta:
+        return
+    _bump_history_row(StudentWithdrawalStats, {'student_id': req.student_id}, delta)
+    _bump_history_row(StudentWithdrawnCourse,
+                      {'student_id': req.student_id, 'course_code': req.course_code}, delta)
+    _bump_history_row(StudentSemesterWithdrawals,
+                      {'student_id': req.student_id, 'semester': req.semester or '', 'year': req.year or ''}, delta)
+
+
 def get_db_withdrawal_count(student_db_id):
-    """Count total past withdrawal requests from the database."""
-    return WithdrawalRequest.query.filter_by(
-        student_id=student_db_id
-    ).count()
+    """Withdrawals on record for a student, from the running count."""
+    stats = db.session.get(StudentWithdrawalStats, student_db_id)
+    return stats.count if stats else 0
+
+
+def get_withdrawal_history(student_db_id, semester, year):
+    """Withdrawal history for validation: primary-key lookups only."""
+    courses = db.session.query(StudentWithdrawnCourse.course_code).filter(
+        StudentWithdrawnCourse.student_id == student_db_id,
+        StudentWithdrawnCourse.count > 0
+    ).all()
+    this_semester = db.session.get(StudentSemesterWithdrawals, {
+        'student_id': student_db_id, 'semester': semester or '', 'year': year or ''})
+    return WithdrawalHistory(
+        total=get_db_withdrawal_count(student_db_id),
+        courses=frozenset(code for (code,) in courses),
+        semester_count=this_semester.count if this_semester else 0,
+    )
 
 
-def check_duplicate_request(student_db_id, course_code, semester, year):
+def rebuild_withdrawal_history():
+    """Recompute the history tables from withdrawal_requests (backfill / repair)."""
+    for model in HISTORY_MODELS:
+        db.session.query(model).delete()
+    for req in WithdrawalRequest.query.yield_per(500):
+        record_withdrawal_change(req, was_withdrawal=False)
+    db.session.commit()
+
+
+def check_duplicate_request(college_id, student_db_id, course_code, semester, year):
     """Check if this exact request already exists."""
     return WithdrawalRequest.query.filter_by(
+        college_id=college_id,
         student_id=student_db_id,
         course_code=course_code,
         semester=semester,
@@ -137,561 +576,342 @@ def check_duplicate_request(student_db_id, course_code, semester, year):
     ).first()
 
 
-# ============ Transcript Parsing ============
+def duplicate_request_response(existing, course_code):
+    return jsonify({
+        'error': f'تم تقديم طلب اعتذار لنفس المقرر ({course_code}) في نفس الفصل مسبقاً. رقم الطلب: {existing.id}',
+        'duplicate': True,
+        'request_id': existing.id
+    }), 409
+
+
+def conflicting_request_response(college_id, student_db_id, course_code, semester, year):
+    """409 for an insert rejected by one of the unique indexes on withdrawal_requests."""
+    existing = check_duplicate_request(college_id, student_db_id, course_code, semester, year)
+    if existing:
+        return duplicate_request_response(existing, course_code)
+    other = WithdrawalRequest.query.filter(
+        WithdrawalRequest.college_id == college_id,
+        WithdrawalRequest.student_id == student_db_id,
+        WithdrawalRequest.semester == semester,
+        WithdrawalRequest.year == year
+    ).first()
+    return jsonify({
+        'error': 'يسمح بالانسحاب من مقرر واحد فقط خلال الفصل الدراسي، ويوجد طلب اعتذار آخر في نفس الفصل'
+                 + (f'. رقم الطلب: {other.id}' if other else ''),
+        'request_id': other.id if other else None
+    }), 409
 
-def _clean_name(name):
-    """Clean PDF extraction artifacts from student names."""
-    # Fix doubled words like "بن بن" → "بن"
-    name = re.sub(r'\b(بن|ابن)\s+\1\b', r'\1', name)
-    # Collapse multiple spaces
-    name = re.sub(r'\s{2,}', ' ', name)
-    return name.strip()
 
+def record_admin_event(req, kind):
+    """Add a change-feed event for a request (committed with the caller's transaction)."""
+    db.session.add(AdminEvent(college_id=req.college_id, request_id=req.id, kind=kind, status=req.status))
 
-def parse_transcript(filepath):
-    """Parse a University of Tabuk transcript PDF and extract relevant data.
 
-    Supports both English (column-order, value-before-label) and Arabic transcripts.
+def filter_admin_requests(query, college_id, status_filter='', major_filter='', search=''):
+    """Apply the dashboard filters to a query joined to Student, within one college."""
+    query = query.filter(WithdrawalRequest.college_id == college_id)
+    if status_filter:
+        query = query.filter(WithdrawalRequest.status == status_filter)
+    if major_filter:
+        query = query.filter(Student.major == major_filter)
+    if search:
+        query = query.filter(
+            db.or_(
+                Student.student_id.contains(search),
+                Student.student_name.contains(search),
+                WithdrawalRequest.course_code.contains(search)
+            )
+        )
+    return query
+
+
+def admin_list_query():
+    """Requests joined to their students, loading only the columns the dashboard table shows.
+
+    The rule results, errors, warnings and reason text stay unloaded (they
+    load on access, e.g. on the detail page).
     """
-    doc = fitz.open(filepath)
-    full_text = ""
-    for page in doc:
-        full_text += page.get_text() + "\n"
-    doc.close()
-
-    # Normalize Arabic Presentation Forms (U+FE70-U+FEFF) to standard Arabic
-    full_text = unicodedata.normalize('NFKC', full_text)
-
-    data = {
-        'student_name': '',
-        'student_id': '',
-        'college': '',
-        'department': '',
-        'degree': '',
-        'gpa': 0.0,
-        'total_credits_completed': 0,
-        'total_credits_plan': 0,
-        'remaining_credits': 0,
-        'current_semester_courses': [],
-        'withdrawal_count': 0,
-        'withdrawn_courses': [],
-        'semesters_count': 0,
-        'is_first_year': False,
-        'expected_graduate': False,
-        'all_courses': [],
-        'raw_text': full_text
+    return (WithdrawalRequest.query.join(Student)
+            .options(load_only(WithdrawalRequest.id, WithdrawalRequest.course_code, WithdrawalRequest.course_name,
+                               WithdrawalRequest.semester, WithdrawalRequest.year, WithdrawalRequest.reason_type,
+                               WithdrawalRequest.status, WithdrawalRequest.eligible, WithdrawalRequest.created_at,
+                               WithdrawalRequest.version),
+                     contains_eager(WithdrawalRequest.student)
+                     .load_only(Student.student_id, Student.student_name, Student.major)))
+
+
+# Columns of /admin/api/requests rows, in order
+ADMIN_API_COLUMNS = (
+    ('id', WithdrawalRequest.id),
+    ('student_id', Student.student_id),
+    ('student_name', Student.student_name),
+    ('major', Student.major),
+    ('course_code', WithdrawalRequest.course_code),
+    ('course_name', WithdrawalRequest.course_name),
+    ('semester', WithdrawalRequest.semester),
+    ('year', WithdrawalRequest.year),
+    ('reason_type', WithdrawalRequest.reason_type),
+    ('eligible', WithdrawalRequest.eligible),
+    ('status', WithdrawalRequest.status),
+    ('created_at', WithdrawalRequest.created_at),
+)
+
+
+def admin_stats(college_id):
+    """A college's request counts per status, in one grouped query."""
+    counts = dict(db.session.query(WithdrawalRequest.status, db.func.count(WithdrawalRequest.id))
+                  .filter(WithdrawalRequest.college_id == college_id)
+                  .group_by(WithdrawalRequest.status).all())
+    return {
+        'total': sum(counts.values()),
+        'pending': counts.get('pending', 0),
+        'approved': counts.get('approved', 0),
+        'rejected': counts.get('rejected', 0)
     }
 
-    lines = full_text.split('\n')
-    lines = [l.strip() for l in lines if l.strip()]
-
-    for i, line in enumerate(lines):
-        # ── English format: value appears on the line BEFORE its label ──
-        # "Student Id :" / "Student Name :" / "Faculty :" / "Major  :" labels
-        if re.match(r'^Student\s+Id\s*:', line) and i > 0:
-            m = re.match(r'^\d{7,10}$', lines[i - 1])
-            if m and not data['student_id']:
-                data['student_id'] = lines[i - 1]
-
-        if re.match(r'^Student\s+Name\s*:', line) and i > 0:
-            name_val = lines[i - 1]
-            # Accept alphabetic names (English or Arabic)
-            if name_val and re.match(r'^[A-Za-z\u0600-\u06FF\s]+$', name_val) and not data['student_name']:
-                data['student_name'] = name_val.strip()
-
-        if re.match(r'^Faculty\s*:', line) and i > 0:
-            fac = lines[i - 1]
-            # Must look like a faculty name, not another label
-            if fac and ':' not in fac and not data['college']:
-                data['college'] = fac.strip()
-
-        # English "Major :" — two layout variants:
-        #   variant A (page 1): value on previous line, then "Major  :"
-        #   variant B (page 2): "Major :" on one line, value on next line
-        if re.match(r'^Major\s*:', line):
-            # variant A
-            if i > 0 and not data['department']:
-                prev = lines[i - 1]
-                if prev and ':' not in prev and not re.match(r'^Major', prev) and len(prev) > 2:
-                    data['department'] = prev.strip()
-            # variant B
-            if not data['department'] and i + 1 < len(lines):
-                nxt = lines[i + 1]
-                if nxt and ':' not in nxt and not re.match(r'^Major', nxt) and len(nxt) > 2:
-                    data['department'] = nxt.strip()
-
-        # English degree: "Degree : Bachelor" on same line
-        if re.search(r'Degree\s*:\s*Bachelor', line, re.IGNORECASE):
-            data['degree'] = 'بكالوريوس'
-        elif re.search(r'Degree\s*:\s*Diploma', line, re.IGNORECASE):
-            data['degree'] = 'دبلوم'
-
-        # ── Arabic format ──
-        if ('الاسم' in line and ':' in line) or 'اسم الطالب' in line:
-            name_match = re.search(r'(?:الاسم|اسم الطالب|اسم الطالبة)\s*:\s*(.+)', line)
-            if name_match:
-                name_val = name_match.group(1).strip()
-                if name_val and name_val != 'الاسم' and not data['student_name']:
-                    data['student_name'] = _clean_name(name_val)
-            else:
-                name_match2 = re.search(r'^(.+?):\s*(?:الاسم|اسم الطالب)', line)
-                if name_match2 and not data['student_name']:
-                    data['student_name'] = _clean_name(name_match2.group(1).strip())
-
-        if 'الرقم' in line and ('الأكاديمي' in line or 'الجامعي' in line or 'الطالب' in line or 'رقم' in line):
-            id_match = re.search(r'(\d{7,10})', line)
-            if id_match and not data['student_id']:
-                data['student_id'] = id_match.group(1)
-            elif i + 1 < len(lines) and not data['student_id']:
-                id_match = re.search(r'(\d{7,10})', lines[i + 1])
-                if id_match:
-                    data['student_id'] = id_match.group(1)
-
-        if 'الكلية' in line and ':' in line:
-            college_match = re.search(r'الكلية\s*:\s*(.+)', line)
-            if college_match and not data['college']:
-                data['college'] = college_match.group(1).strip()
-
-        if 'التخصص' in line and ':' in line:
-            dept_match = re.search(r'التخصص\s*:\s*(.+)', line)
-            if dept_match and not data['department']:
-                dept_val = dept_match.group(1).strip()
-                dept_val = re.sub(r'\d{7,}.*', '', dept_val).strip()
-                if dept_val and dept_val != 'التخصص':
-                    data['department'] = dept_val
-
-        if 'المعدل التراكمي' in line or 'التراكمي' in line:
-            gpa_match = re.search(r'(\d+\.\d+)', line)
-            if gpa_match:
-                data['gpa'] = float(gpa_match.group(1))
-
-        if 'بكالوريوس' in line or 'البكالوريوس' in line:
-            data['degree'] = 'بكالوريوس'
-        elif 'دبلوم متوسط' in line:
-            data['degree'] = 'دبلوم متوسط'
-        elif 'دبلوم مشارك' in line:
-            data['degree'] = 'دبلوم مشارك'
-
-    # ── Fallback student ID: scan first 30 lines for a 9-digit number ──
-    if not data['student_id']:
-        for line in lines[:30]:
-            m = re.search(r'\b(\d{9})\b', line)
-            if m:
-                data['student_id'] = m.group(1)
-                break
 
-    # ── Withdrawal count ──
-    # English: standalone 'W' or 'WF' grade line
-    for line in lines:
-        if line in ('W', 'WF'):
-            data['withdrawal_count'] += 1
-    # Arabic: standalone 'ع' grade line
-    for line in lines:
-        if line == 'ع':
-            data['withdrawal_count'] += 1
-    # Arabic inline (older format): ع inside a line that has a course code
-    withdrawal_pattern = re.compile(r'\bع\b')
-    for line in lines:
-        if withdrawal_pattern.search(line) and line != 'ع':
-            if any(char.isdigit() for char in line) and re.search(r'[A-Z]', line):
-                data['withdrawal_count'] += 1
-                data['withdrawn_courses'].append(line.strip())
-
-    # ── Credits info (Arabic format) ──
-    for line in lines:
-        credits_match = re.search(r'(?:مجموع الساعات|إجمالي الساعات|ساعات الخطة)[:\s]*(\d+)', line)
-        if credits_match:
-            data['total_credits_plan'] = int(credits_match.group(1))
-
-        completed_match = re.search(r'(?:الساعات المكتسبة|الساعات المجتازة|مكتسبة)[:\s]*(\d+)', line)
-        if completed_match:
-            data['total_credits_completed'] = int(completed_match.group(1))
-
-        remaining_match = re.search(r'(?:الساعات المتبقية)[:\s]*(\d+)', line)
-        if remaining_match:
-            data['remaining_credits'] = int(remaining_match.group(1))
-
-    # ── Credits completed (English: last AHRS value before AHRS label) ──
-    if data['total_credits_completed'] == 0:
-        ahrs_indices = [i for i, l in enumerate(lines) if l == 'AHRS']
-        if ahrs_indices:
-            # Values appear before labels; collect decimals just before first AHRS label
-            first_ahrs = ahrs_indices[0]
-            candidates = []
-            for j in range(max(0, first_ahrs - 20), first_ahrs):
-                m = re.match(r'^(\d{1,3}\.\d{2})$', lines[j])
-                if m:
-                    val = float(m.group(1))
-                    if 5 < val < 300:
-                        candidates.append(val)
-            if candidates:
-                data['total_credits_completed'] = int(candidates[-1])
-
-    # ── Semester count ──
-    # English: "First Semester 2023/2024", "Second Semester 2023/2024", etc.
-    en_sem_pat = re.compile(r'(?:First|Second|Summer)\s+Semester\s+\d{4}/\d{4}', re.IGNORECASE)
-    en_semesters = set(m.group(0).lower() for m in en_sem_pat.finditer(full_text))
-
-    # Arabic: "هـ1445 الفصل الأول"
-    ar_sem_pat = re.compile(r'هـ\d{4}(?:/\d{4})?\s+الفصل\s+(?:الأول|الثاني|الصيفي)')
-    ar_semesters = set(ar_sem_pat.findall(full_text))
-
-    all_semesters = en_semesters | ar_semesters
-    data['semesters_count'] = len(all_semesters)
-
-    # Fallback: count generic Arabic semester terms
-    if data['semesters_count'] == 0:
-        fallback_pattern = re.compile(r'(?:الفصل الأول|الفصل الثاني|الفصل الصيفي)')
-        data['semesters_count'] = len(set(fallback_pattern.findall(full_text)))
-
-    # ── First year check ──
-    if data['semesters_count'] <= 2:
-        data['is_first_year'] = True
-    if data['student_id'] and len(data['student_id']) >= 3:
-        try:
-            admission_year = int(data['student_id'][:2])
-            current_year = 47  # 1447 Hijri
-            if current_year - admission_year <= 1:
-                data['is_first_year'] = True
-        except ValueError:
-            pass
-
-    # ── Expected graduate check ──
-    if data['remaining_credits'] > 0 and data['remaining_credits'] <= 18:
-        data['expected_graduate'] = True
-
-    # ── GPA extraction ──
-    # Arabic fallback: standalone decimals after تراكمي label
-    if data['gpa'] == 0.0:
-        gpa_candidates = []
-        in_cumulative = False
-        for line in lines:
-            if 'تراكمي' in line or line == 'Cumulative':
-                in_cumulative = True
-            if in_cumulative:
-                gpa_match = re.match(r'^(\d+\.\d{2})$', line)
-                if gpa_match:
-                    val = float(gpa_match.group(1))
-                    if 0 < val <= 5.0:
-                        gpa_candidates.append(val)
-        if gpa_candidates:
-            data['gpa'] = gpa_candidates[-1]
-
-    # English fallback: all standalone X.XX decimals between 0.5 and 5.0
-    # (marks are > 5, credit counts are integers or > 5 as floats)
-    if data['gpa'] == 0.0:
-        gpa_candidates = []
-        for line in lines:
-            m = re.match(r'^(\d\.\d{2})$', line)
-            if m:
-                val = float(m.group(1))
-                if 0.5 <= val <= 5.0:
-                    gpa_candidates.append(val)
-        non_zero = [v for v in gpa_candidates if v > 0]
-        if non_zero:
-            data['gpa'] = non_zero[-1]
-
-    if not data['degree']:
-        data['degree'] = 'بكالوريوس'
-
-    return data
-
-
-def extract_courses(lines):
-    """Extract structured course list from NFKC-normalized transcript lines.
-
-    Returns list of {code, name, grade, current} dicts.
-    Course codes, grades, and names appear in separate blocks but same order.
-    Courses without grades are current semester (actively enrolled).
-    Supports both English grades (A+, B, C, W…) and Arabic grades (أ, ب, ع…).
-    """
-    code_pat = re.compile(r'^[A-Z]{2,5}\s+\d{3,4}$')
-    # English grades: A+ A B+ B C+ C D E W WF IP
-    # Arabic grades:  أ ب ج د هـ ع  (with optional leading +)
-    grade_pat = re.compile(r'^([A-E][+-]?|W[F]?|IP|\+?[أبجد]|هـ|ع)$')
-
-    # Collect all course codes and grades globally (in document order)
-    codes = []
-    grades = []
-    for line in lines:
-        if code_pat.match(line):
-            codes.append(line)
-        elif grade_pat.match(line):
-            grades.append(line)
-
-    if not codes:
-        return []
-
-    # Find course names using positional structure per page-section.
-    # Each page has: codes block → grades block → names block → numbers block
-    code_indices = [i for i, l in enumerate(lines) if code_pat.match(l)]
-
-    # Group code indices into sections (pages) separated by large line gaps
-    sections = []
-    sec = [code_indices[0]]
-    for j in range(1, len(code_indices)):
-        if code_indices[j] - code_indices[j - 1] > 10:
-            sections.append(sec)
-            sec = [code_indices[j]]
-        else:
-            sec.append(code_indices[j])
-    sections.append(sec)
-
-    all_names = []
-
-    for section in sections:
-        n_codes = len(section)
-        last_code_idx = section[-1]
-
-        # Find contiguous grade block right after codes
-        grade_end = last_code_idx
-        in_grades = False
-        for k in range(last_code_idx + 1, min(last_code_idx + n_codes + 10, len(lines))):
-            if grade_pat.match(lines[k]):
-                in_grades = True
-                grade_end = k
-            elif in_grades:
-                break
+def cache_stats(college_id):
+    """Hit/miss counts of this process's cache lookups, by cache; the college's fragments only."""
+    caches = {
+        'parse': current_app.extensions['parse_cache'],
+        'fragments': current_app.extensions['fragment_cache'][college_id],
+    }
+    if current_app.extensions['ocr'] is not None:
+        caches['ocr'] = current_app.extensions['ocr'].state
+    if isinstance(current_app.session_interface, CacheSessionInterface):
+        caches['session'] = current_app.session_interface.cache
+    return {name: cache.stats.as_dict() for name, cache in caches.items()}
 
-        # Names start right after the grade block
-        name_start = grade_end + 1
-        names = []
-        for k in range(name_start, len(lines)):
-            if len(names) >= n_codes:
-                break
-            line = lines[k]
-            if re.match(r'^\d+$', line):
-                break  # hit credit-hours block
-            # Accept Arabic course names, English course names (> 3 chars, starts with letter),
-            # or parenthesised annotations
-            if re.search(r'[\u0600-\u06FF]', line) or line.startswith('('):
-                names.append(line)
-            elif re.match(r'^[A-Za-z]', line) and len(line) > 3:
-                names.append(line)
-
-        all_names.extend(names)
-
-    # Build final course list
-    courses = []
-    for i in range(len(codes)):
-        courses.append({
-            'code': codes[i],
-            'name': all_names[i] if i < len(all_names) else '',
-            'grade': grades[i] if i < len(grades) else '',
-            'current': i >= len(grades)
+
+def latest_admin_event_id():
+    return db.session.query(db.func.max(AdminEvent.id)).scalar() or 0
+
+
+def admin_request_payload(req, detail=False):
+    """Dashboard fields of a request; detail adds the rule results, errors and warnings."""
+    payload = request_status_payload(req)
+    payload.update({
+        'student_id': req.student.student_id,
+        'student_name': req.student.student_name,
+        'major': req.student.major,
+        'reason_type': req.reason_type,
+    })
+    if detail:
+        payload.update({
+            'reason': req.reason,
+            'degree': req.student.degree,
+            'rules_checked': req.get_rules_checked(),
+            'errors': req.get_errors(),
+            'warnings': req.get_warnings(),
         })
+    return payload
 
-    return courses
 
+def bump_request_versions(*criteria):
+    """Invalidate the cached fragments of the matching requests (in the caller's transaction)."""
+    WithdrawalRequest.query.filter(*criteria).update(
+        {WithdrawalRequest.version: WithdrawalRequest.version + 1}, synchronize_session=False)
 
-def detect_current_semester(lines):
-    """Detect the current (latest) semester and year from transcript lines.
 
-    Returns (semester_type_arabic, year_string) e.g. ('الثاني', '2025/2026').
-    Supports both English ("Second Semester 2025/2026") and Arabic ("هـ1447 الفصل الثاني").
-    """
-    # Arabic format
-    ar_pat = re.compile(r'هـ(\d{4}(?:/\d{4})?)\s+الفصل\s+(الأول|الثاني|الصيفي)')
-    # English format
-    en_pat = re.compile(r'(First|Second|Summer)\s+Semester\s+(\d{4}/\d{4})', re.IGNORECASE)
-
-    last_ar = None
-    last_en = None
-    for line in lines:
-        m = ar_pat.search(line)
-        if m:
-            last_ar = m
-        m = en_pat.search(line)
-        if m:
-            last_en = m
-
-    if last_en:
-        sem_en = last_en.group(1).lower()
-        ar_map = {'first': 'الأول', 'second': 'الثاني', 'summer': 'الصيفي'}
-        sem_ar = ar_map.get(sem_en, sem_en)
-        return sem_ar, last_en.group(2)
-
-    if last_ar:
-        return last_ar.group(2), last_ar.group(1)
-
-    return '', ''
-
-
-# ============ Validation Logic ============
-
-def validate_withdrawal(transcript_data, course_code, course_name, semester, year, reason):
-    """Validate the course withdrawal request against university rules."""
-    errors = []
-    warnings = []
-    rules_checked = []
-
-    degree = transcript_data.get('degree', 'بكالوريوس')
-    withdrawal_count = transcript_data.get('withdrawal_count', 0)
-    is_first_year = transcript_data.get('is_first_year', False)
-    expected_graduate = transcript_data.get('expected_graduate', False)
-    remaining_credits = transcript_data.get('remaining_credits', 0)
-
-    # Rule 1: Max withdrawal limits based on degree
-    if degree == 'بكالوريوس':
-        max_withdrawals = 6
-        rules_checked.append({
-            'rule': f'الحد الأقصى للاعتذار عن مقررات (بكالوريوس - نظام فصلي): {max_withdrawals} مقررات',
-            'status': 'pass' if withdrawal_count < max_withdrawals else 'fail',
-            'detail': f'عدد مرات الاعتذار السابقة: {withdrawal_count} من أصل {max_withdrawals}'
-        })
-        if withdrawal_count >= max_withdrawals:
-            errors.append(f'تجاوزت الحد الأقصى للاعتذار عن المقررات ({max_withdrawals} مقررات للبكالوريوس). عدد مرات الاعتذار السابقة: {withdrawal_count}')
-
-    elif degree == 'دبلوم متوسط':
-        max_withdrawals = 3
-        rules_checked.append({
-            'rule': f'الحد الأقصى للاعتذار عن مقررات (دبلوم متوسط): {max_withdrawals} مقررات',
-            'status': 'pass' if withdrawal_count < max_withdrawals else 'fail',
-            'detail': f'عدد مرات الاعتذار السابقة: {withdrawal_count} من أصل {max_withdrawals}'
-        })
-        if withdrawal_count >= max_withdrawals:
-            errors.append(f'تجاوزت الحد الأقصى للاعتذار عن المقررات ({max_withdrawals} مقررات للدبلوم المتوسط). عدد مرات الاعتذار السابقة: {withdrawal_count}')
-
-    elif degree == 'دبلوم مشارك':
-        max_withdrawals = 2
-        rules_checked.append({
-            'rule': f'الحد الأقصى للاعتذار عن مقررات (دبلوم مشارك): {max_withdrawals} مقررات',
-            'status': 'pass' if withdrawal_count < max_withdrawals else 'fail',
-            'detail': f'عدد مرات الاعتذار السابقة: {withdrawal_count} من أصل {max_withdrawals}'
-        })
-        if withdrawal_count >= max_withdrawals:
-            errors.append(f'تجاوزت الحد الأقصى للاعتذار عن المقررات ({max_withdrawals} مقررات للدبلوم المشارك). عدد مرات الاعتذار السابقة: {withdrawal_count}')
-
-    # Rule 2: Cannot be from first year courses
-    if is_first_year:
-        rules_checked.append({
-            'rule': 'ألا يكون المقرر من مقررات السنة الدراسية الأولى',
-            'status': 'fail',
-            'detail': 'الطالب في السنة الأولى - لا يسمح بالاعتذار عن مقررات السنة الأولى'
-        })
-        errors.append('لا يسمح بالاعتذار عن مقررات السنة الدراسية الأولى')
-    else:
-        rules_checked.append({
-            'rule': 'ألا يكون المقرر من مقررات السنة الدراسية الأولى',
-            'status': 'pass',
-            'detail': 'الطالب ليس في السنة الأولى'
-        })
+def cached_fragments(college_id, name, reqs, render):
+    """Rendered fragments for the college's requests, from its fragment cache where possible.
 
-    # Rule 3: Expected graduates cannot withdraw
-    if expected_graduate:
-        rules_checked.append({
-            'rule': 'لا يسمح للطالب المتوقع تخرجه الانسحاب من أي مقرر',
-            'status': 'fail',
-            'detail': f'الطالب متوقع تخرجه (الساعات المتبقية: {remaining_credits})'
-        })
-        errors.append('لا يسمح للطالب المتوقع تخرجه بالاعتذار عن أي مقرر مسجل في الفصل الدراسي')
-    else:
-        rules_checked.append({
-            'rule': 'لا يسمح للطالب المتوقع تخرجه الانسحاب من أي مقرر',
-            'status': 'pass',
-            'detail': 'الطالب غير متوقع تخرجه'
-        })
+    Keys are name:id:version, so a bumped version is a miss and entries for
+    old versions simply expire. One cache round trip for all requests.
+    """
+    cache = current_app.extensions['fragment_cache'][get_colleges()[college_id].id]
+    keys = [f'{name}:{req.id}:{req.version}' for req in reqs]
+    found = cache.get_many(keys)
+    fragments = []
+    for key, req in zip(keys, reqs):
+        html = found.get(key)
+        if html is None:
+            html = str(render(req))
+            cache.set(key, html, ttl=FRAGMENT_CACHE_TTL)
+        fragments.append(Markup(html))
+    return fragments
 
-    # Rule 4: Check if course was previously withdrawn
-    withdrawn_courses = transcript_data.get('withdrawn_courses', [])
-    previously_withdrawn = False
-    if course_code:
-        for wc in withdrawn_courses:
-            if course_code in wc:
-                previously_withdrawn = True
-                break
 
-    if previously_withdrawn:
-        rules_checked.append({
-            'rule': 'ألا يكون المقرر قد سبق الانسحاب منه سابقاً',
-            'status': 'fail',
-            'detail': f'المقرر {course_code} تم الاعتذار عنه مسبقاً'
-        })
-        errors.append(f'المقرر {course_code} سبق الاعتذار عنه سابقاً')
-    else:
-        rules_checked.append({
-            'rule': 'ألا يكون المقرر قد سبق الانسحاب منه سابقاً',
-            'status': 'pass',
-            'detail': 'لم يتم الاعتذار عن هذا المقرر مسبقاً'
-        })
+def fragment_macro(name):
+    return get_template_attribute('admin_fragments.html', name)
 
-    # Rule 5: Summer semester check
-    if semester and 'صيفي' in semester:
-        rules_checked.append({
-            'rule': 'ألا يكون المقرر مسجلاً في الفصل الصيفي',
-            'status': 'fail',
-            'detail': 'لا يسمح بالاعتذار عن مقررات الفصل الصيفي'
-        })
-        errors.append('لا يسمح بالاعتذار عن مقرر مسجل في الفصل الصيفي')
-    else:
-        rules_checked.append({
-            'rule': 'ألا يكون المقرر مسجلاً في الفصل الصيفي',
-            'status': 'pass',
-            'detail': 'المقرر ليس في الفصل الصيفي'
-        })
 
-    # Rule 6: Remaining time must be sufficient
-    rules_checked.append({
-        'rule': 'أن تكون المدة النظامية المتبقية كافية لإنهاء متطلبات التخرج',
-        'status': 'warning',
-        'detail': 'يرجى التأكد من أن المدة النظامية المتبقية كافية لإنهاء متطلبات التخرج'
-    })
-    warnings.append('يرجى التأكد من أن المدة النظامية المتبقية كافية لإنهاء متطلبات التخرج')
+def render_request_rows(college_id, reqs):
+    """Dashboard table rows of the college's requests (templates/admin_fragments.html)."""
+    return cached_fragments(college_id, 'row', reqs, fragment_macro('request_row'))
 
-    # Rule 7: Only 1 course per semester
-    rules_checked.append({
-        'rule': 'يسمح بالانسحاب من مقرر واحد فقط خلال الفصل الدراسي',
-        'status': 'warning',
-        'detail': 'تأكد من عدم تقديم طلب اعتذار آخر في نفس الفصل'
-    })
 
-    # Rule 8: Must not be only registered course
-    rules_checked.append({
-        'rule': 'ألا يكون المقرر الوحيد المسجل للطالب',
-        'status': 'warning',
-        'detail': 'تأكد من وجود مقررات أخرى مسجلة في الفصل الدراسي'
-    })
+def render_request_row(req):
+    return render_request_rows(req.college_id, [req])[0]
 
-    # Rule 9: Co-requisite check
-    rules_checked.append({
-        'rule': 'ألا يكون المقرر متزامناً مع مقرر آخر',
-        'status': 'warning',
-        'detail': 'تأكد من أن المقرر ليس متطلباً متزامناً مع مقرر آخر مسجل'
-    })
 
-    is_eligible = len(errors) == 0
+def load_admin_feed(college_id, after, filters):
+    """The college's events after the cursor, each with the request's current row, plus the new cursor.
 
+    Ids are handed out before commit, so a gap may be a transaction that is
+    still committing: events stop at a gap until it is ADMIN_FEED_GAP_WAIT
+    old (then it was rolled back). The ids are shared by all colleges, so
+    the gap check reads every college's events after the cursor (a
+    primary-key range); only this college's are kept. visible says whether
+    the row matches the dashboard filters. Needs a request context to
+    render rows.
+    """
+    rows = AdminEvent.query.filter(AdminEvent.id > after).order_by(AdminEvent.id).limit(100).all()
+    settled = datetime.utcnow() - timedelta(seconds=ADMIN_FEED_GAP_WAIT)
+    events = []
+    for row in rows:
+        if row.id != after + 1 and row.created_at > settled:
+            break
+        if row.college_id == college_id:
+            events.append(row)
+        after = row.id
+    if not events:
+        return [], after
+
+    ids = {e.request_id for e in events}
+    requests_by_id = {r.id: r for r in admin_list_query().filter(WithdrawalRequest.college_id == college_id,
+                                                                 WithdrawalRequest.id.in_(ids))}
+    visible = {r_id for (r_id,) in filter_admin_requests(
+        db.session.query(WithdrawalRequest.id).join(Student).filter(WithdrawalRequest.id.in_(ids)),
+        college_id, **filters)}
+    changed = [requests_by_id[r_id] for r_id in ids if r_id in requests_by_id]
+    rows = dict(zip((req.id for req in changed), render_request_rows(college_id, changed)))
+    feed = []
+    for event in events:
+        req = requests_by_id.get(event.request_id)
+        if req is None:
+            continue
+        feed.append({
+            'id': event.id,
+            'kind': event.kind,
+            'request': admin_request_payload(req),
+            'visible': req.id in visible,
+            'html': rows[req.id],
+        })
+    return feed, after
+
+
+def sse_message(event, data, event_id=None):
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append('data: ' + dumps_json(data))
+    return '\n'.join(lines) + '\n\n'
+
+
+def admin_feed_messages(college_id, after, filters):
+    """SSE messages for the college's events after the cursor and the stats that follow them."""
+    feed, after = load_admin_feed(college_id, after, filters)
+    messages = [sse_message('change', event, event['id']) for event in feed]
+    if feed:
+        messages.append(sse_message('stats', admin_stats(college_id), after))
+    # End the read transaction so a long-lived stream does not hold one open
+    db.session.rollback()
+    return messages, after
+
+
+def admin_feed_args(args, last_event_id=None):
+    """Cursor (Last-Event-ID on reconnect, else ?after=) and dashboard filters of a feed request."""
+    cursor = last_event_id or args.get('after') or '0'
+    filters = {'status_filter': args.get('status', ''), 'major_filter': args.get('major', ''),
+               'search': args.get('search', '')}
+    return (int(cursor) if cursor.isdigit() else 0), filters
+
+
+def log_fields(**fields):
+    """Extra fields for a log record: the upload's trace id and the endpoint, plus fields."""
+    return dict(trace_id=session.get('trace_id'), endpoint=request.endpoint, **fields)
+
+
+def check_rate_limit():
+    """Take an upload token for this client; returns the seconds to wait, 0 if admitted."""
+    buckets = current_app.extensions['admission']
+    if 'client_id' not in session:
+        session['client_id'] = uuid.uuid4().hex
+    rate = RATE_LIMIT_PER_MINUTE / 60
+    wait = max(buckets.take_token(f'ip:{request.remote_addr}', rate, RATE_LIMIT_BURST),
+               buckets.take_token(f"session:{session['client_id']}", rate, RATE_LIMIT_BURST))
+    if wait:
+        logger.warning('upload rate limited', extra=log_fields(event='request.throttled', retry_after=round(wait, 1)))
+    return wait
+
+
+def too_many_requests(message, retry_after):
+    retry_after = max(1, math.ceil(retry_after))
+    response = jsonify({'error': message, 'retry_after': retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def parse_rejected_response(e, fields):
+    """Response for a transcript the parser did not admit (ParseBusy / TranscriptTooComplex / TranscriptUnreadable)."""
+    logger.warning('transcript not admitted: %s', str(e) or 'no parse slot free', extra=log_fields(
+        event='transcript.rejected', exc_type=type(e).__name__, **fields))
+    if isinstance(e, TranscriptTooComplex):
+        return jsonify({'error': f'السجل الأكاديمي كبير أو معقد جداً ويتعذر تحليله. '
+                                 f'الحد الأقصى {MAX_TRANSCRIPT_PAGES} صفحة'}), 413
+    if isinstance(e, TranscriptUnreadable):
+        return jsonify({'error': 'تعذرت قراءة نص السجل الأكاديمي. '
+                                 'يرجى رفع السجل بصيغة PDF كما يصدر من النظام الأكاديمي'}), 422
+    return too_many_requests('الخادم مشغول بتحليل ملفات أخرى. يرجى المحاولة بعد قليل', PARSE_SLOT_WAIT)
+
+
+def queue_ocr(ref, fields):
+    """Send a scanned transcript to the OCR queue; returns the queue's status for it."""
+    status = current_app.extensions['ocr'].submit(ref, blob_path(ref))
+    logger.info('scanned transcript sent to OCR', extra=log_fields(
+        event='transcript.ocr_queued', transcript=ref[:12], ocr_status=status, **fields))
+    return status
+
+
+def ocr_pending_response(ref):
+    """202 pointing the browser at the status URL to poll while OCR runs."""
+    poll_url = url_for('main.parse_transcript_status', ref=ref)
+    response = jsonify({'status': 'processing', 'poll': poll_url, 'retry_after': OCR_POLL_INTERVAL,
+                        'message': 'السجل ممسوح ضوئياً، جاري قراءته...'})
+    response.status_code = 202
+    response.headers['Location'] = poll_url
+    response.headers['Retry-After'] = str(OCR_POLL_INTERVAL)
+    response.cache_control.no_store = True
+    return response
+
+
+def transcript_payload(transcript, college):
+    """Student fields and current-semester courses shown in step 2 of the form."""
     return {
-        'eligible': is_eligible,
-        'errors': errors,
-        'warnings': warnings,
-        'rules_checked': rules_checked,
-        'transcript_data': {
-            'student_name': transcript_data.get('student_name', ''),
-            'student_id': transcript_data.get('student_id', ''),
-            'major': transcript_data.get('major', ''),
-            'department': transcript_data.get('department', ''),
-            'degree': transcript_data.get('degree', ''),
-            'gpa': transcript_data.get('gpa', 0),
-            'withdrawal_count': withdrawal_count,
-            'remaining_credits': remaining_credits,
-            'is_first_year': is_first_year,
-            'expected_graduate': expected_graduate
-        }
+        'student': {
+            'name': transcript.student_name,
+            'id': transcript.student_id,
+            'college': transcript.college or college.name,
+            'department': transcript.department,
+            'degree': transcript.degree,
+            'gpa': transcript.gpa,
+        },
+        # Only current-semester courses (no grade = currently enrolled)
+        'courses': [c.to_dict() for c in transcript.courses if c.current],
+        'current_semester': transcript.semester,
+        'current_year': transcript.year,
     }
 
 
 # ============ Routes ============
 
-@app.route('/')
+@bp.route('/')
 def index():
-    return render_template('index.html')
+    # ?college=<id> links to a college's own form; otherwise the one chosen last
+    college = get_colleges().get(request.args.get('college')) or student_college()
+    return render_template('index.html', college=college)
 
 
 
-@app.route('/parse-transcript', methods=['POST'])
+@bp.route('/parse-transcript', methods=['POST'])
 def parse_transcript_endpoint():
     """Accept transcript PDF, extract student data + course list."""
+    retry_after = check_rate_limit()
+    if retry_after:
+        return too_many_requests('تم تجاوز عدد المحاولات المسموح به. يرجى المحاولة بعد قليل', retry_after)
+
     file = request.files.get('transcript')
     if not file or file.filename == '':
         return jsonify({'error': 'لم يتم رفع السجل الأكاديمي'}), 400
@@ -699,53 +919,84 @@ def parse_transcript_endpoint():
     if not allowed_file(file.filename):
         return jsonify({'error': 'يرجى رفع ملف بصيغة PDF فقط'}), 400
 
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    unique_filename = f"{uuid.uuid4().hex}.pdf"
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-    file.save(filepath)
+    college = get_colleges().get(request.form.get('college')) or get_colleges().default
+    session['college_id'] = college.id
+
+    # One trace id per uploaded transcript, carried to the validate step in the session
+    session['trace_id'] = uuid.uuid4().hex
+    timer = StageTimer()
+    stats = {}
+    with timer('save'):
+        transcript_ref = store_upload(file)
 
     try:
-        transcript_data = parse_transcript(filepath)
-
-        lines = transcript_data['raw_text'].split('\n')
-        lines = [l.strip() for l in lines if l.strip()]
-        courses = extract_courses(lines)
-        semester, year = detect_current_semester(lines)
-
-        # Store filename in session for the validate step
-        session['transcript_file'] = unique_filename
-
-        # Only return current-semester courses (no grade = currently enrolled)
-        current_courses = [c for c in courses if c['current']]
-
-        return jsonify({
-            'student': {
-                'name': transcript_data.get('student_name', ''),
-                'id': transcript_data.get('student_id', ''),
-                'college': transcript_data.get('college', '') or COLLEGE_NAME,
-                'department': transcript_data.get('department', ''),
-                'degree': transcript_data.get('degree', ''),
-                'gpa': transcript_data.get('gpa', 0),
-            },
-            'courses': current_courses,
-            'current_semester': semester,
-            'current_year': year,
-        })
+        transcript = parse_stored_transcript(transcript_ref, timer, stats)
+
+        # Store content hash in session for the validate step
+        session['transcript_file'] = transcript_ref
+        # Previews only for admitted uploads: a rejected one is never rasterized
+        current_app.extensions['previews'].submit(transcript_ref, blob_path(transcript_ref))
+
+        logger.info('transcript parsed', extra=log_fields(
+            event='transcript.parsed', college=college.id, transcript=transcript_ref[:12],
+            courses=len(transcript.courses), **stats, **timer.total()))
+        return jsonify(transcript_payload(transcript, college))
+    except ImageOnlyTranscript as e:
+        # The slow path: OCR in the background while the browser polls
+        if (current_app.extensions['ocr'] is None
+                or queue_ocr(transcript_ref, dict(stats, **timer.total())) == OCR_FAILED):
+            discard_upload(transcript_ref)
+            return parse_rejected_response(e, dict(stats, **timer.total()))
+        session['transcript_file'] = transcript_ref
+        return ocr_pending_response(transcript_ref)
+    except (ParseBusy, TranscriptTooComplex, TranscriptUnreadable) as e:
+        discard_upload(transcript_ref)
+        return parse_rejected_response(e, dict(stats, **timer.total()))
     except Exception as e:
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        logger.exception('transcript parse failed', extra=log_fields(
+            event='transcript.failed', stage=timer.stage, transcript=transcript_ref[:12], **stats, **timer.total()))
+        discard_upload(transcript_ref)
         return jsonify({'error': f'حدث خطأ أثناء تحليل السجل: {str(e)}'}), 500
 
 
-@app.route('/validate', methods=['POST'])
+@bp.route('/parse-transcript/<ref>')
+def parse_transcript_status(ref):
+    """Poll for a scanned transcript on the OCR queue: 202 while it runs, then as /parse-transcript."""
+    if ref != session.get('transcript_file') or not os.path.exists(blob_path(ref)):
+        return jsonify({'error': 'لم يتم العثور على السجل الأكاديمي. يرجى إعادة رفعه'}), 404
+
+    transcript = current_app.extensions['parse_cache'].get(ref)
+    if transcript is None:
+        # Queues it again if the worker it was queued on went away
+        ocr = current_app.extensions['ocr']
+        status = OCR_FAILED if ocr is None else ocr.submit(ref, blob_path(ref))
+        if status == OCR_FAILED:
+            session.pop('transcript_file', None)
+            discard_upload(ref)
+            return parse_rejected_response(TranscriptUnreadable('OCR failed'), {'transcript': ref[:12]})
+        transcript = current_app.extensions['parse_cache'].get(ref)
+        if transcript is None:
+            return ocr_pending_response(ref)
+
+    current_app.extensions['previews'].submit(ref, blob_path(ref))
+    logger.info('transcript parsed', extra=log_fields(
+        event='transcript.parsed', college=student_college().id, transcript=ref[:12],
+        courses=len(transcript.courses), ocr=True))
+    return jsonify(transcript_payload(transcript, student_college()))
+
+
+@bp.route('/validate', methods=['POST'])
 def validate():
+    retry_after = check_rate_limit()
+    if retry_after:
+        return too_many_requests('تم تجاوز عدد المحاولات المسموح به. يرجى المحاولة بعد قليل', retry_after)
+
     # Get transcript file saved during the parse step
     transcript_filename = session.get('transcript_file')
     if not transcript_filename:
         return jsonify({'error': 'لم يتم رفع السجل الأكاديمي. يرجى البدء من الخطوة الأولى'}), 400
 
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], transcript_filename)
-    if not os.path.exists(filepath):
+    if not os.path.exists(blob_path(transcript_filename)):
         return jsonify({'error': 'لم يتم العثور على السجل الأكاديمي. يرجى إعادة رفعه'}), 400
 
     # Check supporting document
@@ -756,77 +1007,77 @@ def validate():
     if not allowed_file(supporting_file.filename):
         return jsonify({'error': 'يرجى رفع المستند الداعم بصيغة PDF فقط'}), 400
 
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    supporting_doc_filename = f"{uuid.uuid4().hex}.pdf"
-    supporting_doc_path = os.path.join(app.config['UPLOAD_FOLDER'], supporting_doc_filename)
-    supporting_file.save(supporting_doc_path)
+    college = student_college()
+    timer = StageTimer()
+    stats = {}
+    with timer('save'):
+        supporting_doc_ref = store_upload(supporting_file)
 
     try:
-        # Re-parse transcript
-        transcript_data = parse_transcript(filepath)
-
-        lines = transcript_data['raw_text'].split('\n')
-        lines = [l.strip() for l in lines if l.strip()]
-        courses = extract_courses(lines)
+        # Reuse the parse from the first step when it is still cached
+        transcript = parse_stored_transcript(transcript_filename, timer, stats)
+        courses = transcript.courses
 
         # Find the selected course
         selected_course_code = request.form.get('selected_course', '').strip()
         if not selected_course_code:
-            os.remove(supporting_doc_path)
+            discard_upload(supporting_doc_ref)
             return jsonify({'error': 'يرجى اختيار المقرر المراد الاعتذار عنه'}), 400
 
         selected = None
         for c in courses:
-            if c['code'] == selected_course_code:
+            if c.code == selected_course_code:
                 selected = c
                 break
 
         if not selected:
-            os.remove(supporting_doc_path)
+            discard_upload(supporting_doc_ref)
             return jsonify({'error': 'لم يتم العثور على المقرر المحدد في السجل الأكاديمي'}), 400
 
-        course_code = selected['code']
-        course_name = selected['name']
+        course_code = selected.code
+        course_name = selected.name
 
         # Get semester/year from transcript
-        semester, year = detect_current_semester(lines)
+        semester, year = transcript.semester, transcript.year
 
         reason_type = request.form.get('reason_type', '').strip()
         reason = request.form.get('reason', '').strip()
 
-        # Use department extracted from transcript as major
-        transcript_data['major'] = transcript_data.get('department', '')
-
         # Check for previously withdrawn same course (grade = ع Arabic or W English)
         for c in courses:
-            if c['code'] == course_code and c['grade'] in ('ع', 'W', 'WF') and c is not selected:
-                transcript_data['withdrawn_courses'].append(course_code)
-
-        # Get or create student in DB
-        student_id_str = transcript_data.get('student_id', '') or 'unknown'
+            if c.code == course_code and c.grade in ('ع', 'W', 'WF') and c is not selected:
+                transcript.withdrawn_courses.append(course_code)
+
+        # Get or create student in DB (department extracted from transcript is the major)
+        student_id_str = transcript.student_id or 'unknown'
+
+        with timer('db'):
+            student = get_or_create_student(
+                college.id,
+                student_id_str,
+                transcript.student_name,
+                transcript.department,
+                transcript.degree
+            )
 
-        student = get_or_create_student(
-            student_id_str,
-            transcript_data.get('student_name', ''),
-            transcript_data.get('major', ''),
-            transcript_data.get('degree', '')
-        )
+            # Check for duplicate request
+            existing = check_duplicate_request(college.id, student.id, course_code, semester, year)
+            if existing:
+                discard_upload(supporting_doc_ref)
+                return duplicate_request_response(existing, course_code)
 
-        # Check for duplicate request
-        existing = check_duplicate_request(student.id, course_code, semester, year)
-        if existing:
-            os.remove(supporting_doc_path)
-            return jsonify({
-                'error': f'تم تقديم طلب اعتذار لنفس المقرر ({course_code}) في نفس الفصل مسبقاً. رقم الطلب: {existing.id}',
-                'duplicate': True,
-                'request_id': existing.id
-            }), 409
+            # The student's requests on record, for the history rules
+            history = get_withdrawal_history(student.id, semester, year)
 
-        # Validate
-        result = validate_withdrawal(transcript_data, course_code, course_name, semester, year, reason)
+        with timer('rules'):
+            result = validate_withdrawal(transcript, course_code, course_name, semester, year, reason, history,
+                                         withdrawal_limits=college.max_withdrawals)
+        result['rules_checked'] = [r.to_dict() for r in result['rules_checked']]
+        result['transcript_data']['college'] = college.name
 
         # Save request to DB
         withdrawal_req = WithdrawalRequest(
+            college_id=college.id,
             student_id=student.id,
             course_code=course_code,
             course_name=course_name,
@@ -836,184 +1087,524 @@ def validate():
             reason=reason,
             status='pending',
             eligible=result['eligible'],
-            errors=json.dumps(result['errors'], ensure_ascii=False),
-            warnings=json.dumps(result['warnings'], ensure_ascii=False),
-            rules_checked=json.dumps(result['rules_checked'], ensure_ascii=False),
+            errors=dumps_json(result['errors']),
+            warnings=dumps_json(result['warnings']),
+            rules_checked=dumps_json(result['rules_checked']),
             transcript_file=transcript_filename,
-            supporting_doc=supporting_doc_filename
+            supporting_doc=supporting_doc_ref
         )
-        db.session.add(withdrawal_req)
-        db.session.commit()
-
+        with timer('db'):
+            db.session.add(withdrawal_req)
+            try:
+                # The unique indexes are checked here, inside the same transaction as the
+                # history update: a concurrent submission for the same course or the
+                # same semester loses the race instead of slipping past rule 7.
+                db.session.flush()
+            except IntegrityError:
+                db.session.rollback()
+                discard_upload(supporting_doc_ref)
+                return conflicting_request_response(college.id, student.id, course_code, semester, year)
+            record_withdrawal_change(withdrawal_req, was_withdrawal=False)
+            record_admin_event(withdrawal_req, 'created')
+            retain_blob(transcript_filename)
+            retain_blob(supporting_doc_ref)
+            db.session.commit()
+        current_app.extensions['previews'].submit(supporting_doc_ref, blob_path(supporting_doc_ref))
+
+        logger.info('withdrawal validated', extra=log_fields(
+            event='withdrawal.validated', college=college.id, request_id=withdrawal_req.id, eligible=result['eligible'],
+            errors=len(result['errors']), warnings=len(result['warnings']), **stats, **timer.total()))
         result['request_id'] = withdrawal_req.id
         return jsonify(result)
 
+    except ImageOnlyTranscript as e:
+        # A scan whose OCR result has left the cache: read it again and have the student retry
+        db.session.rollback()
+        discard_upload(supporting_doc_ref)
+        if current_app.extensions['ocr'] is None:
+            return parse_rejected_response(e, dict(stats, **timer.total()))
+        queue_ocr(transcript_filename, dict(stats, **timer.total()))
+        response = jsonify({'error': 'جاري قراءة السجل الأكاديمي الممسوح ضوئياً. يرجى المحاولة بعد قليل',
+                            'retry_after': OCR_POLL_INTERVAL})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(OCR_POLL_INTERVAL)
+        return response
+    except (ParseBusy, TranscriptTooComplex, TranscriptUnreadable) as e:
+        db.session.rollback()
+        discard_upload(supporting_doc_ref)
+        return parse_rejected_response(e, dict(stats, **timer.total()))
     except Exception as e:
+        logger.exception('withdrawal validation failed', extra=log_fields(
+            event='withdrawal.failed', stage=timer.stage, **stats, **timer.total()))
         db.session.rollback()
-        if os.path.exists(supporting_doc_path):
-            os.remove(supporting_doc_path)
+        discard_upload(supporting_doc_ref)
         return jsonify({'error': f'حدث خطأ أثناء معالجة الملف: {str(e)}'}), 500
 
 
-@app.route('/request/<int:request_id>')
+@bp.route('/request/<int:request_id>')
 def get_request_status(request_id):
     """Get the status of a specific withdrawal request."""
     req = WithdrawalRequest.query.get_or_404(request_id)
-    return jsonify({
-        'id': req.id,
-        'course_code': req.course_code,
-        'course_name': req.course_name,
-        'semester': req.semester,
-        'year': req.year,
-        'status': req.status,
-        'eligible': req.eligible,
-        'created_at': req.created_at.isoformat() if req.created_at else None
-    })
+    return jsonify(request_status_payload(req))
+
+
+@bp.route('/assets/<path:filename>')
+def asset(filename):
+    """Fingerprinted build of a stylesheet or script (see assets.py)."""
+    return current_app.extensions['assets'].send(filename)
+
+
+def asset_url(filename):
+    """URL of a static asset: its fingerprinted build when built, else the plain static file."""
+    return current_app.extensions['assets'].url(filename)
+
 
+def send_immutable_file(directory, filename, etag, **kwargs):
+    """Send a file that never changes under its name, with private caching.
 
-@app.route('/admin/supporting-doc/<int:request_id>')
+    The content hash doubles as a strong ETag: conditional GETs are answered
+    with 304 before touching the file, and werkzeug serves byte ranges so the
+    browser PDF viewer can fetch pages incrementally.
+    """
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+    else:
+        response = send_from_directory(
+            os.path.join(os.getcwd(), directory),
+            filename,
+            etag=etag,
+            conditional=True,
+            max_age=DOCUMENT_MAX_AGE,
+            **kwargs
+        )
+    # Documents carry student data: browsers may cache them, shared proxies may not
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = DOCUMENT_MAX_AGE
+    return response
+
+
+def send_stored_pdf(ref, download_name):
+    """Send a stored PDF inline for the admin viewer."""
+    return send_immutable_file(current_app.config['UPLOAD_FOLDER'], blob_filename(ref), ref_digest(ref),
+                               as_attachment=False, download_name=download_name)
+
+
+def get_document_ref(request_id, column, college_id):
+    """Fetch a request of the college's document reference plus the fields for its download name."""
+    row = db.session.query(column, WithdrawalRequest.course_code, Student.student_id) \
+        .join(Student, WithdrawalRequest.student_id == Student.id) \
+        .filter(WithdrawalRequest.id == request_id, WithdrawalRequest.college_id == college_id) \
+        .first()
+    if row is None:
+        abort(404)
+    return row
+
+
+@bp.route('/admin/supporting-doc/<int:request_id>')
 def view_supporting_doc(request_id):
     """View/download the supporting document for a withdrawal request."""
     if not session.get('admin_logged_in'):
         return jsonify({'error': 'غير مصرح'}), 403
 
-    req = WithdrawalRequest.query.get_or_404(request_id)
-    if not req.supporting_doc:
+    ref, course_code, student_id = get_document_ref(request_id, WithdrawalRequest.supporting_doc,
+                                                    admin_college().id)
+    if not ref:
         return jsonify({'error': 'لا يوجد مستند داعم'}), 404
 
-    upload_dir = os.path.join(os.getcwd(), app.config['UPLOAD_FOLDER'])
-    return send_from_directory(
-        upload_dir,
-        req.supporting_doc,
-        as_attachment=False,
-        download_name=f"supporting_{req.student.student_id}_{req.course_code.replace(' ', '_')}.pdf"
-    )
+    return send_stored_pdf(ref, f"supporting_{student_id}_{course_code.replace(' ', '_')}.pdf")
 
 
-@app.route('/admin/transcript/<int:request_id>')
+@bp.route('/admin/transcript/<int:request_id>')
 def view_transcript(request_id):
     """View/download the transcript PDF for a withdrawal request."""
     if not session.get('admin_logged_in'):
         return jsonify({'error': 'غير مصرح'}), 403
 
-    req = WithdrawalRequest.query.get_or_404(request_id)
-    if not req.transcript_file:
+    ref, course_code, student_id = get_document_ref(request_id, WithdrawalRequest.transcript_file,
+                                                    admin_college().id)
+    if not ref:
         return jsonify({'error': 'لا يوجد ملف مرفق'}), 404
 
-    upload_dir = os.path.join(os.getcwd(), app.config['UPLOAD_FOLDER'])
-    return send_from_directory(
-        upload_dir,
-        req.transcript_file,
-        as_attachment=False,
-        download_name=f"transcript_{req.student.student_id}_{req.course_code.replace(' ', '_')}.pdf"
-    )
+    return send_stored_pdf(ref, f"transcript_{student_id}_{course_code.replace(' ', '_')}.pdf")
+
+
+@bp.route('/admin/preview/<int:request_id>/<kind>')
+def view_preview(request_id, kind):
+    """First-page thumbnail of a request's transcript or supporting document."""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'غير مصرح'}), 403
+
+    column = {
+        'transcript': WithdrawalRequest.transcript_file,
+        'supporting': WithdrawalRequest.supporting_doc,
+    }.get(kind)
+    if column is None:
+        abort(404)
+    ref = db.session.query(column).filter(WithdrawalRequest.id == request_id,
+                                          WithdrawalRequest.college_id == admin_college().id).scalar()
+    if not ref:
+        abort(404)
+
+    previews = current_app.extensions['previews']
+    digest = ref_digest(ref)
+    if not previews.has(digest):
+        # Uploads from before previews existed: render now, show on next view
+        previews.submit(digest, blob_path(ref))
+        return jsonify({'error': 'المعاينة غير جاهزة بعد'}), 404
+
+    return send_immutable_file(previews.cache_dir, f"{digest}.png", digest, mimetype='image/png')
 
 
 # ============ Admin Routes ============
 
-@app.route('/admin')
+def admin_login_page(error=None):
+    college = get_colleges().get(request.values.get('college')) or get_colleges().default
+    return render_template('admin.html', logged_in=False, college=college, error=error)
+
+
+@bp.route('/admin')
 def admin():
     if not session.get('admin_logged_in'):
-        return render_template('admin.html', logged_in=False)
+        return admin_login_page()
+    college = admin_college()
 
     # Get filter params
     status_filter = request.args.get('status', '')
     major_filter = request.args.get('major', '')
     search = request.args.get('search', '')
 
-    query = WithdrawalRequest.query.join(Student)
-
-    if status_filter:
-        query = query.filter(WithdrawalRequest.status == status_filter)
-    if major_filter:
-        query = query.filter(Student.major == major_filter)
-    if search:
-        query = query.filter(
-            db.or_(
-                Student.student_id.contains(search),
-                Student.student_name.contains(search),
-                WithdrawalRequest.course_code.contains(search)
-            )
-        )
-
+    # Read the feed cursor first: changes committed while the page renders are replayed, not lost
+    cursor = latest_admin_event_id()
+    query = filter_admin_requests(admin_list_query(), college.id, status_filter, major_filter, search)
     requests_list = query.order_by(WithdrawalRequest.created_at.desc()).all()
 
-    # Stats
-    total = WithdrawalRequest.query.count()
-    pending = WithdrawalRequest.query.filter_by(status='pending').count()
-    approved = WithdrawalRequest.query.filter_by(status='approved').count()
-    rejected = WithdrawalRequest.query.filter_by(status='rejected').count()
-
-    stats = {
-        'total': total,
-        'pending': pending,
-        'approved': approved,
-        'rejected': rejected
-    }
-
     return render_template('admin.html',
                            logged_in=True,
-                           requests=requests_list,
-                           stats=stats,
+                           college=college,
+                           rows=render_request_rows(college.id, requests_list),
+                           stats=admin_stats(college.id),
+                           feed_cursor=cursor,
                            status_filter=status_filter,
                            major_filter=major_filter,
                            search=search)
 
 
-@app.route('/admin/login', methods=['POST'])
+@bp.route('/admin/login', methods=['POST'])
 def admin_login():
+    college = get_colleges().get(request.form.get('college')) or get_colleges().default
     password = request.form.get('password', '')
-    if password == ADMIN_PASSWORD:
+    expected = admin_password(college)
+    if expected is not None and password == expected:
         session['admin_logged_in'] = True
-        return redirect(url_for('admin'), code=303)
-    return render_template('admin.html', logged_in=False, error='كلمة المرور غير صحيحة')
+        session['admin_college'] = college.id
+        return redirect(url_for('main.admin'), code=303)
+    return admin_login_page(error='كلمة المرور غير صحيحة')
 
 
-@app.route('/admin/logout')
+@bp.route('/admin/logout')
 def admin_logout():
     session.pop('admin_logged_in', None)
-    return redirect(url_for('admin'))
+    session.pop('admin_college', None)
+    return redirect(url_for('main.admin'))
 
 
-@app.route('/admin/request/<int:request_id>')
+@bp.route('/admin/request/<int:request_id>')
 def admin_request_detail(request_id):
     """Detailed view of a single withdrawal request."""
     if not session.get('admin_logged_in'):
-        return redirect(url_for('admin'))
-
-    req = WithdrawalRequest.query.get_or_404(request_id)
+        return redirect(url_for('main.admin'))
+
+    college = admin_college()
+    # rules_checked is only loaded when its cached fragment is missing
+    req = WithdrawalRequest.query.options(defer(WithdrawalRequest.rules_checked)) \
+        .filter_by(id=request_id, college_id=college.id).first_or_404()
+    student_info, = cached_fragments(college.id, 'student', [req], fragment_macro('student_info'))
+    rule_results, = cached_fragments(college.id, 'rules', [req],
+                                     lambda r: fragment_macro('rule_results')(r.get_rules_checked()))
     return render_template('admin_detail.html',
                            logged_in=True,
+                           college=college,
                            req=req,
-                           rules=req.get_rules_checked(),
+                           student_info=student_info,
+                           rule_results=rule_results,
                            errors=req.get_errors(),
                            warnings=req.get_warnings())
 
 
-@app.route('/admin/update/<int:request_id>', methods=['POST'])
+@bp.route('/admin/update/<int:request_id>', methods=['POST'])
 def admin_update_request(request_id):
     if not session.get('admin_logged_in'):
         return jsonify({'error': 'غير مصرح'}), 403
 
-    req = WithdrawalRequest.query.get_or_404(request_id)
+    req = WithdrawalRequest.query.filter_by(id=request_id, college_id=admin_college().id).first_or_404()
     new_status = request.form.get('status')
 
     if new_status in ('approved', 'rejected', 'pending'):
+        was_withdrawal = counts_as_withdrawal(req)
         req.status = new_status
+        # Incremented in SQL: concurrent updates of one request still end on distinct versions
+        req.version = WithdrawalRequest.version + 1
+        try:
+            db.session.flush()
+        except IntegrityError:
+            # Approving would make a second withdrawal in the same semester
+            db.session.rollback()
+            return jsonify({'error': 'يوجد طلب اعتذار آخر معتمد أو قيد المراجعة للطالب في نفس الفصل'}), 409
+        record_withdrawal_change(req, was_withdrawal)
+        record_admin_event(req, 'status')
         db.session.commit()
+        if request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json':
+            # Dashboard script: update the row in place instead of reloading the page
+            return jsonify({'request': admin_request_payload(req), 'html': render_request_row(req),
+                            'stats': admin_stats(req.college_id)})
         # Redirect back to detail page if came from there
         if request.form.get('from_detail'):
-            return redirect(url_for('admin_request_detail', request_id=request_id), code=303)
-        return redirect(url_for('admin'), code=303)
+            return redirect(url_for('main.admin_request_detail', request_id=request_id), code=303)
+        return redirect(url_for('main.admin'), code=303)
 
     return jsonify({'error': 'حالة غير صالحة'}), 400
 
 
+@bp.route('/admin/api/stats')
+def admin_api_stats():
+    """The college's request counts per status and the current change-feed cursor."""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'غير مصرح'}), 403
+    return jsonify({'stats': admin_stats(admin_college().id), 'cursor': latest_admin_event_id()})
+
+
+@bp.route('/admin/api/cache-stats')
+def admin_api_cache_stats():
+    """Cache hit rates of the worker that answers; counts start at zero when it starts."""
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'غير مصرح'}), 403
+    return jsonify({'pid': os.getpid(), 'caches': cache_stats(admin_college().id)})
+
+
+@bp.route('/admin/api/requests')
+def admin_api_requests():
+    """One page of the college's dashboard list, newest first, as compact JSON.
+
+    Query: status, major, search (as on /admin), limit, and before=<id> for
+    the page after one ending at that id. Selects only the listed columns;
+    rows are arrays in the order of "columns", and "next" is the before
+    value of the following page (null on the last page).
+    """
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'غير مصرح'}), 403
+    limit = min(max(request.args.get('limit', ADMIN_PAGE_SIZE, type=int), 1), ADMIN_MAX_PAGE_SIZE)
+    before = request.args.get('before', type=int)
+
+    query = db.session.query(*(column for _, column in ADMIN_API_COLUMNS)).select_from(WithdrawalRequest).join(Student)
+    query = filter_admin_requests(query, admin_college().id, request.args.get('status', ''),
+                                  request.args.get('major', ''), request.args.get('search', ''))
+    if before:
+        query = query.filter(WithdrawalRequest.id < before)
+    # Keyset pagination on (college_id, id): every page is an index range scan, however deep
+    rows = query.order_by(WithdrawalRequest.id.desc()).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return jsonify({
+        'columns': [name for name, _ in ADMIN_API_COLUMNS],
+        'rows': [[value.isoformat() if isinstance(value, datetime) else value for value in row] for row in rows],
+        'next': rows[-1][0] if has_more else None,
+    })
+
+
+@bp.route('/admin/api/requests/<int:request_id>')
+def admin_api_request(request_id):
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'غير مصرح'}), 403
+    req = WithdrawalRequest.query.filter_by(id=request_id, college_id=admin_college().id).first_or_404()
+    return jsonify(admin_request_payload(req, detail=True))
+
+
+@bp.route('/admin/events')
+def admin_events():
+    """Server-sent change feed of new requests and status changes for the dashboard.
+
+    Sends a `change` event per changed request (its current row, rendered)
+    and a `stats` event after each batch. The stream ends after
+    ADMIN_FEED_STREAM_SECONDS so it does not hold a server thread for long;
+    EventSource reconnects with Last-Event-ID and resumes where it left off.
+    The ASGI server answers this route natively and keeps the stream open.
+    """
+    if not session.get('admin_logged_in'):
+        return jsonify({'error': 'غير مصرح'}), 403
+    college_id = admin_college().id
+    cursor, filters = admin_feed_args(request.args, request.headers.get('Last-Event-ID'))
+
+    @stream_with_context
+    def stream():
+        nonlocal cursor
+        yield f'retry: {int(ADMIN_FEED_POLL * 1000)}\n\n'
+        deadline = time.monotonic() + ADMIN_FEED_STREAM_SECONDS
+        while time.monotonic() < deadline:
+            messages, cursor = admin_feed_messages(college_id, cursor, filters)
+            if messages:
+                yield ''.join(messages)
+            time.sleep(ADMIN_FEED_POLL)
+
+    return current_app.response_class(stream(), mimetype='text/event-stream',
+                                      headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 # ============ App Startup ============
 
-with app.app_context():
+# The rule 7 error validate_withdrawal gives when another request counts in the semester
+DUPLICATE_SEMESTER_ERROR = 'يسمح بالانسحاب من مقرر واحد فقط خلال الفصل الدراسي، ويوجد طلب اعتذار آخر في نفس الفصل'
+
+
+def demote_duplicate_withdrawals():
+    """Leave at most one counting request per student and semester; returns the ids changed.
+
+    Rule 7 allows one withdrawal per semester, but requests stored before the
+    uq_college_student_semester_withdrawal index existed may break it, and the
+    index cannot be built over them. The approved one (else the earliest) is
+    kept; the others become ineligible pending requests with the rule 7 error,
+    so an admin decides them again.
+    """
+    counting = WithdrawalRequest.query.filter(
+        db.or_(WithdrawalRequest.status == 'approved',
+               db.and_(WithdrawalRequest.status == 'pending', WithdrawalRequest.eligible))
+    ).order_by(WithdrawalRequest.college_id, WithdrawalRequest.student_id, WithdrawalRequest.semester,
+               WithdrawalRequest.year, WithdrawalRequest.status != 'approved', WithdrawalRequest.id)
+    kept = set()
+    demoted = []
+    for req in counting:
+        key = (req.college_id, req.student_id, req.semester, req.year)
+        if key not in kept:
+            kept.add(key)
+            continue
+        req.status = 'pending'
+        req.eligible = False
+        req.errors = dumps_json(req.get_errors() + [DUPLICATE_SEMESTER_ERROR])
+        req.version = WithdrawalRequest.version + 1
+        demoted.append(req.id)
+    db.session.commit()
+    return demoted
+
+
+# Indexes and unique constraints superseded by the college-led ones. SQLite
+# cannot drop a constraint declared in CREATE TABLE; the withdrawal_requests
+# one is implied by the new index anyway (student rows belong to one college),
+# but students.student_id stays unique across colleges there.
+LEGACY_INDEXES = ('uq_student_semester_withdrawal',)
+LEGACY_CONSTRAINTS = (('withdrawal_requests', 'uq_student_course_semester_year'),
+                      ('students', 'students_student_id_key'))
+
+
+@click.command('init-db')
+def init_db_command():
+    """Create any missing database tables, columns and indexes."""
+    tables_before = set(db.inspect(db.engine).get_table_names())
     db.create_all()
+    # create_all() skips tables that already exist, so add columns and indexes introduced since.
+    # Rows from before colleges existed belong to the default college.
+    backfill = {'college_id': f"'{get_colleges().default.id}'"}
+    for table in (Student.__table__, WithdrawalRequest.__table__, AdminEvent.__table__, StoredFile.__table__):
+        existing = {column['name'] for column in db.inspect(db.engine).get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(db.engine.dialect)}'
+                default = column.server_default.arg if column.server_default is not None else backfill.get(column.name)
+                if default is not None:
+                    ddl += f' DEFAULT {default}' + ('' if column.nullable else ' NOT NULL')
+                with db.engine.begin() as conn:
+                    conn.execute(db.text(ddl))
+    demoted = []
+    if 'uq_college_student_semester_withdrawal' not in {
+            index['name'] for index in db.inspect(db.engine).get_indexes(WithdrawalRequest.__tablename__)}:
+        # Requests from before rule 7 was enforced would make the unique index fail
+        demoted = demote_duplicate_withdrawals()
+        for req_id in demoted:
+            click.echo(f'Request {req_id}: another withdrawal counts in the same semester; '
+                       f'marked ineligible and pending review.')
+    for table in (Student.__table__, WithdrawalRequest.__table__, AdminEvent.__table__):
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    with db.engine.begin() as conn:
+        for name in LEGACY_INDEXES:
+            conn.execute(db.text(f'DROP INDEX IF EXISTS {name}'))
+        if db.engine.dialect.name == 'postgresql':
+            for table_name, name in LEGACY_CONSTRAINTS:
+                conn.execute(db.text(f'ALTER TABLE {table_name} DROP CONSTRAINT IF EXISTS {name}'))
+    history_tables = {model.__tablename__ for model in HISTORY_MODELS}
+    if demoted or (tables_before and not history_tables <= tables_before):
+        # New history tables on a database with requests, or requests that stopped counting
+        rebuild_withdrawal_history()
+        click.echo('Withdrawal history backfilled from existing requests.')
+    click.echo('Database tables are up to date.')
+
+
+@click.command('build-assets')
+def build_assets_command():
+    """Minify, precompress and fingerprint the stylesheets and scripts into static/dist."""
+    for name, (source, minified, gz, br) in build_assets(current_app.static_folder).items():
+        click.echo(f'{name}: {source} -> {minified} bytes, gzip {gz}' + (f', brotli {br}' if br else ''))
+
+
+@click.command('rebuild-history')
+def rebuild_history_command():
+    """Recompute the per-student withdrawal history from all requests."""
+    rebuild_withdrawal_history()
+    click.echo('Withdrawal history rebuilt.')
+
+
+def create_app(config=None):
+    """Build the Flask app. Schema creation is a separate step: `flask --app app init-db`."""
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.config['UPLOAD_FOLDER'] = 'uploads'
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['REDIS_URL'] = REDIS_URL
+    app.config['COLLEGES_FILE'] = COLLEGES_FILE
+    if config:
+        app.config.update(config)
+
+    configure_logging(LOG_LEVEL)
+    if PROXY_COUNT:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_COUNT, x_proto=PROXY_COUNT)
+    db.init_app(app)
+    colleges = app.extensions['colleges'] = load_colleges(app.config['COLLEGES_FILE'])
+    app.extensions['previews'] = PreviewRenderer(os.path.join(app.config['UPLOAD_FOLDER'], 'previews'))
+    cache = app.extensions['cache'] = create_cache(app.config['REDIS_URL'])
+    app.extensions['parse_cache'] = cache.child('parse', max_entries=PARSE_CACHE_SIZE)
+    app.extensions['admission'] = cache.child('admission')
+    if cache.shared:
+        app.extensions['ocr'] = OcrQueue(run_ocr_parse, app.extensions['parse_cache'], cache.child('ocr'),
+                                         result_ttl=OCR_CACHE_TTL, pending_ttl=OCR_PENDING_TTL,
+                                         failed_ttl=OCR_FAILED_TTL)
+    else:
+        # Per-process job state: a poll answered by another worker would never see the result
+        app.extensions['ocr'] = None
+        logger.warning('OCR of scanned transcripts is off: it needs a shared cache (set REDIS_URL)')
+    app.extensions['fragment_cache'] = {college.id: cache.child(f'fragments:{college.id}',
+                                                                max_entries=FRAGMENT_CACHE_SIZE)
+                                        for college in colleges}
+    if cache.shared:
+        # Per-process memory would lose sessions between workers, so cookies stay the default
+        app.session_interface = CacheSessionInterface(cache.child('session'))
+    app.extensions['assets'] = AssetManifest(app.static_folder)
+    app.add_template_global(asset_url)
+    app.add_template_global(colleges, 'colleges')
+    app.after_request(compress_response)
+    app.register_blueprint(bp)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(rebuild_history_command)
+    app.cli.add_command(build_assets_command)
+    return app
+
 
 if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        db.create_all()
     os.makedirs('uploads', exist_ok=True)
     app.run(debug=True, port=5000)
@@ -0,0 +1,365 @@
+"""ASGI entry point: I/O-bound endpoints on an event loop, everything else via Flask.
+
+Run with ``uvicorn asgi:app`` after ``flask --app app init-db``
+(or ``gunicorn -k uvicorn.workers.UvicornWorker asgi:app``).
+
+Status polling (/request/<id>), the admin document and preview downloads
+and the admin change feed (/admin/events) are answered here natively: their
+short database lookups run in the default thread pool, files are streamed
+in chunks and the feed stays open between polls, so slow clients and open
+dashboards never pin a worker. All other routes are delegated to the Flask
+app through asgiref's WSGI adapter, run on a pool of WSGI_THREADS threads,
+and transcript parsing is pushed to a process pool.
+"""
+import asyncio
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from urllib.parse import parse_qsl, quote
+
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from werkzeug.exceptions import NotFound
+from werkzeug.http import parse_etags, parse_range_header
+from werkzeug.test import EnvironBuilder
+
+# Parse PDFs in worker processes when the parse guard is turned off (PARSE_TIMEOUT=0)
+os.environ.setdefault('PARSE_WORKERS', str(os.cpu_count() or 1))
+
+from app import (  # noqa: E402
+    create_app, db, WithdrawalRequest, DOCUMENT_MAX_AGE, ADMIN_FEED_POLL, ADMIN_FEED_KEEPALIVE,
+    blob_path, ref_digest, get_document_ref, request_status_payload, admin_feed_args, admin_feed_messages,
+)
+
+CHUNK_SIZE = 256 * 1024
+
+# Threads running the delegated Flask requests, as gunicorn's gthread workers would
+WSGI_THREADS = int(os.environ.get('WSGI_THREADS', '8'))
+
+STATUS_RE = re.compile(r'^/request/(\d+)$')
+DOCUMENT_RE = re.compile(r'^/admin/(transcript|supporting-doc)/(\d+)$')
+PREVIEW_RE = re.compile(r'^/admin/preview/(\d+)/(transcript|supporting)$')
+EVENTS_RE = re.compile(r'^/admin/events$')
+
+
+class _PooledWsgiInstance(WsgiToAsgiInstance):
+    """One delegated request, with the WSGI app run on the given executor.
+
+    Uses the adapter's environ and start_response; the body is spooled as
+    asgiref does, and response messages are sent back on the event loop.
+    """
+
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            raise ValueError('WSGI wrapper received a non-HTTP scope')
+        self.scope = scope
+        loop = asyncio.get_running_loop()
+        with SpooledTemporaryFile(max_size=65536) as body:
+            while True:
+                message = await receive()
+                if message['type'] != 'http.request':
+                    raise ValueError('WSGI wrapper received a non-HTTP-request message')
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            await loop.run_in_executor(self.executor, self._run, body, loop, send)
+
+    def _run(self, body, loop, send):
+        def sync_send(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        try:
+            environ = self.build_environ(self.scope, body)
+        except ValueError:
+            # Too many duplicate headers
+            sync_send({'type': 'http.response.start', 'status': 400, 'headers': [(b'content-type', b'text/plain')]})
+            sync_send({'type': 'http.response.body', 'body': b'Bad Request'})
+            return
+        output = self.wsgi_application(environ, self.start_response)
+        try:
+            sent = 0
+            for chunk in output:
+                if not self.response_started:
+                    self.response_started = True
+                    sync_send(self.response_start)
+                if self.response_content_length is not None:
+                    # Never more than the Content-Length the app declared
+                    chunk = chunk[:self.response_content_length - sent]
+                sync_send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                sent += len(chunk)
+                if sent == self.response_content_length:
+                    break
+        finally:
+            if hasattr(output, 'close'):
+                output.close()
+        if not self.response_started:
+            self.response_started = True
+            sync_send(self.response_start)
+        sync_send({'type': 'http.response.body'})
+
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi with each request on a thread pool.
+
+    asgiref runs every request on its one thread-sensitive thread, so a
+    single slow route (a 20 s guarded parse) would hold up all the others.
+    """
+
+    def __init__(self, wsgi_application, threads):
+        super().__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        await _PooledWsgiInstance(self.wsgi_application, self.executor)(scope, receive, send)
+
+
+flask_app = create_app()
+colleges = flask_app.extensions['colleges']
+preview_renderer = flask_app.extensions['previews']
+wsgi_app = PooledWsgiToAsgi(flask_app, WSGI_THREADS)
+
+
+# ============ Blocking helpers (run in the thread pool) ============
+
+def _admin_college(headers):
+    """The signed-in admin's college id, from the Flask session behind the request cookie (None if not signed in)."""
+    builder = EnvironBuilder(headers={'Cookie': headers.get('cookie', '')})
+    try:
+        req = flask_app.request_class(builder.get_environ())
+    finally:
+        builder.close()
+    sess = flask_app.session_interface.open_session(flask_app, req)
+    if not (sess and sess.get('admin_logged_in')):
+        return None
+    return colleges[sess.get('admin_college')].id
+
+
+def _load_status(request_id):
+    with flask_app.app_context():
+        req = db.session.get(WithdrawalRequest, request_id)
+        return request_status_payload(req) if req else None
+
+
+def _load_document(kind, request_id, college_id):
+    column = WithdrawalRequest.transcript_file if kind == 'transcript' else WithdrawalRequest.supporting_doc
+    prefix = 'transcript' if kind == 'transcript' else 'supporting'
+    with flask_app.app_context():
+        try:
+            ref, course_code, student_id = get_document_ref(request_id, column, college_id)
+        except NotFound:
+            return None
+        path = blob_path(ref) if ref else None
+    if not ref:
+        return None
+    return path, ref_digest(ref), f"{prefix}_{student_id}_{course_code.replace(' ', '_')}.pdf"
+
+
+def _load_preview(kind, request_id, college_id):
+    column = WithdrawalRequest.transcript_file if kind == 'transcript' else WithdrawalRequest.supporting_doc
+    with flask_app.app_context():
+        ref = db.session.query(column).filter(WithdrawalRequest.id == request_id,
+                                              WithdrawalRequest.college_id == college_id).scalar()
+        if not ref:
+            return None
+        digest = ref_digest(ref)
+        if not preview_renderer.has(digest):
+            preview_renderer.submit(digest, blob_path(ref))
+            return None
+    return preview_renderer.path_for(digest), digest
+
+
+def _load_feed(college_id, cursor, filters):
+    # Rows are rendered with url_for, which needs a request context
+    with flask_app.test_request_context('/admin/events'):
+        return admin_feed_messages(college_id, cursor, filters)
+
+
+# ============ Responses ============
+
+async def _send_json(send, status, payload):
+    body = flask_app.json.dumps(payload).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status, 'headers': [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode()),
+    ]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_file(send, headers, method, path, etag, content_type, download_name=None):
+    """Stream a content-addressed file with ETag, 304 and single-range support."""
+    cache_headers = [
+        (b'etag', f'"{etag}"'.encode()),
+        (b'cache-control', f'private, max-age={DOCUMENT_MAX_AGE}'.encode()),
+        (b'accept-ranges', b'bytes'),
+        (b'vary', b'Cookie'),
+    ]
+    if parse_etags(headers.get('if-none-match')).contains(etag):
+        await send({'type': 'http.response.start', 'status': 304, 'headers': cache_headers})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    try:
+        size = await asyncio.to_thread(os.path.getsize, path)
+    except OSError:
+        await _send_json(send, 404, {'error': 'لا يوجد ملف مرفق'})
+        return
+
+    start, stop, status = 0, size, 200
+    response_headers = cache_headers + [(b'content-type', content_type.encode())]
+    if download_name:
+        try:
+            download_name.encode('ascii')
+            disposition = f'inline; filename="{download_name}"'
+        except UnicodeEncodeError:
+            disposition = f"inline; filename*=UTF-8''{quote(download_name)}"
+        response_headers.append((b'content-disposition', disposition.encode('latin-1')))
+
+    range_header = parse_range_header(headers.get('range'))
+    # Honour If-Range: a stale validator means the client gets the whole file
+    if_range = headers.get('if-range')
+    if range_header and (not if_range or parse_etags(if_range).contains(etag)):
+        bounds = range_header.range_for_length(size)
+        if bounds is None:
+            await send({'type': 'http.response.start', 'status': 416, 'headers': cache_headers + [
+                (b'content-range', f'bytes */{size}'.encode()),
+            ]})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        start, stop = bounds
+        status = 206
+        response_headers.append((b'content-range', f'bytes {start}-{stop - 1}/{size}'.encode()))
+
+    response_headers.append((b'content-length', str(stop - start).encode()))
+    await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+    if method == 'HEAD':
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    f = await asyncio.to_thread(open, path, 'rb')
+    try:
+        await asyncio.to_thread(f.seek, start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = await asyncio.to_thread(f.read, min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': remaining > 0})
+        if remaining > 0:
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+# ============ Handlers ============
+
+async def handle_status(scope, receive, headers, send, request_id):
+    payload = await asyncio.to_thread(_load_status, int(request_id))
+    if payload is None:
+        await _send_json(send, 404, {'error': 'الطلب غير موجود'})
+        return
+    await _send_json(send, 200, payload)
+
+
+async def handle_document(scope, receive, headers, send, kind, request_id):
+    college_id = await asyncio.to_thread(_admin_college, headers)
+    if college_id is None:
+        await _send_json(send, 403, {'error': 'غير مصرح'})
+        return
+    doc = await asyncio.to_thread(_load_document, kind, int(request_id), college_id)
+    if doc is None:
+        await _send_json(send, 404, {'error': 'لا يوجد ملف مرفق'})
+        return
+    path, etag, download_name = doc
+    await _send_file(send, headers, scope['method'], path, etag, 'application/pdf', download_name)
+
+
+async def handle_preview(scope, receive, headers, send, request_id, kind):
+    college_id = await asyncio.to_thread(_admin_college, headers)
+    if college_id is None:
+        await _send_json(send, 403, {'error': 'غير مصرح'})
+        return
+    preview = await asyncio.to_thread(_load_preview, kind, int(request_id), college_id)
+    if preview is None:
+        await _send_json(send, 404, {'error': 'المعاينة غير جاهزة بعد'})
+        return
+    path, etag = preview
+    await _send_file(send, headers, scope['method'], path, etag, 'image/png')
+
+
+async def handle_events(scope, receive, headers, send):
+    """Admin change feed as one long-lived server-sent event stream (see app.admin_events)."""
+    college_id = await asyncio.to_thread(_admin_college, headers)
+    if college_id is None:
+        await _send_json(send, 403, {'error': 'غير مصرح'})
+        return
+    cursor, filters = admin_feed_args(dict(parse_qsl(scope['query_string'].decode('latin-1'))),
+                                      headers.get('last-event-id'))
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream; charset=utf-8'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),
+    ]})
+    if scope['method'] == 'HEAD':
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await send({'type': 'http.response.body', 'body': f'retry: {int(ADMIN_FEED_POLL * 1000)}\n\n'.encode(),
+                    'more_body': True})
+        idle = 0.0
+        while not disconnected.done():
+            messages, cursor = await asyncio.to_thread(_load_feed, college_id, cursor, filters)
+            if messages:
+                body, idle = ''.join(messages), 0.0
+            elif idle >= ADMIN_FEED_KEEPALIVE:
+                # Comment line: keeps proxies from closing an idle connection
+                body, idle = ': keep-alive\n\n', 0.0
+            else:
+                body = None
+            if body:
+                await send({'type': 'http.response.body', 'body': body.encode('utf-8'), 'more_body': True})
+            await asyncio.wait([disconnected], timeout=ADMIN_FEED_POLL)
+            idle += ADMIN_FEED_POLL
+    finally:
+        disconnected.cancel()
+
+
+ROUTES = (
+    (STATUS_RE, handle_status),
+    (DOCUMENT_RE, handle_document),
+    (PREVIEW_RE, handle_preview),
+    (EVENTS_RE, handle_events),
+)
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+        for pattern, handler in ROUTES:
+            m = pattern.match(scope['path'])
+            if m:
+                headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+                await handler(scope, receive, headers, send, *m.groups())
+                return
+
+    await wsgi_app(scope, receive, send)
@@ -0,0 +1,154 @@
+"""Static asset build: minified, precompressed, fingerprinted copies of static/.
+
+`flask --app app build-assets` (run at release, next to init-db) writes
+static/dist/ with one file per stylesheet and script, named after a hash
+of its minified content (css/style.3f9a0c1b2d4e.css), plus .gz and .br
+variants and manifest.json mapping source names to built names.
+
+asset_url() in the templates resolves names through the manifest, and
+/assets/ serves the built files with a one-year immutable Cache-Control,
+picking the precompressed variant the browser accepts. A changed file gets
+a new name, so browsers never revalidate. Without a build (development)
+asset_url() falls back to the plain static file.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+from flask import request, send_from_directory, url_for
+
+# Sources built, relative to the static folder
+ASSET_PATTERNS = {'css': '.css', 'js': '.js'}
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Built names change with their content, so they can be cached for good
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# Precompressed variants in order of preference: (Accept-Encoding token, file suffix)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# String literals and comments; everything between them is code
+_CSS_TOKEN = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/''', re.S)
+_JS_TOKEN = re.compile(r'''("(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)|/\*.*?\*/|//[^\n]*''', re.S)
+
+
+def _minify(source, token, squeeze):
+    """Apply squeeze to the code between string literals, with comments replaced by a space."""
+    out = []
+    code = []
+    pos = 0
+    for m in token.finditer(source):
+        code.append(source[pos:m.start()])
+        if m.group(1):
+            out.append(squeeze(''.join(code)))
+            out.append(m.group(1))
+            code = []
+        else:
+            code.append(' ')
+        pos = m.end()
+    code.append(source[pos:])
+    out.append(squeeze(''.join(code)))
+    return ''.join(out)
+
+
+def _squeeze_css(code):
+    code = re.sub(r'\s+', ' ', code)
+    # Only around characters where whitespace never matters: a space before
+    # ':' can be a descendant combinator and '+'/'-' may be inside calc()
+    return re.sub(r' ?([{};,>]) ?', r'\1', code).replace(': ', ':').replace(';}', '}')
+
+
+def minify_css(source):
+    return _minify(source, _CSS_TOKEN, _squeeze_css).strip() + '\n'
+
+
+def _squeeze_js(code):
+    # Line breaks are kept, so automatic semicolon insertion sees the same statements
+    code = re.sub(r'[ \t]+', ' ', code)
+    return re.sub(r' ?\n[\s]*', '\n', code)
+
+
+def minify_js(source):
+    """Drop comments, indentation and blank lines (no renaming or statement rewriting)."""
+    return _minify(source, _JS_TOKEN, _squeeze_js).strip() + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build_assets(static_folder):
+    """Build static/dist/ and its manifest; returns {source: (source bytes, built bytes, gzip, brotli)}."""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None  # gzip variants only
+    dist = os.path.join(static_folder, DIST_DIR)
+    manifest = {}
+    sizes = {}
+    for directory, extension in ASSET_PATTERNS.items():
+        for name in sorted(os.listdir(os.path.join(static_folder, directory))):
+            if not name.endswith(extension):
+                continue
+            source_name = f'{directory}/{name}'
+            with open(os.path.join(static_folder, source_name), encoding='utf-8') as f:
+                source = f.read()
+            data = MINIFIERS[extension](source).encode('utf-8')
+            stem = name[:-len(extension)]
+            built_name = f'{directory}/{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}'
+            path = os.path.join(dist, built_name)
+            _write(path, data)
+            gz = gzip.compress(data, compresslevel=9, mtime=0)
+            _write(path + '.gz', gz)
+            br = brotli.compress(data, quality=11) if brotli else None
+            if br:
+                _write(path + '.br', br)
+            manifest[source_name] = built_name
+            sizes[source_name] = (len(source.encode('utf-8')), len(data), len(gz), len(br) if br else None)
+    _write(os.path.join(dist, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return sizes
+
+
+class AssetManifest:
+    """Source name -> fingerprinted name, read from the last build."""
+
+    def __init__(self, static_folder):
+        self.dist = os.path.join(static_folder, DIST_DIR)
+        try:
+            with open(os.path.join(self.dist, MANIFEST_NAME), encoding='utf-8') as f:
+                self.names = json.load(f)
+        except (OSError, ValueError):
+            self.names = {}
+
+    def url(self, filename):
+        built = self.names.get(filename)
+        if built is None:
+            return url_for('static', filename=filename)
+        return url_for('main.asset', filename=built)
+
+    def send(self, filename):
+        """A built file, precompressed when the client accepts it, cached as immutable."""
+        mimetype = mimetypes.guess_type(filename)[0]
+        for encoding, suffix in ENCODINGS:
+            if request.accept_encodings[encoding] and os.path.isfile(os.path.join(self.dist, filename + suffix)):
+                response = send_from_directory(self.dist, filename + suffix, mimetype=mimetype,
+                                               max_age=ASSET_MAX_AGE)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(self.dist, filename, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
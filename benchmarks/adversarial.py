@@ -0,0 +1,87 @@
+"""Adversarial transcript fixtures against the guarded parser.
+
+Builds pathological inputs and checks that each one ends in a clean
+TranscriptTooComplex (or a normal result) within a bounded time, instead
+of a stuck worker:
+
+    python benchmarks/adversarial.py [--timeout 5]
+
+tests/test_guard.py asserts the same cases; this script shows the timings.
+Cases: a PDF with hundreds of pages, a page with tens of thousands of
+lines, a transcript parsed under a timeout too short to finish, and
+course-code sections followed by filler with no names or credit block,
+where extract_courses' name scan is capped per section.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcript import (  # noqa: E402
+    parse_transcript_guarded, extract_courses, TranscriptTooComplex,
+)
+from tests.conftest import write_pdf  # noqa: E402
+
+MAX_PAGES = 20
+MAX_LINES = 20000
+
+
+def transcript_lines():
+    lines = ['Student Id :', '431000123', 'Student Name :', 'Test Student', 'Second Semester 2025/2026']
+    for i in range(40):
+        lines += [f'CS {100 + i}', 'A', f'Course number {i}', '3']
+    return lines
+
+
+def run_case(label, path, **limits):
+    start = time.perf_counter()
+    try:
+        result = parse_transcript_guarded(path, max_pages=MAX_PAGES, max_lines=MAX_LINES, **limits)
+        outcome = f'parsed ({len(result.courses)} courses)'
+    except TranscriptTooComplex as e:
+        outcome = f'TranscriptTooComplex: {e}'
+    print(f'{label:<28}{(time.perf_counter() - start) * 1000:>9.0f} ms  {outcome}')
+
+
+def name_scan_lines(levels, tail):
+    """Sections of 2^k, ..., 2, 1 codes, then filler that is never a name or credit value.
+
+    Each section needs more names than all later sections have codes, so
+    without the cap every section's name scan reads to the end of the tail.
+    """
+    lines = []
+    for k in reversed(range(levels)):
+        lines += [f'CS {100 + i % 900}' for i in range(2 ** k)] + ['xx'] * 11
+    return lines + ['xx'] * tail
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--timeout', type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = {
+            'many pages (500)': [transcript_lines()] * 500,
+            'many lines (60k on 1 page)': [[f'line {i}' for i in range(60000)]],
+            'normal transcript': [transcript_lines()],
+        }
+        for label, pages in fixtures.items():
+            path = os.path.join(tmp, f'{len(pages)}-{len(pages[0])}.pdf')
+            write_pdf(path, pages)
+            run_case(label, path, timeout=args.timeout)
+        run_case('timeout too short', path, timeout=0.001)
+
+    print()
+    print(f"{'extract_courses sections':<28}{'lines':>9}{'ms':>9}")
+    for levels in (8, 10, 12, 14):
+        lines = name_scan_lines(levels, tail=100000)
+        start = time.perf_counter()
+        extract_courses(lines)
+        print(f'{levels:<28}{len(lines):>9}{(time.perf_counter() - start) * 1000:>9.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+"""Golden-corpus regression and throughput check for the transcript parser.
+
+benchmarks/golden/ holds one synthetic PDF per transcript layout the
+parser supports, plus the expected output of parse_transcript,
+extract_courses and detect_current_semester for it. Running the harness
+re-parses every PDF and prints field-level differences and parse times:
+
+    python benchmarks/golden.py [--runs 20]   # compare; exit status 1 on any diff
+    python benchmarks/golden.py --update      # accept the current output as expected
+    python benchmarks/golden.py --build       # regenerate the PDFs from LAYOUTS, then --update
+
+The PDFs are committed, so a PyMuPDF upgrade that changes text extraction
+shows up as a diff too. Only rebuild them when a layout is added or changed.
+
+Layouts drawn as a table (a tuple per row) are read by
+extract_courses_from_layout; the others fall back to extract_courses, so
+the snapshot of each shows which engine parse_transcript used.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcript import (parse_transcript, split_lines, extract_courses, extract_courses_from_layout,  # noqa: E402
+                        textpage_words, detect_current_semester)
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden')
+
+# One entry per layout: a list of pages, each a list of text lines in reading order.
+# A tuple is a table row, its cells drawn at TABLE_COLUMNS: code, name,
+# credits, grade; '\n' wraps a cell onto the next line. All names and
+# numbers are made up.
+TABLE_COLUMNS = (40, 110, 330, 380)
+
+LAYOUTS = {
+    # English export: each value on the line before its label, Major variant A,
+    # W grades, AHRS credits, two course pages
+    'english_value_before_label': [
+        ['431000123', 'Student Id :', 'AHMED ALI SALEH', 'Student Name :', 'Computing and Information Technology',
+         'Faculty :', 'Computer Science', 'Major  :', 'Degree : Bachelor',
+         'First Semester 2024/2025',
+         'CS 101', 'CS 102', 'MATH 101', 'ENG 101',
+         'A+', 'B', 'W', 'C+',
+         'Introduction to Programming', 'Discrete Structures', 'Calculus One', 'English Language One',
+         '3', '3', '4', '3', '1.00', '2.00'],
+        ['Second Semester 2024/2025',
+         'CS 201', 'CS 202', 'MATH 201',
+         'B+', 'A',
+         'Data Structures', 'Computer Organization', 'Linear Algebra',
+         '3', '3', '3', '96.00', '3.50', 'Cumulative', '3.62', 'AHRS',
+         'Second Semester 2025/2026'],
+    ],
+    # English export, page 2 style: "Major :" first, value on the next line
+    'english_major_variant_b': [
+        ['441000456', 'Student Id :', 'SARA KHALID', 'Student Name :', 'Computing', 'Faculty :',
+         'Major :', 'Information Technology', 'Degree : Diploma',
+         'First Semester 2025/2026',
+         'IT 110', 'IT 120', 'MATH 110',
+         'B', 'WF', 'A',
+         'Computer Essentials', 'Web Basics', 'College Mathematics',
+         '3', '3', '3', '9.00', '3.10', 'Cumulative', '3.10', 'AHRS',
+         'Second Semester 2025/2026',
+         'IT 210', 'IT 220',
+         'Networks One', 'Databases One',
+         '3', '3'],
+    ],
+    # Arabic export: "label : value" lines, standalone Arabic grades and ع
+    'arabic_label_colon': [
+        ['المملكة العربية السعودية', 'جامعة تبوك', 'السجل الأكاديمي',
+         'الاسم : محمد بن بن عبدالله العتيبي', 'الرقم الجامعي : 421000789',
+         'الكلية : كلية الحاسبات وتقنية المعلومات', 'التخصص : علوم الحاسب 421000789',
+         'الدرجة : البكالوريوس',
+         'هـ1445 الفصل الأول',
+         'CS 101', 'CS 102', 'MATH 101',
+         'أ', 'ب', 'ع',
+         'مقدمة في البرمجة', 'تراكيب محددة', 'تفاضل وتكامل',
+         '3', '3', '4',
+         'هـ1445 الفصل الثاني',
+         'CS 201', 'CS 211',
+         '+ب', 'ج',
+         'هياكل البيانات', 'تنظيم الحاسب',
+         '3', '3',
+         'هـ1446 الفصل الأول',
+         'CS 301', 'CS 321',
+         'نظم التشغيل', 'شبكات الحاسب',
+         '3', '3',
+         'المعدل التراكمي 3.45',
+         'مجموع الساعات: 132', 'الساعات المكتسبة: 120', 'الساعات المتبقية: 12'],
+    ],
+    # Older Arabic export: name before its label, ID on the next line, ع inline
+    # with the course code, cumulative GPA as a standalone value
+    'arabic_inline_withdrawal': [
+        ['جامعة تبوك',
+         'فاطمة سعد الحربي: اسم الطالبة', 'الرقم الأكاديمي', '391000321',
+         'الكلية : كلية الحاسبات وتقنية المعلومات', 'التخصص : هندسة الحاسب',
+         'دبلوم متوسط',
+         'هـ1444 الفصل الأول', 'هـ1444 الفصل الثاني', 'هـ1445 الفصل الأول', 'هـ1445 الفصل الصيفي',
+         'CE 101 ع', 'CE 102 ع',
+         'هـ1446 الفصل الثاني',
+         'CE 201', 'CE 202', 'CE 203',
+         'أ',
+         'دوائر كهربائية', 'منطق رقمي', 'برمجة متقدمة',
+         '4', '3', '3',
+         'المعدل', 'تراكمي', '4.12'],
+    ],
+    # English table export: one row per course, a wrapped name, current
+    # courses with an empty grade cell
+    'english_table_rows': [
+        ['451000654', 'Student Id :', 'OMAR FAHAD', 'Student Name :', 'Computing', 'Faculty :',
+         'Software Engineering', 'Major  :', 'Degree : Bachelor',
+         'First Semester 2024/2025',
+         ('SE 101', 'Introduction to Software\nEngineering Practice', '3', 'A'),
+         ('CS 101', 'Introduction to Programming', '3', 'B+'),
+         ('MATH 101', 'Calculus One', '4', 'W'),
+         'Second Semester 2024/2025',
+         ('SE 201', 'Requirements Engineering', '3', 'C+'),
+         ('CS 201', 'Data Structures', '3', 'A+'),
+         '13.00', '3.21', 'Cumulative', '3.21', 'AHRS',
+         'First Semester 2025/2026',
+         ('SE 301', 'Software Design and\nArchitecture', '3', ''),
+         ('CS 310', 'Operating Systems', '3', '')],
+    ],
+    # Arabic table export: Arabic names and grades in table rows, ع for a withdrawal
+    'arabic_table_rows': [
+        ['جامعة تبوك', 'السجل الأكاديمي',
+         'الاسم : نورة سالم القحطاني', 'الرقم الجامعي : 441000852',
+         'الكلية : كلية الحاسبات وتقنية المعلومات', 'التخصص : نظم المعلومات',
+         'الدرجة : البكالوريوس',
+         'هـ1446 الفصل الأول',
+         ('IS 101', 'مقدمة في نظم المعلومات', '3', 'أ'),
+         ('IS 102', 'أساسيات قواعد البيانات', '3', 'ع'),
+         ('MATH 101', 'تفاضل وتكامل', '4', '+ب'),
+         'هـ1447 الفصل الثاني',
+         ('IS 201', 'تحليل وتصميم النظم\nالمتقدمة', '3', ''),
+         ('IS 221', 'إدارة المشاريع', '3', ''),
+         'المعدل التراكمي 3.90',
+         'مجموع الساعات: 130', 'الساعات المكتسبة: 10', 'الساعات المتبقية: 120'],
+    ],
+    # Arabic table export with names wrapped over three lines; a wide gap
+    # splits one wrapped line into two cells, which read right to left
+    'arabic_wrapped_names': [
+        ['جامعة تبوك', 'السجل الأكاديمي',
+         'الاسم : ريم خالد الشهري', 'الرقم الجامعي : 431000975',
+         'الكلية : كلية الحاسبات وتقنية المعلومات', 'التخصص : علوم الحاسب',
+         'الدرجة : البكالوريوس',
+         'هـ1446 الفصل الأول',
+         ('CS 231', 'البرمجة الكائنية\nوالأنماط      التصميمية\nالمتقدمة', '3', 'ب'),
+         ('CS 241', 'إدارة المشاريع', '3', 'أ'),
+         'هـ1446 الفصل الثاني',
+         ('CS 341', 'أمن المعلومات\nوالشبكات', '3', ''),
+         'المعدل التراكمي 3.40',
+         'مجموع الساعات: 136', 'الساعات المكتسبة: 60', 'الساعات المتبقية: 76'],
+    ],
+}
+
+
+# ── Building the PDFs ──
+
+def _arabic_font():
+    import fitz
+    return fitz.Font(script=6)  # MuPDF's bundled Noto Naskh Arabic
+
+
+def _show(page, font, lines, fontsize=9):
+    """Write lines with the given font and return the text MuPDF extracts for them."""
+    import fitz
+    writer = fitz.TextWriter(page.rect)
+    for n, line in enumerate(lines):
+        writer.append((40, 40 + n * 14), line, font=font, fontsize=fontsize)
+    writer.write_text(page)
+    return [unicodedata.normalize('NFKC', l) for l in page.get_text().split('\n')]
+
+
+def _visual_order(lines):
+    """Strings that extract as the given Arabic lines.
+
+    MuPDF lays Arabic out right to left, so extraction returns the visual
+    order; applying the same reordering to that gives back the logical text.
+    """
+    import fitz
+    doc = fitz.open()
+    return _show(doc.new_page(height=60 + 14 * len(lines)), _arabic_font(), lines)[:len(lines)]
+
+
+def _write_line(writer, x, y, line, arabic, latin):
+    # Latin words go in their own spans: the Arabic font has no Latin letters
+    runs = [line] if line.isascii() else re.findall(r'[A-Za-z][A-Za-z0-9 ]*|[^A-Za-z]+', line)
+    for run in runs:
+        if run.isascii():
+            writer.append((x, y), run, font=latin, fontsize=9)
+            x += latin.text_length(run, 9)
+        else:
+            visual = _visual_order([run])[0]
+            writer.append((x, y), visual, font=arabic, fontsize=9)
+            x += arabic.text_length(visual, 9)
+
+
+def build_pdf(path, pages):
+    import fitz
+    arabic = _arabic_font()
+    latin = fitz.Font('helv')
+    doc = fitz.open()
+    for lines in pages:
+        height = sum(max(l.count('\n') for l in line) + 1 if isinstance(line, tuple) else 1 for line in lines)
+        page = doc.new_page(height=max(842, 80 + 14 * height))
+        writer = fitz.TextWriter(page.rect)
+        y = 40
+        for line in lines:
+            cells = line if isinstance(line, tuple) else (line,)
+            for x, cell in zip(TABLE_COLUMNS, cells):
+                for n, part in enumerate(cell.split('\n') if cell else ()):
+                    _write_line(writer, x, y + n * 14, part, arabic, latin)
+            y += 14 * (max(cell.count('\n') for cell in cells) + 1)
+        writer.write_text(page)
+    doc.subset_fonts()
+    doc.save(path, garbage=4, deflate=True)
+    doc.close()
+
+
+# ── Expected output ──
+
+def snapshot(path):
+    """Everything the parser extracts from one PDF, as JSON-compatible data."""
+    import fitz
+    transcript = parse_transcript(path)
+    lines = split_lines(transcript.raw_text)
+    fields = transcript.to_dict()
+    fields.pop('raw_text')
+    with fitz.open(path) as doc:
+        layout_courses = extract_courses_from_layout(
+            [textpage_words(page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)) for page in doc])
+    return {
+        'parse_transcript': fields,
+        'extract_courses': [c.to_dict() for c in extract_courses(lines)],
+        'extract_courses_from_layout': layout_courses and [c.to_dict() for c in layout_courses],
+        'detect_current_semester': list(detect_current_semester(lines)),
+    }
+
+
+def diff(expected, actual, path=''):
+    """Field-level differences as (path, expected, actual)."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        out = []
+        for key in sorted(set(expected) | set(actual), key=str):
+            out += diff(expected.get(key), actual.get(key), f'{path}.{key}' if path else key)
+        return out
+    if isinstance(expected, list) and isinstance(actual, list) and len(expected) == len(actual):
+        out = []
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            out += diff(e, a, f'{path}[{i}]')
+        return out
+    return [] if expected == actual else [(path, expected, actual)]
+
+
+def parse_time_ms(path, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        parse_transcript(path, keep_raw_text=False)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20, help='parses per file for the timing')
+    parser.add_argument('--update', action='store_true', help='write the current output as expected')
+    parser.add_argument('--build', action='store_true', help='regenerate the PDFs, then --update')
+    args = parser.parse_args()
+
+    if args.build:
+        os.makedirs(CORPUS, exist_ok=True)
+        for name, pages in LAYOUTS.items():
+            build_pdf(os.path.join(CORPUS, f'{name}.pdf'), pages)
+        args.update = True
+
+    failures = 0
+    print(f"{'layout':<30}{'diffs':>6}{'parse ms':>10}")
+    for name in sorted(LAYOUTS):
+        pdf = os.path.join(CORPUS, f'{name}.pdf')
+        expected_path = os.path.join(CORPUS, f'{name}.json')
+        actual = snapshot(pdf)
+        if args.update:
+            with open(expected_path, 'w', encoding='utf-8') as f:
+                json.dump(actual, f, ensure_ascii=False, indent=2)
+                f.write('\n')
+        with open(expected_path, encoding='utf-8') as f:
+            differences = diff(json.load(f), actual)
+        failures += bool(differences)
+        print(f'{name:<30}{len(differences):>6}{parse_time_ms(pdf, args.runs):>10.2f}')
+        for field, want, got in differences:
+            print(f'    {field}: expected {want!r}, got {got!r}')
+
+    if failures:
+        print(f'{failures} layout(s) differ from the golden output')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Memory benchmark: cached parse results as dicts vs slotted dataclasses.
+
+Parses the same transcript N times (fresh strings each time, as with N
+students) and measures what the retained results cost with tracemalloc:
+
+    python benchmarks/memory.py TRANSCRIPT.pdf [-n 500]
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcript import parse_transcript  # noqa: E402
+
+
+def as_legacy_dict(t):
+    """The 17-key dict plus per-course dicts returned before Transcript existed."""
+    return {
+        'student_name': t.student_name, 'student_id': t.student_id, 'college': t.college,
+        'department': t.department, 'degree': t.degree, 'gpa': t.gpa,
+        'total_credits_completed': t.total_credits_completed, 'total_credits_plan': t.total_credits_plan,
+        'remaining_credits': t.remaining_credits, 'current_semester_courses': [],
+        'withdrawal_count': t.withdrawal_count, 'withdrawn_courses': list(t.withdrawn_courses),
+        'semesters_count': t.semesters_count, 'is_first_year': t.is_first_year,
+        'expected_graduate': t.expected_graduate, 'all_courses': [], 'raw_text': t.raw_text,
+        'courses': [{'code': c.code, 'name': c.name, 'grade': c.grade, 'current': c.current} for c in t.courses],
+        'semester': t.semester, 'year': t.year,
+    }
+
+
+def measure(build, n):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build() for _ in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pdf')
+    parser.add_argument('-n', type=int, default=500)
+    args = parser.parse_args()
+
+    parse_transcript(args.pdf)  # warm up imports and the regex cache
+    variants = (
+        ('dict + raw_text', lambda: as_legacy_dict(parse_transcript(args.pdf))),
+        ('Transcript + raw_text', lambda: parse_transcript(args.pdf)),
+        ('Transcript, raw_text dropped', lambda: parse_transcript(args.pdf, keep_raw_text=False)),
+    )
+    baseline = None
+    print(f"{'variant':<32}{'bytes/transcript':>18}{'vs dict':>10}")
+    for name, build in variants:
+        per_item = measure(build, args.n)
+        baseline = baseline or per_item
+        print(f"{name:<32}{per_item:>18,.0f}{per_item / baseline:>10.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Normalization benchmark on synthetic Arabic transcript text.
+
+Compares a plain unicodedata.normalize('NFKC', ...) of the whole document
+with transcript.text.normalize_text for text extracted as Arabic
+Presentation Forms (shaped PDFs) and as standard Arabic:
+
+    python benchmarks/normalize.py [--pages 4] [--repeat 200] [PDF ...]
+
+PDF files given on the command line are also parsed end to end.
+"""
+import argparse
+import os
+import sys
+import timeit
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcript import parse_transcript  # noqa: E402
+from transcript.text import normalize_text, normalize_line  # noqa: E402
+
+HEADER = [
+    'المملكة العربية السعودية', 'وزارة التعليم', 'جامعة تبوك', 'عمادة القبول والتسجيل',
+    'السجل الأكاديمي', 'الاسم : محمد بن عبدالله بن سعد', 'الرقم الجامعي : 431000123',
+    'الكلية : كلية الحاسبات وتقنية المعلومات', 'التخصص : علوم الحاسب', 'الدرجة : البكالوريوس',
+]
+SEMESTER = [
+    'هـ1446 الفصل الأول', 'CS 101', 'CS 102', 'MATH 201', 'أ', 'ب', 'ع',
+    'مقدمة في البرمجة', 'هياكل البيانات', 'التفاضل والتكامل', '3', '3', '4',
+    'المعدل الفصلي 3.75', 'المعدل التراكمي 3.80', 'الساعات المكتسبة 45',
+]
+
+
+def _shaping_table():
+    """Map standard Arabic letters to one of their presentation-form code points."""
+    table = {}
+    for cp in range(0xFE70, 0xFF00):
+        base = unicodedata.normalize('NFKC', chr(cp))
+        if len(base) == 1 and base not in table and '؀' <= base <= 'ۿ':
+            table[base] = chr(cp)
+    return str.maketrans(table)
+
+
+def build_text(pages, shaped):
+    lines = []
+    for _ in range(pages):
+        lines += HEADER + SEMESTER * 3
+    text = '\n'.join(lines)
+    return text.translate(_shaping_table()) if shaped else text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('pdfs', nargs='*')
+    args = parser.parse_args()
+
+    print(f"{'input':<22}{'NFKC ms':>10}{'normalize_text ms':>20}{'speedup':>10}")
+    for label, shaped in (('presentation forms', True), ('standard Arabic', False)):
+        text = build_text(args.pages, shaped)
+        assert normalize_text(text) == unicodedata.normalize('NFKC', text)
+        normalize_line.cache_clear()
+        normalize_text(text)  # first transcript fills the header memo
+        nfkc = timeit.timeit(lambda: unicodedata.normalize('NFKC', text), number=args.repeat)
+        fast = timeit.timeit(lambda: normalize_text(text), number=args.repeat)
+        per = 1000 / args.repeat
+        print(f"{label:<22}{nfkc * per:>10.3f}{fast * per:>20.3f}{nfkc / fast:>9.1f}x")
+
+    for path in args.pdfs:
+        parse_transcript(path)
+        seconds = timeit.timeit(lambda: parse_transcript(path), number=20) / 20
+        print(f"parse_transcript {os.path.basename(path)}: {seconds * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
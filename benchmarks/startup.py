@@ -0,0 +1,63 @@
+"""Startup benchmark: cold import of the app module and first-request latency.
+
+Each sample runs in a fresh interpreter so nothing is shared between runs:
+
+    python benchmarks/startup.py [--runs 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; prints timings in milliseconds as JSON
+CHILD = r'''
+import json, time
+t0 = time.perf_counter()
+import app as app_module
+t1 = time.perf_counter()
+flask_app = app_module.create_app()
+t2 = time.perf_counter()
+client = flask_app.test_client()
+response = client.get('/')
+t3 = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({
+    'import': (t1 - t0) * 1000,
+    'create_app': (t2 - t1) * 1000,
+    'first_request': (t3 - t2) * 1000,
+    'total': (t3 - t0) * 1000,
+    'fitz_loaded': __import__('sys').modules.get('fitz') is not None,
+}))
+'''
+
+
+def run_once(workdir):
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE='1',
+               DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    out = subprocess.run([sys.executable, '-c', CHILD], cwd=workdir, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        samples = [run_once(workdir) for _ in range(args.runs)]
+
+    print(f"{'stage':<15}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for stage in ('import', 'create_app', 'first_request', 'total'):
+        values = [s[stage] for s in samples]
+        print(f"{stage:<15}{statistics.median(values):>12.1f}{min(values):>10.1f}{max(values):>10.1f}")
+    print(f"PyMuPDF imported at startup: {any(s['fitz_loaded'] for s in samples)}")
+
+
+if __name__ == '__main__':
+    main()
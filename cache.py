@@ -0,0 +1,303 @@
+"""Shared cache and server-side sessions.
+
+With REDIS_URL set, every gunicorn worker (and the ASGI server) talks to
+the same Redis-protocol server, so a transcript parsed by one worker is a
+hit in all of them and sessions live server-side. Without it a per-process
+in-memory cache stands in for local development.
+
+Values are pickled in both backends, so a cache hit is always a fresh copy
+that callers may modify. The caches also hold the admission-control state
+(token buckets and concurrency slots); on Redis that state is updated by
+Lua scripts, so it is shared and atomic across workers.
+"""
+import pickle
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+
+class CacheStats:
+    """Hit/miss counters of one cache namespace in this process."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hits, misses):
+        # Plain int updates: a lost increment under contention is fine for metrics
+        self.hits += hits
+        self.misses += misses
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None}
+
+
+class MemoryCache:
+    """In-process LRU cache with TTLs; each namespace is its own bounded store."""
+
+    shared = False
+
+    def __init__(self, namespace='', max_entries=1024):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._store = OrderedDict()  # key -> (expires_at or None, pickled value)
+        self._buckets = {}  # key -> (tokens, last refill)
+        self._slots = {}  # key -> {token: lease expiry}
+        self._lock = threading.Lock()
+
+    def child(self, namespace, max_entries=None):
+        return MemoryCache(f'{self.namespace}{namespace}:', max_entries or self.max_entries)
+
+    def _lookup(self, key, now):
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at is not None and expires_at <= now:
+            del self._store[key]
+            return None
+        self._store.move_to_end(key)
+        return payload
+
+    def get(self, key, default=None):
+        with self._lock:
+            payload = self._lookup(key, time.monotonic())
+        self.stats.record(payload is not None, payload is None)
+        return default if payload is None else pickle.loads(payload)
+
+    def get_many(self, keys):
+        """Values of the keys that are cached, as a dict."""
+        now = time.monotonic()
+        with self._lock:
+            found = {key: payload for key in keys
+                     if (payload := self._lookup(key, now)) is not None}
+        self.stats.record(len(found), len(keys) - len(found))
+        return {key: pickle.loads(payload) for key, payload in found.items()}
+
+    def set(self, key, value, ttl=None):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._store[key] = (expires_at, payload)
+            self._store.move_to_end(key)
+            while len(self._store) > self.max_entries:
+                self._store.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._store.pop(key, None)
+
+    def take_token(self, key, rate, burst):
+        """Take one token from a bucket refilled at rate per second.
+
+        Returns 0 when a token was taken, otherwise the seconds until one is available.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_entries:
+                # Forget buckets that have refilled: they are back at the default state
+                self._buckets = {k: (t, ts) for k, (t, ts) in self._buckets.items()
+                                 if t + (now - ts) * rate < burst}
+        return wait
+
+    def acquire_slot(self, key, limit, lease):
+        """Take one of limit slots, held for at most lease seconds; None when all are taken."""
+        now = time.monotonic()
+        with self._lock:
+            holders = self._slots.setdefault(key, {})
+            for token, expires_at in list(holders.items()):
+                if expires_at <= now:
+                    del holders[token]
+            if len(holders) >= limit:
+                return None
+            token = secrets.token_hex(8)
+            holders[token] = now + lease
+        return token
+
+    def release_slot(self, key, token):
+        with self._lock:
+            self._slots.get(key, {}).pop(token, None)
+
+
+# KEYS[1]: bucket hash; ARGV: rate per second, burst. Returns the wait in seconds as a string.
+TOKEN_BUCKET_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local last = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - last) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+# KEYS[1]: sorted set of holders scored by acquire time; ARGV: limit, lease seconds, token
+ACQUIRE_SLOT_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local lease = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - lease)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[1]) then
+  return 0
+end
+redis.call('ZADD', KEYS[1], now, ARGV[3])
+redis.call('EXPIRE', KEYS[1], math.ceil(lease))
+return 1
+"""
+
+
+class RedisCache:
+    """Cache on a Redis-protocol server; keys are prefixed with the namespace."""
+
+    shared = True
+
+    def __init__(self, client, namespace=''):
+        self.client = client
+        self.namespace = namespace
+        self.stats = CacheStats()
+        self._token_bucket = client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._acquire_slot = client.register_script(ACQUIRE_SLOT_SCRIPT)
+
+    def child(self, namespace, max_entries=None):
+        # Size is bounded by the server's maxmemory policy, not per namespace
+        return RedisCache(self.client, f'{self.namespace}{namespace}:')
+
+    def get(self, key, default=None):
+        payload = self.client.get(self.namespace + key)
+        self.stats.record(payload is not None, payload is None)
+        return default if payload is None else pickle.loads(payload)
+
+    def get_many(self, keys):
+        """Values of the keys that are cached, as a dict (one round trip)."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.get(self.namespace + key)
+        found = {key: payload for key, payload in zip(keys, pipe.execute()) if payload is not None}
+        self.stats.record(len(found), len(keys) - len(found))
+        return {key: pickle.loads(payload) for key, payload in found.items()}
+
+    def set(self, key, value, ttl=None):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self.client.set(self.namespace + key, payload, ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(self.namespace + key)
+
+    def take_token(self, key, rate, burst):
+        """Take one token from a bucket refilled at rate per second.
+
+        Returns 0 when a token was taken, otherwise the seconds until one is available.
+        """
+        return float(self._token_bucket(keys=[self.namespace + key], args=[rate, burst]))
+
+    def acquire_slot(self, key, limit, lease):
+        """Take one of limit slots, held for at most lease seconds; None when all are taken."""
+        token = secrets.token_hex(8)
+        if self._acquire_slot(keys=[self.namespace + key], args=[limit, lease, token]):
+            return token
+        return None
+
+    def release_slot(self, key, token):
+        self.client.zrem(self.namespace + key, token)
+
+
+def create_cache(url=None, namespace='withdrawals:'):
+    """Redis-backed cache for a redis:// URL, in-memory cache otherwise."""
+    if not url:
+        return MemoryCache(namespace)
+    try:
+        import redis  # only needed when a shared cache is configured
+    except ImportError:
+        raise RuntimeError('REDIS_URL is set but the redis package is not installed')
+    return RedisCache(redis.Redis.from_url(url), namespace)
+
+
+class CacheSession(CallbackDict, SessionMixin):
+    """Session data stored in the cache; the cookie only carries the signed id."""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class CacheSessionInterface(SessionInterface):
+    """Server-side sessions in a cache namespace, expiring with the session lifetime."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='cache-session')
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie and app.secret_key:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            if sid:
+                data = self.cache.get(sid)
+                if data is not None:
+                    return CacheSession(data, sid=sid)
+        return CacheSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified:
+                self.cache.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+                response.vary.add('Cookie')
+            return
+
+        response.vary.add('Cookie')
+        if not self.should_set_cookie(app, session):
+            return
+
+        self.cache.set(session.sid, dict(session), ttl=app.permanent_session_lifetime.total_seconds())
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode(),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
@@ -0,0 +1,84 @@
+"""Per-college configuration: one deployment serves every college.
+
+colleges.json (or the file named by COLLEGES_FILE) lists the colleges; the
+first one is the default, used for uploads that name no college and for
+rows created before colleges existed:
+
+    {"colleges": [
+        {"id": "computing",
+         "name": "كلية الحاسبات وتقنية المعلومات",
+         "name_en": "Faculty of Computers and Information Technology",
+         "majors": ["علوم الحاسب", "تقنية المعلومات", "هندسة الحاسب"],
+         "max_withdrawals": {"بكالوريوس": 6, "دبلوم متوسط": 3, "دبلوم مشارك": 2}}
+    ]}
+
+The id is stored in the college_id column of students, withdrawal_requests
+and admin_events, so it must not change once the college has data.
+max_withdrawals overrides the university limits in transcript.rules per
+degree; degrees left out keep the university limit. Each college's admin
+password is read from ADMIN_PASSWORD_<ID> (see app.admin_password).
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from transcript.rules import MAX_WITHDRAWALS
+
+# Stored in the database and used in cache keys and environment variable names
+COLLEGE_ID = re.compile(r'^[a-z][a-z0-9_]{0,31}$')
+
+
+@dataclass(frozen=True)
+class College:
+    id: str
+    name: str
+    name_en: str = ''
+    majors: Tuple[str, ...] = ()
+    max_withdrawals: Dict[str, int] = field(default_factory=lambda: dict(MAX_WITHDRAWALS))
+
+
+class Colleges:
+    """The configured colleges by id, in file order; the first is the default."""
+
+    def __init__(self, colleges):
+        if not colleges:
+            raise ValueError('no colleges configured')
+        self.by_id = {}
+        for college in colleges:
+            if college.id in self.by_id:
+                raise ValueError(f'college {college.id!r} is configured twice')
+            self.by_id[college.id] = college
+        self.default = colleges[0]
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __getitem__(self, college_id):
+        """The college with this id; rows of a college since removed from the file show as the default."""
+        return self.by_id.get(college_id, self.default)
+
+    def get(self, college_id) -> Optional[College]:
+        return self.by_id.get(college_id)
+
+
+def _college(entry):
+    college_id = entry.get('id', '')
+    if not COLLEGE_ID.match(college_id):
+        raise ValueError(f'invalid college id {college_id!r} (lowercase letters, digits and _, at most 32)')
+    if not entry.get('name'):
+        raise ValueError(f'college {college_id!r} has no name')
+    limits = dict(MAX_WITHDRAWALS)
+    limits.update({degree: int(limit) for degree, limit in entry.get('max_withdrawals', {}).items()})
+    return College(id=college_id, name=entry['name'], name_en=entry.get('name_en', ''),
+                   majors=tuple(entry.get('majors', ())), max_withdrawals=limits)
+
+
+def load_colleges(path) -> Colleges:
+    """Read and check the college configuration file; raises ValueError when it is malformed."""
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    return Colleges([_college(entry) for entry in config.get('colleges', ())])
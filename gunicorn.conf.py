@@ -0,0 +1,66 @@
+"""Gunicorn settings for production (Procfile / railway.json).
+
+Workers and threads are sized from the CPU count and the memory available
+to the container. Every value can be overridden through the environment.
+"""
+import os
+
+# Rough resident size of one worker after parsing a few transcripts with PyMuPDF
+WORKER_MEMORY_MB = int(os.environ.get('GUNICORN_WORKER_MEMORY_MB', '200'))
+
+
+def _available_memory_mb():
+    """Memory limit of the container (cgroup v2/v1), falling back to physical RAM."""
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        # "max" or a huge sentinel means no cgroup limit
+        if value.isdigit() and int(value) < 1 << 50:
+            return int(value) // (1024 * 1024)
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return 1024
+
+
+def _default_workers():
+    cpu_workers = 2 * (os.cpu_count() or 1) + 1
+    # Leave a quarter of the memory for the master, page cache and parse spikes
+    memory_workers = max(1, int(_available_memory_mb() * 0.75) // WORKER_MEMORY_MB)
+    return max(1, min(cpu_workers, memory_workers))
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Threads let a worker keep serving polls and downloads while one thread parses
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', _default_workers()))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+
+# Import Flask, SQLAlchemy, the app and the transcript package (its compiled
+# patterns) once in the master and share the pages after fork. PyMuPDF is not
+# among them: only the forkserver that starts the guarded parses and previews
+# imports it (and each worker, when PARSE_TIMEOUT=0 parses in-process).
+preload_app = True
+
+# Recycle workers to bound memory growth from fitz allocations
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '500'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '50'))
+
+# Large transcripts can take tens of seconds to parse
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    """Drop database connections inherited from the preloaded master."""
+    from app import db
+    with server.app.wsgi().app_context():
+        db.engine.dispose(close=False)
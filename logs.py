@@ -0,0 +1,158 @@
+"""Structured JSON logs, written off the request path.
+
+configure_logging() routes every logger through a QueueHandler: a request
+thread only renders the message and enqueues the record, and a background
+writer thread turns records into JSON lines and writes them in batches
+(flushed every LOG_FLUSH_INTERVAL seconds, or at once for warnings and
+errors). Extra fields passed with `extra={...}` become top-level keys.
+"""
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler
+
+# Records written per batch at most, and seconds a partial batch may wait
+LOG_BATCH_SIZE = 100
+LOG_FLUSH_INTERVAL = 1.0
+
+# LogRecord attributes that are not user-supplied extra fields
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, extra fields, exception."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and record.exc_info[0] is not None:
+            exc_type, exc, tb = record.exc_info
+            entry['exc_type'] = exc_type.__name__
+            entry['exc_message'] = str(exc)
+            entry['traceback'] = ''.join(traceback.format_exception(exc_type, exc, tb))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _AsyncHandler(QueueHandler):
+    """QueueHandler whose writer thread is (re)started in whichever process logs.
+
+    Threads do not survive fork, so a handler set up in a pre-forking server's
+    master starts a fresh writer the first time each worker logs.
+    """
+
+    def __init__(self, stream, formatter):
+        super().__init__(queue.SimpleQueue())
+        self._stream = stream
+        self._formatter = formatter
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        # Render the message now (its arguments may change later); the JSON and
+        # any traceback are formatted on the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self.queue = queue.SimpleQueue()
+                    threading.Thread(target=self._write_loop, args=(self.queue,),
+                                     name='log-writer', daemon=True).start()
+                    self._pid = os.getpid()
+        self.queue.put_nowait(record)
+
+    def flush(self):
+        """Write everything queued so far (also called by logging.shutdown at exit)."""
+        if self._pid == os.getpid():
+            done = threading.Event()
+            self.queue.put_nowait(done)
+            done.wait(timeout=2)
+
+    def _write_loop(self, records):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                record = records.get(timeout=timeout)
+            except queue.Empty:
+                record = None
+            flushed = None
+            if isinstance(record, threading.Event):
+                flushed, record = record, None
+            if record is not None:
+                try:
+                    batch.append(self._formatter.format(record))
+                except Exception:
+                    batch.append(json.dumps({'level': 'ERROR', 'message': 'unformattable log record',
+                                             'logger': record.name}))
+                deadline = deadline or time.monotonic() + LOG_FLUSH_INTERVAL
+            urgent = record is not None and record.levelno >= logging.WARNING
+            if batch and (flushed or urgent or len(batch) >= LOG_BATCH_SIZE or time.monotonic() >= deadline):
+                try:
+                    self._stream.write('\n'.join(batch) + '\n')
+                    self._stream.flush()
+                except Exception:
+                    pass  # nowhere left to report a broken log stream
+                batch = []
+                deadline = None
+            if flushed:
+                flushed.set()
+
+
+_handler = None
+
+
+def configure_logging(level='INFO', stream=None):
+    """Send all logging through the asynchronous JSON handler (idempotent)."""
+    global _handler
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _handler is None:
+        _handler = _AsyncHandler(stream or sys.stderr, JsonFormatter())
+        root.addHandler(_handler)
+    return _handler
+
+
+class StageTimer:
+    """Collects durations of named stages of a request, in milliseconds.
+
+    A stage entered more than once accumulates. After an exception, .stage
+    is the stage it was raised in.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.ms = {}
+        self.stage = None
+
+    @contextmanager
+    def __call__(self, stage):
+        self.stage = stage
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            key = f'{stage}_ms'
+            self.ms[key] = round(self.ms.get(key, 0) + (time.perf_counter() - start) * 1000, 2)
+        self.stage = None
+
+    def total(self):
+        return dict(self.ms, total_ms=round((time.perf_counter() - self.start) * 1000, 2))
@@ -0,0 +1,95 @@
+"""OCR of scanned transcripts, off the path of text-based parses.
+
+A scanned or photographed transcript has no text layer, so the parser
+raises ImageOnlyTranscript for it. Such documents are queued here instead:
+a single low-priority worker thread per process runs the OCR parse and
+stores the result in the parse cache under the document's content hash,
+where the upload's status poll and the validate step find it. OCR takes
+seconds per page, so it never holds one of the parse slots that text
+transcripts wait for.
+"""
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+FAILED = 'failed'
+
+
+class OcrQueue:
+    """Run OCR parses on a daemon worker thread, one document at a time.
+
+    parse(path, stats) returns a Transcript and fills in the parser's stats.
+    Results go to the results cache and per-document status ('pending' or
+    'failed') to the state cache; with a shared cache, a document queued by
+    several workers is parsed once.
+    """
+
+    def __init__(self, parse, results, state, result_ttl, pending_ttl, failed_ttl):
+        self.parse = parse
+        self.results = results
+        self.state = state
+        self.result_ttl = result_ttl
+        self.pending_ttl = pending_ttl
+        self.failed_ttl = failed_ttl
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def status(self, digest):
+        """'done', 'pending', 'failed', or None when the document is not queued anywhere."""
+        if self.results.get(digest) is not None:
+            return 'done'
+        return self.state.get(digest)
+
+    def submit(self, digest, pdf_path):
+        """Queue a document for OCR unless it is done, queued or failed recently; returns its status."""
+        status = self.status(digest)
+        if status is not None:
+            return status
+        # Marked in the shared cache, so a worker restart lets the next poll queue it again
+        self.state.set(digest, PENDING, ttl=self.pending_ttl)
+        with self._lock:
+            if digest in self._pending:
+                return PENDING
+            self._pending.add(digest)
+            # Started lazily so a pre-forked server gets one thread per worker
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='ocr-worker', daemon=True)
+                self._worker.start()
+        self._queue.put((digest, pdf_path))
+        return PENDING
+
+    def _run(self):
+        while True:
+            digest, pdf_path = self._queue.get()
+            try:
+                self.run(digest, pdf_path)
+            finally:
+                with self._lock:
+                    self._pending.discard(digest)
+                self._queue.task_done()
+
+    def run(self, digest, pdf_path):
+        """OCR one document into the results cache, unless another worker is already on it."""
+        if self.results.get(digest) is not None:
+            return
+        token = self.state.acquire_slot(f'running:{digest}', 1, self.pending_ttl)
+        if not token:
+            return
+        stats = {}
+        try:
+            transcript = self.parse(pdf_path, stats)
+        except Exception:
+            logger.exception('OCR of a scanned transcript failed', extra=dict(
+                event='ocr.failed', transcript=digest[:12], **stats))
+            self.state.set(digest, FAILED, ttl=self.failed_ttl)
+        else:
+            self.results.set(digest, transcript, ttl=self.result_ttl)
+            self.state.delete(digest)
+            logger.info('scanned transcript parsed', extra=dict(event='ocr.parsed', transcript=digest[:12], **stats))
+        finally:
+            self.state.release_slot(f'running:{digest}', token)
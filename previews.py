@@ -0,0 +1,101 @@
+"""First-page PNG previews of stored PDFs for the admin detail page.
+
+Previews are rendered once per document by a background thread and cached
+on disk under the document's content hash, so viewing a request never pays
+for rendering. The PDFs are untrusted uploads, so the rasterizing itself
+runs in a guarded child process (transcript.run_guarded) with the same kind
+of CPU and wall-clock limits as a parse, never in the server process.
+"""
+import os
+import queue
+import threading
+import logging
+import uuid
+
+from transcript import run_guarded
+
+logger = logging.getLogger(__name__)
+
+# Rendered preview width in pixels
+PREVIEW_WIDTH = 360
+
+# Limits of the rendering child: wall-clock seconds (CPU seconds are the same)
+PREVIEW_TIMEOUT = 15
+
+
+def render_first_page(pdf_path, png_path):
+    """Render the first page of a PDF to a PNG (runs in the guarded child)."""
+    import fitz  # PyMuPDF, preloaded in the forkserver
+    doc = fitz.open(pdf_path)
+    try:
+        if doc.page_count == 0:
+            return
+        page = doc[0]
+        zoom = PREVIEW_WIDTH / page.rect.width
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        tmp_path = os.path.join(os.path.dirname(png_path), f".{uuid.uuid4().hex}.tmp")
+        pix.save(tmp_path, output='png')
+        os.replace(tmp_path, png_path)
+    finally:
+        doc.close()
+
+
+class PreviewRenderer:
+    """Render first-page thumbnails on a single daemon worker thread."""
+
+    def __init__(self, cache_dir, timeout=PREVIEW_TIMEOUT):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def path_for(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.png")
+
+    def has(self, digest):
+        return os.path.exists(self.path_for(digest))
+
+    def delete(self, digest):
+        """Remove a document's preview (with the document itself)."""
+        try:
+            os.remove(self.path_for(digest))
+        except FileNotFoundError:
+            pass
+
+    def submit(self, digest, pdf_path):
+        """Queue a document for rendering unless it already has a preview."""
+        if self.has(digest):
+            return
+        with self._lock:
+            if digest in self._pending:
+                return
+            self._pending.add(digest)
+            # Started lazily so a pre-forked server gets one thread per worker
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='preview-renderer', daemon=True)
+                self._worker.start()
+        self._queue.put((digest, pdf_path))
+
+    def _run(self):
+        while True:
+            digest, pdf_path = self._queue.get()
+            try:
+                self.render(digest, pdf_path)
+            except Exception:
+                logger.exception('Failed to render preview for %s', digest)
+            finally:
+                with self._lock:
+                    self._pending.discard(digest)
+                self._queue.task_done()
+
+    def render(self, digest, pdf_path):
+        """Render the first page of a PDF to the preview cache, in a guarded child process.
+
+        Raises TranscriptTooComplex when the child hits its limits.
+        """
+        if self.has(digest) or not os.path.exists(pdf_path):
+            return  # done already, or discarded while queued
+        os.makedirs(self.cache_dir, exist_ok=True)
+        run_guarded(render_first_page, (pdf_path, self.path_for(digest)), timeout=self.timeout)
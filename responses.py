@@ -0,0 +1,125 @@
+"""JSON serialization and response compression.
+
+Arabic text is two bytes per character in UTF-8 but six as a \\uXXXX
+escape, so JSON is written as UTF-8 throughout. With orjson installed the
+app's JSON provider and dumps_json() use it; otherwise the standard
+library does the same job more slowly.
+
+compress_response() runs after every request and gzip- or
+brotli-compresses text and JSON bodies over COMPRESS_MIN_SIZE bytes for
+clients that accept it. Streams, file downloads and bodies that are
+already encoded are left alone.
+"""
+import dataclasses
+import decimal
+import gzip
+import json
+import uuid
+from datetime import date
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Smaller bodies fit in a packet or two anyway; compressing them only costs CPU
+COMPRESS_MIN_SIZE = 1024
+COMPRESSIBLE_TYPES = {'application/json', 'application/javascript', 'text/html', 'text/css',
+                      'text/javascript', 'text/plain', 'image/svg+xml'}
+GZIP_LEVEL = 6
+# Brotli quality for bodies compressed per request (11 is for build-time assets)
+BROTLI_QUALITY = 5
+
+
+def _default(o):
+    """Types the standard encoder cannot handle, converted as Flask's default provider does."""
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+def dumps_json(obj):
+    """Compact UTF-8 JSON text, for values stored in the database or sent in streams."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME).decode('utf-8')
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':'))
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that writes UTF-8 (no \\u escapes), through orjson when installed.
+
+    Output matches the default provider otherwise: sorted keys, compact
+    unless in debug, and the same conversions for dates and other types.
+    """
+
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            kwargs.setdefault('default', _default)
+            kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+            kwargs.setdefault('sort_keys', self.sort_keys)
+            return json.dumps(obj, **kwargs)
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def _choose_encoding():
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """after_request hook: compress the body when it is worth it and the client accepts it."""
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    if encoding == 'br':
+        compressed = brotli.compress(data, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(data, compresslevel=GZIP_LEVEL)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        # The encoded body is a different representation from the identity one
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
@@ -0,0 +1,93 @@
+document.addEventListener('DOMContentLoaded', function () {
+    var dashboard = document.getElementById('adminDashboard');
+    if (!dashboard) return;
+
+    var tbody = document.getElementById('requestsBody');
+    var statusFilter = dashboard.dataset.statusFilter;
+
+    // ============ Table and stats ============
+    function findRow(requestId) {
+        return tbody.querySelector('tr[data-request-id="' + requestId + '"]');
+    }
+
+    function showEmptyIfNone() {
+        if (!tbody.querySelector('tr')) {
+            tbody.innerHTML = '<tr><td colspan="14" class="empty-table">لا توجد طلبات</td></tr>';
+        }
+    }
+
+    // Replace or insert the row of a request (newest first), or drop it when it no longer matches the filters
+    function applyRow(requestId, html, visible) {
+        var existing = findRow(requestId);
+        if (!visible) {
+            if (existing) existing.remove();
+            showEmptyIfNone();
+            return;
+        }
+        var template = document.createElement('template');
+        template.innerHTML = html.trim();
+        var row = template.content.firstElementChild;
+        row.classList.add('row-updated');
+        if (existing) {
+            existing.replaceWith(row);
+        } else {
+            var empty = tbody.querySelector('.empty-table');
+            if (empty) empty.parentNode.remove();
+            var next = Array.prototype.find.call(tbody.querySelectorAll('tr[data-request-id]'), function (r) {
+                return Number(r.dataset.requestId) < requestId;
+            });
+            tbody.insertBefore(row, next || null);
+        }
+    }
+
+    function updateStats(stats) {
+        Object.keys(stats).forEach(function (key) {
+            var el = dashboard.querySelector('[data-stat="' + key + '"]');
+            if (el) el.textContent = stats[key];
+        });
+    }
+
+    // ============ Status changes without a page reload ============
+    tbody.addEventListener('submit', async function (e) {
+        var form = e.target;
+        e.preventDefault();
+        var buttons = form.querySelectorAll('button');
+        buttons.forEach(function (b) { b.disabled = true; });
+
+        try {
+            var response = await fetch(form.action, {
+                method: 'POST',
+                body: new FormData(form),
+                headers: { 'Accept': 'application/json' }
+            });
+            var result = await response.json();
+
+            if (response.ok) {
+                var visible = !statusFilter || result.request.status === statusFilter;
+                applyRow(result.request.id, result.html, visible);
+                updateStats(result.stats);
+            } else {
+                alert(result.error || 'تعذر تحديث حالة الطلب');
+                buttons.forEach(function (b) { b.disabled = false; });
+            }
+        } catch (error) {
+            // Fall back to a normal form submission
+            form.submit();
+        }
+    });
+
+    // ============ Live feed (other reviewers and new requests) ============
+    if (!window.EventSource) return;
+
+    // EventSource reconnects by itself and resumes from the last event id it saw
+    var feed = new EventSource(dashboard.dataset.eventsUrl);
+
+    feed.addEventListener('change', function (e) {
+        var event = JSON.parse(e.data);
+        applyRow(event.request.id, event.html, event.visible);
+    });
+
+    feed.addEventListener('stats', function (e) {
+        updateStats(JSON.parse(e.data));
+    });
+});
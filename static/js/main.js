@@ -98,12 +98,15 @@ document.addEventListener('DOMContentLoaded', function () {
 
         var parseBtnText = parseBtn.querySelector('.btn-text');
         var parseBtnLoading = parseBtn.querySelector('.btn-loading');
+        var loadingLabel = parseBtnLoading.querySelector('.loading-label');
+        var defaultLabel = loadingLabel.textContent;
         parseBtnText.style.display = 'none';
         parseBtnLoading.style.display = 'inline';
         parseBtn.disabled = true;
 
         var formData = new FormData();
         formData.append('transcript', fileInput.files[0]);
+        formData.append('college', document.getElementById('college').value);
 
         try {
             var response = await fetch('/parse-transcript', {
@@ -113,6 +116,14 @@ document.addEventListener('DOMContentLoaded', function () {
 
             var result = await response.json();
 
+            // Scanned transcripts are read by OCR in the background: poll until done
+            while (response.status === 202) {
+                loadingLabel.textContent = result.message;
+                await new Promise(function (resolve) { setTimeout(resolve, result.retry_after * 1000); });
+                response = await fetch(result.poll, { headers: { 'Accept': 'application/json' } });
+                result = await response.json();
+            }
+
             if (response.ok) {
                 populateStep2(result);
                 step1.classList.add('completed');
@@ -127,6 +138,7 @@ document.addEventListener('DOMContentLoaded', function () {
         } finally {
             parseBtnText.style.display = 'inline';
             parseBtnLoading.style.display = 'none';
+            loadingLabel.textContent = defaultLabel;
             parseBtn.disabled = false;
         }
     });
@@ -249,7 +261,7 @@ document.addEventListener('DOMContentLoaded', function () {
         studentInfo.innerHTML =
             '<div class="info-item"><span class="info-label">الاسم:</span><span class="info-value">' + (data.student_name || 'غير متوفر') + '</span></div>' +
             '<div class="info-item"><span class="info-label">الرقم الجامعي:</span><span class="info-value">' + (data.student_id || 'غير متوفر') + '</span></div>' +
-            '<div class="info-item"><span class="info-label">الكلية:</span><span class="info-value">كلية الحاسبات وتقنية المعلومات</span></div>' +
+            '<div class="info-item"><span class="info-label">الكلية:</span><span class="info-value">' + (data.college || 'غير متوفر') + '</span></div>' +
             '<div class="info-item"><span class="info-label">التخصص:</span><span class="info-value">' + (data.department || data.major || 'غير متوفر') + '</span></div>' +
             '<div class="info-item"><span class="info-label">الدرجة:</span><span class="info-value">' + (data.degree || 'غير متوفر') + '</span></div>' +
             '<div class="info-item"><span class="info-label">المعدل التراكمي:</span><span class="info-value">' + (data.gpa || 'غير متوفر') + '</span></div>' +
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Modules that build an app at import (asgi) must not touch a real database
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import app as webapp  # noqa: E402
+
+
+def write_pdf(path, pages):
+    """Write a PDF whose pages hold the given lists of text lines.
+
+    Pages grow (and the text shrinks) to fit long lists, so every line is extracted.
+    """
+    import fitz
+    doc = fitz.open()
+    for lines in pages:
+        fontsize = 10 if len(lines) < 500 else 1
+        page = doc.new_page(height=max(842, 80 + len(lines) * fontsize * 1.2))
+        page.insert_text((40, 60), '\n'.join(lines), fontsize=fontsize)
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+@pytest.fixture
+def app(tmp_path):
+    flask_app = webapp.create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+    })
+    with flask_app.app_context():
+        webapp.db.create_all()
+    yield flask_app
+    with flask_app.app_context():
+        webapp.db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
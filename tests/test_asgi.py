@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+import httpx
+
+import asgi
+
+
+def _get_all(asgi_app, paths):
+    async def run():
+        transport = httpx.ASGITransport(app=asgi_app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            start = time.perf_counter()
+            responses = await asyncio.gather(*(client.get(path) for path in paths))
+            return time.perf_counter() - start, responses
+    return asyncio.run(run())
+
+
+def test_delegated_requests_run_concurrently():
+    def slow_app(environ, start_response):
+        time.sleep(1)
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [b'ok']
+
+    elapsed, responses = _get_all(asgi.PooledWsgiToAsgi(slow_app, threads=4), ['/'] * 4)
+    assert [r.text for r in responses] == ['ok'] * 4
+    # One thread at a time would take 4 s
+    assert elapsed < 2
+
+
+def test_flask_routes_are_delegated():
+    elapsed, (response,) = _get_all(asgi.app, ['/'])
+    assert response.status_code == 200
+    assert 'text/html' in response.headers['content-type']
+
+
+def test_delegated_request_body_and_response():
+    closed = []
+
+    class Output(list):
+        def close(self):
+            closed.append(True)
+
+    def echo_app(environ, start_response):
+        body = environ['wsgi.input'].read()
+        start_response('201 Created', [('Content-Type', 'text/plain'), ('Content-Length', '5')])
+        return Output([body[:3], body[3:]])
+
+    async def run():
+        transport = httpx.ASGITransport(app=asgi.PooledWsgiToAsgi(echo_app, threads=2))
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            return await client.post('/', content=b'hello world')
+    response = asyncio.run(run())
+    assert response.status_code == 201
+    # Cut at the declared Content-Length, and the iterable closed as WSGI requires
+    assert response.content == b'hello'
+    assert closed == [True]
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from colleges import load_colleges
+from transcript import Transcript, validate_withdrawal
+from transcript.batch import validate_batch
+
+BACHELOR = 'بكالوريوس'
+ROWS = {
+    'degree': [BACHELOR, BACHELOR, BACHELOR, 'دبلوم متوسط'],
+    'withdrawal_count': [1, 3, 5, 2],
+    'is_first_year': [False, False, False, False],
+    'remaining_credits': [60, 60, 60, 60],
+    'semester': ['الأول'] * 4,
+    'course_code': ['CS 101'] * 4,
+}
+
+
+def _college(tmp_path):
+    path = tmp_path / 'colleges.json'
+    path.write_text(json.dumps({'colleges': [
+        {'id': 'computing', 'name': 'كلية الحاسبات'},
+        {'id': 'science', 'name': 'كلية العلوم', 'max_withdrawals': {BACHELOR: 3}},
+    ]}, ensure_ascii=False), encoding='utf-8')
+    return load_colleges(path).get('science')
+
+
+def test_batch_uses_the_college_limits(tmp_path):
+    college = _college(tmp_path)
+    default = validate_batch(**ROWS)
+    science = validate_batch(**ROWS, withdrawal_limits=college.max_withdrawals)
+    assert default.cap_exceeded.tolist() == [False, False, False, False]
+    assert science.cap_exceeded.tolist() == [False, True, True, False]
+    assert science.eligible.tolist() == [True, False, False, True]
+
+
+def test_batch_messages_match_validate_withdrawal(tmp_path):
+    college = _college(tmp_path)
+    result = validate_batch(**ROWS, withdrawal_limits=college.max_withdrawals)
+    for i in range(len(result)):
+        transcript = Transcript(degree=ROWS['degree'][i], withdrawal_count=ROWS['withdrawal_count'][i],
+                                remaining_credits=ROWS['remaining_credits'][i])
+        expected = validate_withdrawal(transcript, 'CS 101', '', 'الأول', '', '',
+                                       withdrawal_limits=college.max_withdrawals)
+        assert result.messages(i) == expected
+        assert expected['eligible'] == bool(result.eligible[i])
+    assert any('3 مقررات' in error for error in result.messages(1)['errors'])
+
+
+def test_messages_agree_with_each_rule_column():
+    base = {'degree': BACHELOR, 'withdrawal_count': 1, 'is_first_year': False, 'remaining_credits': 60,
+            'semester': 'الأول', 'previously_withdrawn': False}
+    failing = {
+        'cap_exceeded': {'withdrawal_count': 6},
+        'first_year': {'is_first_year': True},
+        'expected_graduate': {'remaining_credits': 12},
+        'previously_withdrawn': {'previously_withdrawn': True},
+        'summer': {'semester': 'الصيفي'},
+    }
+    rows = [base] + [dict(base, **change) for change in failing.values()]
+    columns = {key: [row[key] for row in rows] for key in base}
+    result = validate_batch(**columns, course_code=['CS 101'] * len(rows))
+    assert result.eligible.tolist() == [True] + [False] * len(failing)
+    for i, column in enumerate(failing, start=1):
+        assert getattr(result, column)[i]
+    for i in range(len(result)):
+        assert result.messages(i)['eligible'] == bool(result.eligible[i])
+
+
+def test_previously_withdrawn_rows_need_a_course_code():
+    with pytest.raises(ValueError):
+        validate_batch([BACHELOR], [1], [False], [60], ['الأول'], previously_withdrawn=[True])
+    with pytest.raises(ValueError):
+        validate_batch([BACHELOR], [1], [False], [60], ['الأول'], previously_withdrawn=[True], course_code=[''])
+    assert validate_batch([BACHELOR], [1], [False], [60], ['الأول'], previously_withdrawn=[False]).eligible[0]
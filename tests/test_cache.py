@@ -0,0 +1,120 @@
+import time
+
+import fakeredis
+import pytest
+from flask import Flask, session
+
+from cache import CacheSessionInterface, MemoryCache, RedisCache
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def cache(request):
+    if request.param == 'memory':
+        return MemoryCache('test:')
+    return RedisCache(fakeredis.FakeRedis(), 'test:')
+
+
+def test_token_bucket_allows_the_burst_then_waits(cache):
+    assert cache.take_token('ip', rate=1, burst=2) == 0
+    assert cache.take_token('ip', rate=1, burst=2) == 0
+    wait = cache.take_token('ip', rate=1, burst=2)
+    assert 0 < wait <= 1
+    # Buckets are per key
+    assert cache.take_token('other', rate=1, burst=2) == 0
+
+
+def test_token_bucket_refills_at_the_rate(cache):
+    assert cache.take_token('ip', rate=20, burst=1) == 0
+    assert cache.take_token('ip', rate=20, burst=1) > 0
+    time.sleep(0.1)
+    assert cache.take_token('ip', rate=20, burst=1) == 0
+
+
+def test_slots_are_limited_and_released(cache):
+    first = cache.acquire_slot('parse', limit=2, lease=30)
+    second = cache.acquire_slot('parse', limit=2, lease=30)
+    assert first and second and first != second
+    assert cache.acquire_slot('parse', limit=2, lease=30) is None
+    cache.release_slot('parse', first)
+    assert cache.acquire_slot('parse', limit=2, lease=30) is not None
+
+
+def test_slot_leases_expire(cache):
+    assert cache.acquire_slot('parse', limit=1, lease=0.2)
+    assert cache.acquire_slot('parse', limit=1, lease=0.2) is None
+    time.sleep(0.3)
+    assert cache.acquire_slot('parse', limit=1, lease=0.2)
+
+
+def test_redis_state_is_shared_between_caches():
+    server = fakeredis.FakeServer()
+    one = RedisCache(fakeredis.FakeRedis(server=server), 'test:')
+    two = RedisCache(fakeredis.FakeRedis(server=server), 'test:')
+    token = one.acquire_slot('parse', limit=1, lease=30)
+    assert two.acquire_slot('parse', limit=1, lease=30) is None
+    two.release_slot('parse', token)
+    assert one.acquire_slot('parse', limit=1, lease=30)
+    one.set('key', {'a': 1})
+    assert two.get_many(['key', 'missing']) == {'key': {'a': 1}}
+    assert two.stats.as_dict() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+
+@pytest.fixture
+def session_app():
+    redis = fakeredis.FakeRedis()
+    flask_app = Flask(__name__)
+    flask_app.secret_key = 'test'
+    flask_app.session_interface = CacheSessionInterface(RedisCache(redis, 'session:'))
+
+    @flask_app.route('/set/<value>')
+    def set_value(value):
+        session['value'] = value
+        return ''
+
+    @flask_app.route('/get')
+    def get_value():
+        return session.get('value', '')
+
+    @flask_app.route('/clear')
+    def clear():
+        session.clear()
+        return ''
+
+    flask_app.redis = redis
+    return flask_app
+
+
+def test_session_lives_in_the_cache(session_app):
+    client = session_app.test_client()
+    client.get('/set/abc')
+    cookie = client.get_cookie('session')
+    assert 'abc' not in cookie.value
+    [key] = session_app.redis.keys('session:*')
+    assert session_app.redis.ttl(key) > 0
+    assert client.get('/get').text == 'abc'
+
+    client.get('/clear')
+    assert session_app.redis.keys('session:*') == []
+    assert client.get('/get').text == ''
+
+
+def test_session_rejects_a_forged_cookie(session_app):
+    client = session_app.test_client()
+    client.get('/set/abc')
+    sid = session_app.redis.keys('session:*')[0].decode().split(':', 1)[1]
+    # The bare id, unsigned, must not open the session
+    client.set_cookie('session', sid)
+    assert client.get('/get').text == ''
+
+
+def test_admin_cache_stats(client):
+    with client.session_transaction() as sess:
+        sess['admin_logged_in'] = True
+        sess['admin_college'] = 'computing'
+    data = client.get('/admin/api/cache-stats').get_json()
+    assert set(data['caches']) == {'parse', 'fragments'}
+    assert data['caches']['parse'] == {'hits': 0, 'misses': 0, 'hit_rate': None}
+
+
+def test_admin_cache_stats_needs_login(client):
+    assert client.get('/admin/api/cache-stats').status_code == 403
@@ -0,0 +1,29 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import golden  # noqa: E402
+import transcript.layout  # noqa: E402
+from transcript import parse_transcript  # noqa: E402
+
+from conftest import write_pdf  # noqa: E402
+
+
+@pytest.mark.parametrize('name', sorted(golden.LAYOUTS))
+def test_parser_matches_the_golden_output(name):
+    with open(os.path.join(golden.CORPUS, f'{name}.json'), encoding='utf-8') as f:
+        expected = json.load(f)
+    assert golden.diff(expected, golden.snapshot(os.path.join(golden.CORPUS, f'{name}.pdf'))) == []
+
+
+def test_words_are_read_only_on_pages_with_course_codes(tmp_path, monkeypatch):
+    calls = []
+    textpage_words = transcript.layout.textpage_words
+    monkeypatch.setattr(transcript.layout, 'textpage_words', lambda tp: calls.append(tp) or textpage_words(tp))
+    pdf = write_pdf(tmp_path / 'doc.pdf', [['431000123', 'Student Id :'], ['CS 101', 'Programming'], ['Notes']])
+    assert [course.code for course in parse_transcript(str(pdf)).courses] == ['CS 101']
+    assert len(calls) == 1
@@ -0,0 +1,67 @@
+import pytest
+
+from conftest import write_pdf
+from transcript import extract_courses, parse_transcript_guarded, TranscriptTooComplex
+from transcript.courses import NAME_SCAN_SLACK
+
+
+def transcript_lines():
+    lines = ['Student Id :', '431000123', 'Student Name :', 'Test Student', 'Second Semester 2025/2026']
+    for i in range(40):
+        lines += [f'CS {100 + i}', 'A', f'Course number {i}', '3']
+    return lines
+
+
+def test_too_many_pages(tmp_path):
+    pdf = write_pdf(tmp_path / 'pages.pdf', [transcript_lines()] * 25)
+    with pytest.raises(TranscriptTooComplex, match='pages'):
+        parse_transcript_guarded(str(pdf), timeout=30, max_pages=20)
+
+
+def test_too_many_lines(tmp_path):
+    pdf = write_pdf(tmp_path / 'lines.pdf', [[f'line {i}' for i in range(3000)]])
+    with pytest.raises(TranscriptTooComplex, match='lines'):
+        parse_transcript_guarded(str(pdf), timeout=30, max_lines=1000)
+
+
+def test_parse_past_its_timeout(tmp_path):
+    pdf = write_pdf(tmp_path / 'slow.pdf', [transcript_lines()] * 10)
+    with pytest.raises(TranscriptTooComplex):
+        parse_transcript_guarded(str(pdf), timeout=0.001)
+
+
+class CountingLines(list):
+    """Lines that count the indexed reads extract_courses makes while scanning."""
+    reads = 0
+
+    def __getitem__(self, index):
+        self.reads += 1
+        return super().__getitem__(index)
+
+
+def test_name_scan_is_bounded_per_section():
+    # Sections of 2^k, ..., 2, 1 codes: each needs more names than all later sections have codes,
+    # so an unbounded name scan would read on through the filler tail from every one of them
+    levels = 10
+    lines = []
+    for k in reversed(range(levels)):
+        lines += [f'CS {100 + i}' for i in range(2 ** k)] + ['xx'] * 11
+    lines = CountingLines(lines + ['xx'] * 20000)
+
+    courses = extract_courses(lines)
+    assert len(courses) == 2 ** levels - 1
+    # Per section of n codes: the grade block lookahead (n + 10 lines) and the name scan (2n + NAME_SCAN_SLACK)
+    codes = len(courses)
+    assert lines.reads <= (codes + 10 * levels) + (2 * codes + NAME_SCAN_SLACK * levels)
+
+
+def test_upload_over_the_page_limit_is_not_opened_in_the_server(client, tmp_path, monkeypatch):
+    import fitz
+    pdf = write_pdf(tmp_path / 'pages.pdf', [transcript_lines()] * 25)
+
+    def no_open(*args, **kwargs):
+        raise AssertionError('the upload was opened in the server process')
+    monkeypatch.setattr(fitz, 'open', no_open)
+    with open(pdf, 'rb') as f:
+        response = client.post('/parse-transcript', data={'transcript': (f, 'pages.pdf')})
+    assert response.status_code == 413
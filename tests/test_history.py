@@ -0,0 +1,49 @@
+import app as webapp
+from app import db, Student, WithdrawalRequest, StudentWithdrawalStats, HISTORY_MODELS
+
+
+def _student(student_id='441000001'):
+    student = Student(college_id='computing', student_id=student_id)
+    db.session.add(student)
+    db.session.commit()
+    return student
+
+
+def test_bump_creates_then_increments(app):
+    with app.app_context():
+        student = _student()
+        webapp._bump_history_row(StudentWithdrawalStats, {'student_id': student.id}, 1)
+        db.session.commit()
+        webapp._bump_history_row(StudentWithdrawalStats, {'student_id': student.id}, 1)
+        db.session.commit()
+        assert webapp.get_db_withdrawal_count(student.id) == 2
+
+
+def test_bump_counts_a_row_created_by_another_transaction(app):
+    with app.app_context():
+        student = _student()
+        assert db.session.get(StudentWithdrawalStats, student.id) is None
+        db.session.commit()
+        # A concurrent request creates the row first
+        with db.engine.begin() as conn:
+            conn.execute(StudentWithdrawalStats.__table__.insert().values(student_id=student.id, count=1))
+        webapp._bump_history_row(StudentWithdrawalStats, {'student_id': student.id}, 1)
+        db.session.commit()
+        db.session.expire_all()
+        assert webapp.get_db_withdrawal_count(student.id) == 2
+
+
+def test_init_db_backfills_history_of_existing_requests(app):
+    with app.app_context():
+        student = _student()
+        db.session.add(WithdrawalRequest(college_id='computing', student_id=student.id, course_code='CS 101',
+                                         semester='الأول', year='2024/2025', status='approved', eligible=True))
+        db.session.commit()
+        for model in HISTORY_MODELS:
+            model.__table__.drop(db.engine)
+
+        result = app.test_cli_runner().invoke(args=['init-db'])
+        assert result.exit_code == 0, result.output
+        assert 'backfilled' in result.output
+        history = webapp.get_withdrawal_history(student.id, 'الأول', '2024/2025')
+        assert (history.total, history.courses, history.semester_count) == (1, frozenset({'CS 101'}), 1)
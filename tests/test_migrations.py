@@ -0,0 +1,69 @@
+from app import db, Student, WithdrawalRequest, StudentWithdrawalStats, StoredFile
+
+SEMESTER = {'semester': 'الأول', 'year': '2024/2025'}
+
+
+def _request(student, course_code, status, eligible):
+    req = WithdrawalRequest(college_id='computing', student_id=student.id, course_code=course_code,
+                            status=status, eligible=eligible, **SEMESTER)
+    db.session.add(req)
+    db.session.commit()
+    return req.id
+
+
+def test_init_db_demotes_duplicate_withdrawals_before_indexing(app):
+    with app.app_context():
+        # A database from before the index: two counting requests in one semester
+        with db.engine.begin() as conn:
+            conn.execute(db.text('DROP INDEX uq_college_student_semester_withdrawal'))
+        student = Student(college_id='computing', student_id='441000001')
+        db.session.add(student)
+        db.session.commit()
+        pending = _request(student, 'CS 101', 'pending', True)
+        approved = _request(student, 'CS 102', 'approved', True)
+        later = _request(student, 'CS 103', 'pending', True)
+        other = Student(college_id='computing', student_id='441000002')
+        db.session.add(other)
+        db.session.commit()
+        alone = _request(other, 'CS 101', 'pending', True)
+
+        result = app.test_cli_runner().invoke(args=['init-db'])
+        assert result.exit_code == 0, result.output
+        assert f'Request {pending}:' in result.output and f'Request {later}:' in result.output
+
+        db.session.expire_all()
+        states = {req.id: (req.status, req.eligible) for req in WithdrawalRequest.query}
+        assert states == {pending: ('pending', False), approved: ('approved', True),
+                          later: ('pending', False), alone: ('pending', True)}
+        assert any('مقرر واحد' in error for error in db.session.get(WithdrawalRequest, later).get_errors())
+        assert db.session.get(WithdrawalRequest, later).version == 2
+        indexes = {index['name'] for index in db.inspect(db.engine).get_indexes('withdrawal_requests')}
+        assert 'uq_college_student_semester_withdrawal' in indexes
+        assert db.session.get(StudentWithdrawalStats, student.id).count == 1
+
+
+def test_init_db_leaves_requests_alone_when_the_index_exists(app):
+    with app.app_context():
+        student = Student(college_id='computing', student_id='441000001')
+        db.session.add(student)
+        db.session.commit()
+        _request(student, 'CS 101', 'pending', True)
+        _request(student, 'CS 102', 'pending', False)
+
+        result = app.test_cli_runner().invoke(args=['init-db'])
+        assert result.exit_code == 0, result.output
+        assert 'Request ' not in result.output
+
+
+def test_init_db_adds_the_pending_upload_count(app):
+    with app.app_context():
+        # stored_files from before uploads were counted while in flight
+        with db.engine.begin() as conn:
+            conn.execute(db.text('DROP TABLE stored_files'))
+            conn.execute(db.text('CREATE TABLE stored_files (id INTEGER PRIMARY KEY, sha256 VARCHAR(64) UNIQUE '
+                                 'NOT NULL, size INTEGER, ref_count INTEGER NOT NULL, created_at DATETIME)'))
+            conn.execute(db.text("INSERT INTO stored_files (sha256, size, ref_count) VALUES ('abc', 1, 1)"))
+
+        result = app.test_cli_runner().invoke(args=['init-db'])
+        assert result.exit_code == 0, result.output
+        assert db.session.get(StoredFile, 1).pending == 0
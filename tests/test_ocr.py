@@ -0,0 +1,43 @@
+import os
+
+import fakeredis
+import fitz
+
+import app as webapp
+from cache import RedisCache
+from ocr import OcrQueue
+
+
+def write_scan(path):
+    """A PDF whose only page is an image, like a scanned transcript."""
+    doc = fitz.open()
+    page = doc.new_page()
+    pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 20, 20), 0)
+    pixmap.clear_with(255)
+    page.insert_image(fitz.Rect(40, 40, 240, 240), pixmap=pixmap)
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+def test_scans_are_refused_without_a_shared_cache(app, client, tmp_path):
+    assert app.extensions['ocr'] is None
+    with open(write_scan(tmp_path / 'scan.pdf'), 'rb') as f:
+        response = client.post('/parse-transcript', data={'transcript': (f, 'scan.pdf')})
+    assert response.status_code == 422
+    blobs = os.path.join(app.config['UPLOAD_FOLDER'], 'blobs')
+    assert not os.path.isdir(blobs) or not os.listdir(blobs)
+
+
+def test_ocr_runs_with_a_shared_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(webapp, 'create_cache', lambda url: RedisCache(fakeredis.FakeRedis(), 'withdrawals:'))
+    monkeypatch.setattr(OcrQueue, 'submit', lambda self, ref, path: 'pending')
+    shared = webapp.create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+                                'UPLOAD_FOLDER': str(tmp_path / 'uploads')})
+    with shared.app_context():
+        webapp.db.create_all()
+    assert isinstance(shared.extensions['ocr'], OcrQueue)
+    with open(write_scan(tmp_path / 'scan.pdf'), 'rb') as f:
+        response = shared.test_client().post('/parse-transcript', data={'transcript': (f, 'scan.pdf')})
+    assert response.status_code == 202
+    assert response.get_json()['status'] == 'processing'
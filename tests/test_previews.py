@@ -0,0 +1,49 @@
+import os
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+import app as webapp
+from previews import PreviewRenderer
+from transcript import TranscriptTooComplex
+
+from conftest import write_pdf
+
+
+def test_preview_rendered_in_guarded_child(tmp_path):
+    pdf = write_pdf(tmp_path / 'doc.pdf', [['first page'], ['second page']])
+    renderer = PreviewRenderer(str(tmp_path / 'previews'))
+    renderer.render('abc', str(pdf))
+    with open(renderer.path_for('abc'), 'rb') as f:
+        assert f.read(8) == b'\x89PNG\r\n\x1a\n'
+
+
+def test_preview_render_over_the_limit_raises(tmp_path):
+    pdf = write_pdf(tmp_path / 'doc.pdf', [['page']])
+    renderer = PreviewRenderer(str(tmp_path / 'previews'), timeout=0.001)
+    with pytest.raises(TranscriptTooComplex):
+        renderer.render('abc', str(pdf))
+    assert not renderer.has('abc')
+
+
+def test_rejected_upload_is_not_previewed(app, client, tmp_path, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(app.extensions['previews'], 'submit', lambda digest, path: submitted.append(digest))
+    monkeypatch.setattr(webapp, 'MAX_TRANSCRIPT_PAGES', 1)
+    pdf = write_pdf(tmp_path / 'long.pdf', [['page one'], ['page two']])
+    with open(pdf, 'rb') as f:
+        response = client.post('/parse-transcript', data={'transcript': (f, 'long.pdf')})
+    assert response.status_code == 413
+    assert submitted == []
+
+
+def test_discard_upload_deletes_preview(app, tmp_path):
+    previews = app.extensions['previews']
+    pdf = write_pdf(tmp_path / 'doc.pdf', [['page']])
+    with app.test_request_context('/'), open(pdf, 'rb') as f:
+        digest = webapp.store_upload(FileStorage(f, 'doc.pdf'))
+        os.makedirs(previews.cache_dir, exist_ok=True)
+        open(previews.path_for(digest), 'wb').close()
+        webapp.discard_upload(digest)
+        assert not os.path.exists(webapp.blob_path(digest))
+    assert not previews.has(digest)
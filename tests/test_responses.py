@@ -0,0 +1,56 @@
+import dataclasses
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+from flask import Flask, jsonify
+
+import responses
+from responses import FastJSONProvider, compress_response, dumps_json
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    label: str
+
+
+VALUE = {'name': 'علوم الحاسب', 'at': datetime(2025, 1, 2, 3, 4, 5), 'point': Point(1, 'ب'), 'n': None}
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    if request.param == 'json':
+        monkeypatch.setattr(responses, 'orjson', None)
+    elif responses.orjson is None:
+        pytest.skip('orjson is not installed')
+    return request.param
+
+
+def test_dumps_json_writes_utf8(encoder):
+    text = dumps_json(VALUE)
+    assert 'علوم الحاسب' in text and '\\u' not in text
+    assert json.loads(text) == {'name': 'علوم الحاسب', 'at': 'Thu, 02 Jan 2025 03:04:05 GMT',
+                                'point': {'x': 1, 'label': 'ب'}, 'n': None}
+
+
+def test_provider_matches_the_default_provider(encoder):
+    flask_app = Flask(__name__)
+    expected = flask_app.json.dumps({'b': 'ب', 'a': VALUE['at']}, ensure_ascii=False)
+    flask_app.json = FastJSONProvider(flask_app)
+    text = flask_app.json.dumps({'b': 'ب', 'a': VALUE['at']})
+    # Same keys in the same (sorted) order and values; only whitespace may differ
+    assert list(json.loads(text).items()) == list(json.loads(expected).items())
+    assert '\\u' not in text
+    assert flask_app.json.loads('{"name": "علوم"}') == {'name': 'علوم'}
+
+
+def test_large_json_is_compressed():
+    flask_app = Flask(__name__)
+    flask_app.json = FastJSONProvider(flask_app)
+    flask_app.after_request(compress_response)
+    flask_app.add_url_rule('/data', 'data', lambda: jsonify([VALUE['name']] * 200))
+    response = flask_app.test_client().get('/data', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.data)) == [VALUE['name']] * 200
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+import app as webapp
+
+from conftest import write_pdf
+
+
+def upload(path):
+    with open(path, 'rb') as f:
+        return webapp.store_upload(FileStorage(f, os.path.basename(path)))
+
+
+def stored(digest):
+    return webapp.StoredFile.query.filter_by(sha256=digest).one_or_none()
+
+
+def test_failed_submission_keeps_a_shared_upload_in_flight(app, tmp_path):
+    pdf = write_pdf(tmp_path / 'doc.pdf', [['supporting document']])
+    with app.test_request_context('/'):
+        first = upload(pdf)
+        second = upload(pdf)
+        assert first == second
+        # The first submission fails while the second is still validating
+        webapp.discard_upload(first)
+        assert os.path.exists(webapp.blob_path(second))
+        webapp.retain_blob(second)
+        webapp.db.session.commit()
+        assert (stored(second).ref_count, stored(second).pending) == (1, 0)
+        assert os.path.exists(webapp.blob_path(second))
+
+
+def test_discarding_the_only_upload_deletes_it(app, tmp_path):
+    pdf = write_pdf(tmp_path / 'doc.pdf', [['supporting document']])
+    with app.test_request_context('/'):
+        digest = upload(pdf)
+        webapp.discard_upload(digest)
+        assert stored(digest) is None
+        assert not os.path.exists(webapp.blob_path(digest))
+
+
+def test_retain_registers_a_blob_whose_row_is_gone(app, tmp_path):
+    pdf = write_pdf(tmp_path / 'doc.pdf', [['supporting document']])
+    with app.test_request_context('/'):
+        digest = upload(pdf)
+        webapp.db.session.delete(stored(digest))
+        webapp.db.session.commit()
+        webapp.retain_blob(digest)
+        webapp.db.session.commit()
+        assert stored(digest).ref_count == 1
+        assert stored(digest).size == os.path.getsize(pdf)
+
+
+def test_retain_refuses_a_missing_blob(app, tmp_path):
+    pdf = write_pdf(tmp_path / 'doc.pdf', [['supporting document']])
+    with app.test_request_context('/'):
+        digest = upload(pdf)
+        os.remove(webapp.blob_path(digest))
+        with pytest.raises(FileNotFoundError):
+            webapp.retain_blob(digest)
+        webapp.db.session.rollback()
+        assert stored(digest).ref_count == 0
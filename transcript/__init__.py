@@ -0,0 +1,20 @@
+"""Transcript parsing and withdrawal rules, independent of Flask and the database.
+
+Parser workers, batch jobs and the web app import from here; nothing in this
+package touches the web stack.
+"""
+from .types import Transcript, Course, RuleResult, ValidationResult, WithdrawalHistory
+from .parser import (parse_transcript, parse_transcript_with_stats, split_lines, TranscriptTooComplex,
+                     TranscriptUnreadable, ImageOnlyTranscript)
+from .guard import parse_transcript_guarded, run_guarded
+from .courses import extract_courses, detect_current_semester
+from .layout import extract_courses_from_layout, textpage_words
+from .rules import validate_withdrawal
+
+__all__ = [
+    'Transcript', 'Course', 'RuleResult', 'ValidationResult', 'WithdrawalHistory',
+    'parse_transcript', 'parse_transcript_with_stats', 'parse_transcript_guarded', 'run_guarded', 'split_lines',
+    'TranscriptTooComplex', 'TranscriptUnreadable', 'ImageOnlyTranscript',
+    'extract_courses', 'extract_courses_from_layout', 'textpage_words', 'detect_current_semester',
+    'validate_withdrawal',
+]
@@ -0,0 +1,36 @@
+"""Batch parsing: python -m transcript FILE.pdf [FILE.pdf ...]
+
+Prints one JSON object per transcript (student fields, courses and current
+semester) without loading Flask or the database.
+"""
+import argparse
+import json
+import sys
+
+from .parser import parse_transcript
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m transcript', description='Parse transcript PDFs to JSON lines.')
+    parser.add_argument('files', nargs='+', help='transcript PDF files')
+    parser.add_argument('--raw-text', action='store_true', help='include the extracted text in the output')
+    parser.add_argument('--ocr', action='store_true', help='read scanned pages with Tesseract')
+    args = parser.parse_args(argv)
+
+    status = 0
+    for path in args.files:
+        try:
+            parsed = parse_transcript(path, keep_raw_text=args.raw_text, ocr=args.ocr)
+        except Exception as e:
+            print(json.dumps({'file': path, 'error': f'{type(e).__name__}: {e}'}, ensure_ascii=False))
+            status = 1
+            continue
+        fields = parsed.to_dict()
+        if not args.raw_text:
+            del fields['raw_text']
+        print(json.dumps({'file': path, **fields}, ensure_ascii=False))
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""Vectorized withdrawal eligibility over many students at once.
+
+For registrar audits over the whole student body: rules are evaluated as
+NumPy predicates over columns instead of calling validate_withdrawal() per
+row, and the Arabic rule messages are only rendered for rows that are
+looked at. Requires NumPy, which the web app itself does not import.
+
+    from transcript.batch import validate_batch
+    result = validate_batch(degree, withdrawal_count, is_first_year, remaining_credits, semester)
+    result.eligible.sum(), result.messages(42)
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from .parser import EXPECTED_GRADUATE_MAX_CREDITS
+from .rules import MAX_WITHDRAWALS, validate_withdrawal
+from .types import Transcript, ValidationResult
+
+# Failure flags in the order of the rules in validate_withdrawal
+RULE_COLUMNS = ('cap_exceeded', 'first_year', 'expected_graduate', 'previously_withdrawn', 'summer')
+
+
+@dataclass
+class BatchValidation:
+    """Per-row rule outcomes as boolean columns; True means the rule failed."""
+    degree: np.ndarray
+    withdrawal_count: np.ndarray
+    is_first_year: np.ndarray
+    remaining_credits: np.ndarray
+    semester: np.ndarray
+    course_code: np.ndarray
+    cap_exceeded: np.ndarray
+    first_year: np.ndarray
+    expected_graduate: np.ndarray
+    previously_withdrawn: np.ndarray
+    summer: np.ndarray
+    eligible: np.ndarray
+    withdrawal_limits: Optional[Dict[str, int]] = None
+
+    def __len__(self):
+        return len(self.eligible)
+
+    def table(self):
+        """Compact result table: one record of flags per row."""
+        dtype = [('eligible', '?')] + [(name, '?') for name in RULE_COLUMNS] + [('error_count', 'u1')]
+        out = np.empty(len(self), dtype=dtype)
+        out['eligible'] = self.eligible
+        for name in RULE_COLUMNS:
+            out[name] = getattr(self, name)
+        out['error_count'] = sum(getattr(self, name).astype(np.uint8) for name in RULE_COLUMNS)
+        return out
+
+    def failure_counts(self):
+        """Number of rows failing each rule."""
+        return {name: int(getattr(self, name).sum()) for name in RULE_COLUMNS}
+
+    def messages(self, i) -> ValidationResult:
+        """Render the Arabic errors, warnings and rule table for row i."""
+        code = str(self.course_code[i])
+        transcript = Transcript(
+            degree=str(self.degree[i]),
+            withdrawal_count=int(self.withdrawal_count[i]),
+            is_first_year=bool(self.is_first_year[i]),
+            expected_graduate=bool(self.expected_graduate[i]),
+            remaining_credits=int(self.remaining_credits[i]),
+            withdrawn_courses=[code] if self.previously_withdrawn[i] else [],
+        )
+        return validate_withdrawal(transcript, code, '', str(self.semester[i]), '', '',
+                                   withdrawal_limits=self.withdrawal_limits)
+
+
+def validate_batch(degree: Sequence[str], withdrawal_count: Sequence[int], is_first_year: Sequence[bool],
+                   remaining_credits: Sequence[int], semester: Sequence[str],
+                   previously_withdrawn: Optional[Sequence[bool]] = None,
+                   course_code: Optional[Sequence[str]] = None,
+                   withdrawal_limits: Optional[Dict[str, int]] = None) -> BatchValidation:
+    """Evaluate the withdrawal rules for every row of the given columns.
+
+    Matches validate_withdrawal() row by row. previously_withdrawn (rule 4)
+    defaults to False; course_code is only used when rendering messages, but
+    is required for the rows marked previously withdrawn, as rule 4 names the
+    course (ValueError otherwise).
+    withdrawal_limits replaces MAX_WITHDRAWALS, as in validate_withdrawal().
+    """
+    degree = np.asarray(degree, dtype=object)
+    withdrawal_count = np.asarray(withdrawal_count, dtype=np.int32)
+    is_first_year = np.asarray(is_first_year, dtype=bool)
+    remaining_credits = np.asarray(remaining_credits, dtype=np.int32)
+    semester = np.asarray(semester, dtype=object)
+    n = len(degree)
+    if previously_withdrawn is None:
+        previously_withdrawn = np.zeros(n, dtype=bool)
+    else:
+        previously_withdrawn = np.asarray(previously_withdrawn, dtype=bool)
+    if course_code is None:
+        course_code = np.full(n, '', dtype=object)
+    else:
+        course_code = np.asarray(course_code, dtype=object)
+    if (previously_withdrawn & (course_code.astype(str) == '')).any():
+        raise ValueError('course_code is required for the rows marked previously_withdrawn')
+
+    # Degrees are few: map each distinct value once, then index. Unknown degrees have no cap.
+    degrees, degree_idx = np.unique(degree.astype(str), return_inverse=True)
+    if withdrawal_limits is None:
+        withdrawal_limits = MAX_WITHDRAWALS
+    limits = np.array([withdrawal_limits.get(d, np.iinfo(np.int32).max) for d in degrees], dtype=np.int32)
+    cap_exceeded = withdrawal_count >= limits[degree_idx]
+
+    expected_graduate = (remaining_credits > 0) & (remaining_credits <= EXPECTED_GRADUATE_MAX_CREDITS)
+
+    semesters, semester_idx = np.unique(semester.astype(str), return_inverse=True)
+    summer = np.array(['صيفي' in s for s in semesters], dtype=bool)[semester_idx]
+
+    eligible = ~(cap_exceeded | is_first_year | expected_graduate | previously_withdrawn | summer)
+
+    return BatchValidation(
+        degree=degree,
+        withdrawal_count=withdrawal_count,
+        is_first_year=is_first_year,
+        remaining_credits=remaining_credits,
+        semester=semester,
+        course_code=course_code,
+        cap_exceeded=cap_exceeded,
+        first_year=is_first_year,
+        expected_graduate=expected_graduate,
+        previously_withdrawn=previously_withdrawn,
+        summer=summer,
+        eligible=eligible,
+        withdrawal_limits=withdrawal_limits,
+    )
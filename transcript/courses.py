@@ -0,0 +1,128 @@
+"""Course table and semester detection from normalized transcript lines."""
+import sys
+from typing import List, Tuple
+
+from .types import Course
+from .text import (
+    COURSE_CODE, GRADE, INTEGER, ARABIC_CHAR, LATIN_START, AR_SEMESTER, EN_SEMESTER,
+)
+
+# Lines scanned for a section's names beyond one per code: headers, wrapped
+# names and annotations. Keeps the scan linear on text with no credit block.
+NAME_SCAN_SLACK = 40
+
+
+def extract_courses(lines: List[str]) -> List[Course]:
+    """Extract structured course list from NFKC-normalized transcript lines.
+
+    Returns a list of Course(code, name, grade, current).
+    Course codes, grades, and names appear in separate blocks but same order.
+    Courses without grades are current semester (actively enrolled).
+    Supports both English grades (A+, B, C, W…) and Arabic grades (أ, ب, ع…).
+    """
+    code_pat = COURSE_CODE
+    grade_pat = GRADE
+
+    # Collect all course codes and grades globally (in document order)
+    codes = []
+    grades = []
+    for line in lines:
+        if code_pat.match(line):
+            codes.append(line)
+        elif grade_pat.match(line):
+            grades.append(line)
+
+    if not codes:
+        return []
+
+    # Find course names using positional structure per page-section.
+    # Each page has: codes block → grades block → names block → numbers block
+    code_indices = [i for i, l in enumerate(lines) if code_pat.match(l)]
+
+    # Group code indices into sections (pages) separated by large line gaps
+    sections = []
+    sec = [code_indices[0]]
+    for j in range(1, len(code_indices)):
+        if code_indices[j] - code_indices[j - 1] > 10:
+            sections.append(sec)
+            sec = [code_indices[j]]
+        else:
+            sec.append(code_indices[j])
+    sections.append(sec)
+
+    all_names = []
+
+    for section in sections:
+        n_codes = len(section)
+        last_code_idx = section[-1]
+
+        # Find contiguous grade block right after codes
+        grade_end = last_code_idx
+        in_grades = False
+        for k in range(last_code_idx + 1, min(last_code_idx + n_codes + 10, len(lines))):
+            if grade_pat.match(lines[k]):
+                in_grades = True
+                grade_end = k
+            elif in_grades:
+                break
+
+        # Names start right after the grade block
+        name_start = grade_end + 1
+        names = []
+        for k in range(name_start, min(name_start + 2 * n_codes + NAME_SCAN_SLACK, len(lines))):
+            if len(names) >= n_codes:
+                break
+            line = lines[k]
+            if INTEGER.match(line):
+                break  # hit credit-hours block
+            # Accept Arabic course names, English course names (> 3 chars, starts with letter),
+            # or parenthesised annotations
+            if ARABIC_CHAR.search(line) or line.startswith('('):
+                names.append(line)
+            elif LATIN_START.match(line) and len(line) > 3:
+                names.append(line)
+
+        all_names.extend(names)
+
+    # Build final course list
+    courses = []
+    for i in range(len(codes)):
+        courses.append(Course(
+            code=sys.intern(codes[i]),
+            name=all_names[i] if i < len(all_names) else '',
+            grade=sys.intern(grades[i]) if i < len(grades) else '',
+            current=i >= len(grades)
+        ))
+
+    return courses
+
+
+def detect_current_semester(lines: List[str]) -> Tuple[str, str]:
+    """Detect the current (latest) semester and year from transcript lines.
+
+    Returns (semester_type_arabic, year_string) e.g. ('الثاني', '2025/2026').
+    Supports both English ("Second Semester 2025/2026") and Arabic ("هـ1447 الفصل الثاني").
+    """
+    ar_pat = AR_SEMESTER
+    en_pat = EN_SEMESTER
+
+    last_ar = None
+    last_en = None
+    for line in lines:
+        m = ar_pat.search(line)
+        if m:
+            last_ar = m
+        m = en_pat.search(line)
+        if m:
+            last_en = m
+
+    if last_en:
+        sem_en = last_en.group(1).lower()
+        ar_map = {'first': 'الأول', 'second': 'الثاني', 'summer': 'الصيفي'}
+        sem_ar = ar_map.get(sem_en, sem_en)
+        return sem_ar, last_en.group(2)
+
+    if last_ar:
+        return last_ar.group(2), last_ar.group(1)
+
+    return '', ''
@@ -0,0 +1,116 @@
+"""Parse untrusted PDFs in a child process with CPU and wall-clock limits.
+
+A crafted PDF can keep PyMuPDF busy for minutes. parse_transcript_guarded
+runs the parse in a process forked from a forkserver (PyMuPDF preloaded,
+so starting one costs a fork, not an import), caps its CPU time with
+RLIMIT_CPU and kills it at the wall-clock timeout. Whatever goes wrong,
+the caller gets TranscriptTooComplex instead of a stuck worker.
+
+run_guarded() applies the same limits to any other work on an untrusted
+PDF, such as rendering the admin preview.
+"""
+import math
+import multiprocessing
+import os
+import signal
+import threading
+
+from .parser import parse_transcript_with_stats, TranscriptTooComplex
+from .types import Transcript
+
+_context = None
+_context_lock = threading.Lock()
+
+
+def _get_context():
+    global _context
+    with _context_lock:
+        if _context is None:
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                _context = multiprocessing.get_context('forkserver')
+                _context.set_forkserver_preload(['transcript.parser', 'fitz'])
+            else:
+                _context = multiprocessing.get_context('spawn')
+        return _context
+
+
+def _guarded_child(conn, func, args, kwargs, cpu_seconds, niceness):
+    if niceness:
+        os.nice(niceness)
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    except (ImportError, ValueError, OSError):
+        pass  # no rlimits on this platform; the wall-clock timeout still applies
+    try:
+        result = ('ok', func(*args, **kwargs))
+    except Exception as e:
+        result = ('error', e)
+    try:
+        conn.send(result)
+    except Exception as e:
+        # The exception itself may not pickle (e.g. PyMuPDF internals)
+        conn.send(('error', RuntimeError(f'{type(e).__name__}: {e}')))
+    finally:
+        conn.close()
+
+
+def run_guarded(func, args=(), kwargs=None, timeout: float = 30, cpu_seconds: int = None, niceness: int = 0):
+    """func(*args, **kwargs) in a child process; raises TranscriptTooComplex past the limits.
+
+    func must be importable by name in the child (a module-level function).
+    cpu_seconds defaults to the timeout. Errors raised by func are re-raised
+    in the caller. A positive niceness lowers the child's CPU priority.
+    """
+    cpu_seconds = cpu_seconds or math.ceil(timeout)
+    ctx = _get_context()
+    recv_conn, send_conn = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_guarded_child, args=(send_conn, func, args, kwargs or {}, cpu_seconds, niceness),
+                       daemon=True)
+    proc.start()
+    send_conn.close()
+    status = value = None
+    try:
+        timed_out = not recv_conn.poll(timeout)
+        if not timed_out:
+            try:
+                status, value = recv_conn.recv()
+            except EOFError:
+                pass  # child died without a result
+    finally:
+        recv_conn.close()
+        if proc.is_alive():
+            proc.kill()
+        proc.join()
+
+    if status == 'ok':
+        return value
+    if status == 'error':
+        raise value
+    if timed_out:
+        raise TranscriptTooComplex(f'did not finish within {timeout:g}s')
+    if proc.exitcode in (-signal.SIGXCPU, -signal.SIGKILL):
+        raise TranscriptTooComplex(f'used more than {cpu_seconds}s of CPU time')
+    raise RuntimeError(f'guarded process exited with code {proc.exitcode}')
+
+
+def parse_transcript_guarded(filepath: str, timeout: float = 30, cpu_seconds: int = None,
+                             keep_raw_text: bool = False, max_pages: int = None,
+                             max_lines: int = None, stats: dict = None, ocr: bool = False,
+                             niceness: int = 0) -> Transcript:
+    """parse_transcript() in a child process; raises TranscriptTooComplex past the limits.
+
+    cpu_seconds defaults to the timeout. Errors raised by the parser itself
+    are re-raised in the caller. stats is filled in as by parse_transcript().
+    A positive niceness lowers the child's CPU priority, for background work
+    such as OCR that should yield to parses someone is waiting on.
+    """
+    kwargs = {'keep_raw_text': keep_raw_text, 'max_pages': max_pages, 'max_lines': max_lines, 'ocr': ocr}
+    try:
+        transcript, child_stats = run_guarded(parse_transcript_with_stats, (filepath,), kwargs, timeout=timeout,
+                                              cpu_seconds=cpu_seconds, niceness=niceness)
+    except TranscriptTooComplex as e:
+        raise TranscriptTooComplex(f'parse {e}') from None
+    if stats is not None:
+        stats.update(child_stats)
+    return transcript
@@ -0,0 +1,202 @@
+"""Course table extraction from word positions on the page.
+
+Plain text follows the PDF's content stream, so a table row can come out
+glued into one line ("CS 101مقدمة في البرمجة3أ") or split into column
+blocks, and extract_courses() has to guess how codes, grades and names line
+up. Here the words of a page and their boxes (textpage_words()) are merged
+into cells, the cells binned into rows by vertical position, and every row
+with a course code read as one course. A name wrapped onto the next line
+is joined to its row.
+
+extract_courses_from_layout() returns None when the pages do not look like
+a course table, and the parser falls back to extract_courses().
+"""
+import re
+import sys
+from typing import List, Optional, Sequence
+
+from .text import (COURSE_CODE, GRADE, ARABIC_CHAR, LATIN_START, AR_SEMESTER, EN_SEMESTER, normalize_line,
+                   normalize_text)
+from .types import Course
+
+# Fractions of the word height: the widest gap between two words of one cell,
+# the narrowest that counts as a space between them (MuPDF also splits words
+# where the font changes, as in '+ب'), how far apart the centres of cells on
+# one row may be, and how far below a course row the next line of a wrapped
+# name may start
+CELL_GAP = 0.6
+SPACE_GAP = 0.1
+ROW_TOLERANCE = 0.5
+WRAP_DISTANCE = 0.6
+
+# MuPDF only splits words at spaces, so neighbouring cells drawn without one
+# come out as one word ('101مقدمة', 'البيانات3ع') with one box over both. A
+# switch between Arabic and Latin letters or digits is taken as a word
+# boundary as well.
+_ARABIC = r'\u0600-\u06FF\uFB50-\uFDFF\uFE70-\uFEFF'  # letters and presentation forms
+_SCRIPT_BOUNDARY = re.compile(rf'(?<=[A-Za-z0-9])(?=[{_ARABIC}])|(?<=[{_ARABIC}])(?=[A-Za-z0-9])')
+_WORD = re.compile(r'\S+')
+
+# COURSE_CODE anywhere in a page's text, spaced or not: a page without one
+# has no course rows, so its words are not needed
+_CODE_IN_TEXT = re.compile(r'[A-Z]{2,5}\s*\d{3,4}')
+
+# Cell kinds
+CODE, GRADE_CELL, NAME = 'code', 'grade', 'name'
+
+
+class _Cell:
+    __slots__ = ('x0', 'y0', 'x1', 'y1', 'text', 'kind')
+
+    def __init__(self, x0, y0, x1, y1, text):
+        self.x0, self.y0, self.x1, self.y1 = x0, y0, x1, y1
+        self.text = text  # a list of parts until the cell is complete
+        self.kind = None
+
+    @property
+    def height(self):
+        return self.y1 - self.y0
+
+
+def _kind(text: str) -> Optional[str]:
+    # Codes end in a digit and grades are at most two characters, so most
+    # cells skip those patterns
+    if text[-1].isdigit() and COURSE_CODE.match(text):
+        return CODE
+    if len(text) <= 2 and GRADE.match(text):
+        return GRADE_CELL
+    # Same test as extract_courses(): Arabic, English over 3 characters, or an annotation
+    if ARABIC_CHAR.search(text) or text.startswith('(') or (LATIN_START.match(text) and len(text) > 3):
+        return NAME
+    return None
+
+
+def textpage_words(textpage) -> list:
+    """Words of a page with their boxes, in the format of page.get_text('words').
+
+    MuPDF's words, unless one crosses a script boundary: then they are
+    built from the characters, so that both sides get their own box.
+    """
+    words = textpage.extractWORDS()
+    if not any(not word[4].isascii() and _SCRIPT_BOUNDARY.search(word[4]) for word in words):
+        return words
+    words = []
+    for block_no, block in enumerate(textpage.extractRAWDICT()['blocks']):
+        for line_no, line in enumerate(block.get('lines', ())):
+            chars = [char for span in line['spans'] for char in span['chars']]
+            text = ''.join([char['c'] for char in chars])
+            word_no = 0
+            for match in _WORD.finditer(text):
+                word = match.group()
+                start = match.start()
+                for piece in (word,) if word.isascii() else _SCRIPT_BOUNDARY.split(word):
+                    x0, y0, x1, y1 = zip(*[char['bbox'] for char in chars[start:start + len(piece)]])
+                    words.append((min(x0), min(y0), max(x1), max(y1), piece, block_no, line_no, word_no))
+                    start += len(piece)
+                    word_no += 1
+    return words
+
+
+def table_words(textpage, text: str) -> list:
+    """textpage_words() of a page whose text may hold a course code, else []."""
+    if not _CODE_IN_TEXT.search(normalize_text(text)):
+        return []
+    return textpage_words(textpage)
+
+
+def _cells(words) -> List[_Cell]:
+    """Text cells of one page, from textpage_words().
+
+    Words of one MuPDF line join a cell while the gap between them is under
+    CELL_GAP word heights. Words arrive in reading order, which runs right
+    to left for Arabic, so the gap is measured on whichever side the next
+    word is.
+    """
+    cells = []
+    parts = None
+    prev_line = None
+    for x0, y0, x1, y1, text, block, line, _ in words:
+        height = y1 - y0
+        if (block, line) == prev_line:
+            # Gap on the far side of the previous word: right for Latin, left for Arabic
+            gap = x0 - px1 if x0 - px1 > px0 - x1 else px0 - x1
+        else:
+            gap = None
+        if gap is not None and gap < CELL_GAP * height:
+            if gap > SPACE_GAP * height:
+                parts.append(' ')
+            parts.append(text)
+            if x0 < cell.x0:
+                cell.x0 = x0
+            if x1 > cell.x1:
+                cell.x1 = x1
+            if y1 > cell.y1:
+                cell.y1 = y1
+        else:
+            cell = _Cell(x0, y0, x1, y1, parts := [text])
+            cells.append(cell)
+        prev_line, px0, px1 = (block, line), x0, x1
+    for cell in cells:
+        cell.text = normalize_line(''.join(cell.text)).strip()
+        if cell.text:
+            cell.kind = _kind(cell.text)
+    return [cell for cell in cells if cell.text]
+
+
+def _rows(cells: List[_Cell]) -> List[List[_Cell]]:
+    """Cells grouped into rows by their vertical centre, top to bottom."""
+    cells.sort(key=lambda c: c.y0 + c.y1)
+    rows = []
+    row_mid = None
+    for cell in cells:
+        mid = (cell.y0 + cell.y1) / 2
+        if rows and mid - row_mid <= ROW_TOLERANCE * cell.height:
+            rows[-1].append(cell)
+        else:
+            rows.append([cell])
+            row_mid = mid
+    return rows
+
+
+def _continues_name(row: List[_Cell], name: _Cell, bottom: float) -> bool:
+    """Whether a row without a course code is the next line of a wrapped name."""
+    for cell in row:
+        if (cell.kind != NAME or cell.y0 - bottom > WRAP_DISTANCE * cell.height
+                or cell.x1 < name.x0 or cell.x0 > name.x1
+                or AR_SEMESTER.search(cell.text) or EN_SEMESTER.search(cell.text)):
+            return False
+    return True
+
+
+def extract_courses_from_layout(pages: Sequence[list]) -> Optional[List[Course]]:
+    """Courses from the words of each page, as returned by textpage_words().
+
+    Returns None unless every row holding a course code also has a name
+    (two tables side by side, or a layout that puts each column in a block
+    of its own, are left to extract_courses()). Rows without a grade are
+    the current semester's courses.
+    """
+    courses = []
+    for words in pages:
+        name = bottom = None  # name cell of the last course row, and the bottom of its text
+        for row in _rows(_cells(words)):
+            codes = [c for c in row if c.kind == CODE]
+            if not codes:
+                if name is not None and _continues_name(row, name, bottom):
+                    # Cells of the line in reading order: right to left for an Arabic name
+                    rtl = ARABIC_CHAR.search(name.text) is not None
+                    cells = sorted(row, key=lambda c: c.x0, reverse=rtl)
+                    courses[-1].name += ' ' + ' '.join(c.text for c in cells)
+                    bottom = max(c.y1 for c in row)
+                else:
+                    name = None
+                continue
+            names = [c for c in row if c.kind == NAME]
+            if len(codes) > 1 or not names:
+                return None
+            grade = next((c.text for c in row if c.kind == GRADE_CELL), '')
+            name = max(names, key=lambda c: len(c.text))
+            bottom = max(c.y1 for c in row)
+            courses.append(Course(code=sys.intern(codes[0].text), name=name.text,
+                                  grade=sys.intern(grade), current=not grade))
+    return courses or None
@@ -0,0 +1,358 @@
+"""Text extraction and field parsing for University of Tabuk transcript PDFs."""
+import sys
+import time
+from typing import List, Optional, Tuple
+
+from .courses import extract_courses, detect_current_semester
+from .layout import extract_courses_from_layout, table_words
+from .types import Transcript
+from .text import (
+    normalize_text, DOUBLED_BIN, MULTI_SPACE, STUDENT_ID_LABEL, STUDENT_ID_VALUE, STUDENT_NAME_LABEL,
+    NAME_VALUE, FACULTY_LABEL, MAJOR_LABEL, MAJOR_PREFIX, DEGREE_BACHELOR, DEGREE_DIPLOMA, AR_NAME,
+    AR_NAME_BEFORE_LABEL, AR_COLLEGE, AR_DEPARTMENT, TRAILING_ID, ID_DIGITS, NINE_DIGIT_ID, DECIMAL,
+    AR_WITHDRAWAL, UPPERCASE, CREDITS_PLAN, CREDITS_COMPLETED, CREDITS_REMAINING, CREDITS_VALUE,
+    GPA_VALUE, GPA_SHORT_VALUE, EN_SEMESTER, AR_SEMESTER, AR_SEMESTER_GENERIC,
+)
+
+# Students with at most this many credits left are expected to graduate
+EXPECTED_GRADUATE_MAX_CREDITS = 18
+
+# A document with fewer characters of text than this has no usable text layer;
+# if its pages carry images it is a scan or photo and needs OCR
+MIN_TEXT_CHARS = 20
+
+# Tesseract settings for scanned pages: Arabic and English, rendered at 300 dpi
+OCR_LANGUAGE = 'ara+eng'
+OCR_DPI = 300
+
+
+class TranscriptTooComplex(ValueError):
+    """The PDF exceeds a parse budget: pages, lines, CPU time or wall-clock time."""
+
+
+class TranscriptUnreadable(ValueError):
+    """No text could be extracted from the PDF, so there is nothing to parse."""
+
+
+class ImageOnlyTranscript(TranscriptUnreadable):
+    """The pages are images without a text layer (a scan or photo); parse with ocr=True."""
+
+
+def split_lines(text: str) -> List[str]:
+    """Non-empty, stripped lines of extracted transcript text."""
+    return [l.strip() for l in text.split('\n') if l.strip()]
+
+
+def _clean_name(name: str) -> str:
+    """Clean PDF extraction artifacts from student names."""
+    # Fix doubled words like "بن بن" → "بن"
+    name = DOUBLED_BIN.sub(r'\1', name)
+    # Collapse multiple spaces
+    name = MULTI_SPACE.sub(' ', name)
+    return name.strip()
+
+
+def _text_chars(text: str) -> int:
+    """Characters of text, not counting whitespace."""
+    return len(''.join(text.split()))
+
+
+def _ocr_textpage(page):
+    """Text of a page recognised by Tesseract (RuntimeError when it is not installed)."""
+    return page.get_textpage_ocr(language=OCR_LANGUAGE, dpi=OCR_DPI, full=True)
+
+
+def parse_transcript(filepath: str, keep_raw_text: bool = True,
+                     max_pages: Optional[int] = None, max_lines: Optional[int] = None,
+                     stats: Optional[dict] = None, ocr: bool = False) -> Transcript:
+    """Parse a University of Tabuk transcript PDF and extract relevant data.
+
+    Supports both English (column-order, value-before-label) and Arabic transcripts.
+    Pass keep_raw_text=False to drop the extracted text once parsing is done,
+    e.g. for results that are cached. max_pages and max_lines bound the work
+    done on untrusted files: TranscriptTooComplex is raised as soon as the
+    page tree or the extracted text goes over them. A stats dict, if given,
+    receives the page and line counts, the extract/parse times in ms and
+    whether the course table was read from word positions (table_layout).
+
+    Courses come from the word positions on the page when they form a
+    table (extract_courses_from_layout), otherwise from the text lines
+    (extract_courses).
+
+    A document without a text layer raises ImageOnlyTranscript when its
+    pages carry images, TranscriptUnreadable otherwise. With ocr=True the
+    image pages are read by Tesseract instead, which takes seconds per page.
+    """
+    import fitz  # PyMuPDF, loaded on first parse to keep startup fast
+    started = time.perf_counter()
+    pages = []
+    page_words = []
+    line_count = 0
+    ocr_pages = 0
+    with fitz.open(filepath) as doc:
+        if max_pages is not None and doc.page_count > max_pages:
+            raise TranscriptTooComplex(f'{doc.page_count} pages (limit {max_pages})')
+        for page in doc:
+            # One layout analysis for both the text and the word boxes (read only
+            # on pages with a course code), with the flags get_text() would use
+            # (flags=0 drops ligatures and whitespace)
+            textpage = page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+            text = page.get_text(textpage=textpage)
+            line_count += text.count('\n')
+            if max_lines is not None and line_count > max_lines:
+                raise TranscriptTooComplex(f'more than {max_lines} lines of text')
+            pages.append(text)
+            page_words.append(table_words(textpage, text))
+        if sum(_text_chars(text) for text in pages) < MIN_TEXT_CHARS:
+            image_pages = [page for page in doc
+                           if _text_chars(pages[page.number]) < MIN_TEXT_CHARS and page.get_images()]
+            if not image_pages:
+                raise TranscriptUnreadable('the PDF has no text')
+            if not ocr:
+                raise ImageOnlyTranscript(f'{len(image_pages)} of {doc.page_count} pages are images without text')
+            for page in image_pages:
+                textpage = _ocr_textpage(page)
+                pages[page.number] = page.get_text(textpage=textpage)
+                page_words[page.number] = table_words(textpage, pages[page.number])
+                ocr_pages += 1
+            line_count = sum(text.count('\n') for text in pages)
+            if max_lines is not None and line_count > max_lines:
+                raise TranscriptTooComplex(f'more than {max_lines} lines of text')
+            if sum(_text_chars(text) for text in pages) < MIN_TEXT_CHARS:
+                raise TranscriptUnreadable('OCR found no text in the scanned pages')
+    full_text = ''.join(text + '\n' for text in pages)
+    extracted = time.perf_counter()
+
+    # Normalize Arabic Presentation Forms (U+FE70-U+FEFF) to standard Arabic
+    full_text = normalize_text(full_text)
+
+    data = Transcript()
+
+    lines = split_lines(full_text)
+
+    for i, line in enumerate(lines):
+        # ── English format: value appears on the line BEFORE its label ──
+        # "Student Id :" / "Student Name :" / "Faculty :" / "Major  :" labels
+        if STUDENT_ID_LABEL.match(line) and i > 0:
+            m = STUDENT_ID_VALUE.match(lines[i - 1])
+            if m and not data.student_id:
+                data.student_id = lines[i - 1]
+
+        if STUDENT_NAME_LABEL.match(line) and i > 0:
+            name_val = lines[i - 1]
+            # Accept alphabetic names (English or Arabic)
+            if name_val and NAME_VALUE.match(name_val) and not data.student_name:
+                data.student_name = name_val.strip()
+
+        if FACULTY_LABEL.match(line) and i > 0:
+            fac = lines[i - 1]
+            # Must look like a faculty name, not another label
+            if fac and ':' not in fac and not data.college:
+                data.college = fac.strip()
+
+        # English "Major :" — two layout variants:
+        #   variant A (page 1): value on previous line, then "Major  :"
+        #   variant B (page 2): "Major :" on one line, value on next line
+        if MAJOR_LABEL.match(line):
+            # variant A
+            if i > 0 and not data.department:
+                prev = lines[i - 1]
+                if prev and ':' not in prev and not MAJOR_PREFIX.match(prev) and len(prev) > 2:
+                    data.department = prev.strip()
+            # variant B
+            if not data.department and i + 1 < len(lines):
+                nxt = lines[i + 1]
+                if nxt and ':' not in nxt and not MAJOR_PREFIX.match(nxt) and len(nxt) > 2:
+                    data.department = nxt.strip()
+
+        # English degree: "Degree : Bachelor" on same line
+        if DEGREE_BACHELOR.search(line):
+            data.degree = 'بكالوريوس'
+        elif DEGREE_DIPLOMA.search(line):
+            data.degree = 'دبلوم'
+
+        # ── Arabic format ──
+        if ('الاسم' in line and ':' in line) or 'اسم الطالب' in line:
+            name_match = AR_NAME.search(line)
+            if name_match:
+                name_val = name_match.group(1).strip()
+                if name_val and name_val != 'الاسم' and not data.student_name:
+                    data.student_name = _clean_name(name_val)
+            else:
+                name_match2 = AR_NAME_BEFORE_LABEL.search(line)
+                if name_match2 and not data.student_name:
+                    data.student_name = _clean_name(name_match2.group(1).strip())
+
+        if 'الرقم' in line and ('الأكاديمي' in line or 'الجامعي' in line or 'الطالب' in line or 'رقم' in line):
+            id_match = ID_DIGITS.search(line)
+            if id_match and not data.student_id:
+                data.student_id = id_match.group(1)
+            elif i + 1 < len(lines) and not data.student_id:
+                id_match = ID_DIGITS.search(lines[i + 1])
+                if id_match:
+                    data.student_id = id_match.group(1)
+
+        if 'الكلية' in line and ':' in line:
+            college_match = AR_COLLEGE.search(line)
+            if college_match and not data.college:
+                data.college = college_match.group(1).strip()
+
+        if 'التخصص' in line and ':' in line:
+            dept_match = AR_DEPARTMENT.search(line)
+            if dept_match and not data.department:
+                dept_val = dept_match.group(1).strip()
+                dept_val = TRAILING_ID.sub('', dept_val).strip()
+                if dept_val and dept_val != 'التخصص':
+                    data.department = dept_val
+
+        if 'المعدل التراكمي' in line or 'التراكمي' in line:
+            gpa_match = DECIMAL.search(line)
+            if gpa_match:
+                data.gpa = float(gpa_match.group(1))
+
+        if 'بكالوريوس' in line or 'البكالوريوس' in line:
+            data.degree = 'بكالوريوس'
+        elif 'دبلوم متوسط' in line:
+            data.degree = 'دبلوم متوسط'
+        elif 'دبلوم مشارك' in line:
+            data.degree = 'دبلوم مشارك'
+
+    # ── Fallback student ID: scan first 30 lines for a 9-digit number ──
+    if not data.student_id:
+        for line in lines[:30]:
+            m = NINE_DIGIT_ID.search(line)
+            if m:
+                data.student_id = m.group(1)
+                break
+
+    # ── Withdrawal count ──
+    # English: standalone 'W' or 'WF' grade line
+    for line in lines:
+        if line in ('W', 'WF'):
+            data.withdrawal_count += 1
+    # Arabic: standalone 'ع' grade line
+    for line in lines:
+        if line == 'ع':
+            data.withdrawal_count += 1
+    # Arabic inline (older format): ع inside a line that has a course code
+    for line in lines:
+        if AR_WITHDRAWAL.search(line) and line != 'ع':
+            if any(char.isdigit() for char in line) and UPPERCASE.search(line):
+                data.withdrawal_count += 1
+                data.withdrawn_courses.append(line.strip())
+
+    # ── Credits info (Arabic format) ──
+    for line in lines:
+        credits_match = CREDITS_PLAN.search(line)
+        if credits_match:
+            data.total_credits_plan = int(credits_match.group(1))
+
+        completed_match = CREDITS_COMPLETED.search(line)
+        if completed_match:
+            data.total_credits_completed = int(completed_match.group(1))
+
+        remaining_match = CREDITS_REMAINING.search(line)
+        if remaining_match:
+            data.remaining_credits = int(remaining_match.group(1))
+
+    # ── Credits completed (English: last AHRS value before AHRS label) ──
+    if data.total_credits_completed == 0:
+        ahrs_indices = [i for i, l in enumerate(lines) if l == 'AHRS']
+        if ahrs_indices:
+            # Values appear before labels; collect decimals just before first AHRS label
+            first_ahrs = ahrs_indices[0]
+            candidates = []
+            for j in range(max(0, first_ahrs - 20), first_ahrs):
+                m = CREDITS_VALUE.match(lines[j])
+                if m:
+                    val = float(m.group(1))
+                    if 5 < val < 300:
+                        candidates.append(val)
+            if candidates:
+                data.total_credits_completed = int(candidates[-1])
+
+    # ── Semester count ──
+    # English: "First Semester 2023/2024", "Second Semester 2023/2024", etc.
+    en_semesters = set(m.group(0).lower() for m in EN_SEMESTER.finditer(full_text))
+
+    # Arabic: "هـ1445 الفصل الأول"
+    ar_semesters = set(m.group(0) for m in AR_SEMESTER.finditer(full_text))
+
+    all_semesters = en_semesters | ar_semesters
+    data.semesters_count = len(all_semesters)
+
+    # Fallback: count generic Arabic semester terms
+    if data.semesters_count == 0:
+        data.semesters_count = len(set(AR_SEMESTER_GENERIC.findall(full_text)))
+
+    # ── First year check ──
+    if data.semesters_count <= 2:
+        data.is_first_year = True
+    if data.student_id and len(data.student_id) >= 3:
+        try:
+            admission_year = int(data.student_id[:2])
+            current_year = 47  # 1447 Hijri
+            if current_year - admission_year <= 1:
+                data.is_first_year = True
+        except ValueError:
+            pass
+
+    # ── Expected graduate check ──
+    if data.remaining_credits > 0 and data.remaining_credits <= EXPECTED_GRADUATE_MAX_CREDITS:
+        data.expected_graduate = True
+
+    # ── GPA extraction ──
+    # Arabic fallback: standalone decimals after تراكمي label
+    if data.gpa == 0.0:
+        gpa_candidates = []
+        in_cumulative = False
+        for line in lines:
+            if 'تراكمي' in line or line == 'Cumulative':
+                in_cumulative = True
+            if in_cumulative:
+                gpa_match = GPA_VALUE.match(line)
+                if gpa_match:
+                    val = float(gpa_match.group(1))
+                    if 0 < val <= 5.0:
+                        gpa_candidates.append(val)
+        if gpa_candidates:
+            data.gpa = gpa_candidates[-1]
+
+    # English fallback: all standalone X.XX decimals between 0.5 and 5.0
+    # (marks are > 5, credit counts are integers or > 5 as floats)
+    if data.gpa == 0.0:
+        gpa_candidates = []
+        for line in lines:
+            m = GPA_SHORT_VALUE.match(line)
+            if m:
+                val = float(m.group(1))
+                if 0.5 <= val <= 5.0:
+                    gpa_candidates.append(val)
+        non_zero = [v for v in gpa_candidates if v > 0]
+        if non_zero:
+            data.gpa = non_zero[-1]
+
+    if not data.degree:
+        data.degree = 'بكالوريوس'
+    data.degree = sys.intern(data.degree)
+
+    # ── Course table and current semester ──
+    layout_courses = extract_courses_from_layout(page_words)
+    data.courses = layout_courses or extract_courses(lines)
+    semester, year = detect_current_semester(lines)
+    data.semester, data.year = sys.intern(semester), sys.intern(year)
+
+    if keep_raw_text:
+        data.raw_text = full_text
+    if stats is not None:
+        stats.update(pages=len(pages), lines=line_count, ocr_pages=ocr_pages, table_layout=bool(layout_courses),
+                     extract_ms=round((extracted - started) * 1000, 2),
+                     parse_ms=round((time.perf_counter() - extracted) * 1000, 2))
+
+    return data
+
+
+def parse_transcript_with_stats(filepath: str, **kwargs) -> Tuple[Transcript, dict]:
+    """parse_transcript() returning (transcript, stats), for callers in another process."""
+    stats = {}
+    return parse_transcript(filepath, stats=stats, **kwargs), stats
@@ -0,0 +1,197 @@
+"""University withdrawal rules applied to a parsed transcript."""
+from .types import Transcript, RuleResult, ValidationResult, WithdrawalHistory
+
+# Maximum number of course withdrawals over the whole programme, by degree
+MAX_WITHDRAWALS = {
+    'بكالوريوس': 6,
+    'دبلوم متوسط': 3,
+    'دبلوم مشارك': 2,
+}
+
+
+def validate_withdrawal(transcript: Transcript, course_code: str, course_name: str, semester: str, year: str,
+                        reason: str, history: WithdrawalHistory = None,
+                        withdrawal_limits: dict = None) -> ValidationResult:
+    """Validate the course withdrawal request against university rules.
+
+    history adds the student's requests on record to what the transcript
+    shows: withdrawals requested this semester are not on the transcript yet.
+    withdrawal_limits replaces MAX_WITHDRAWALS (a college's own limits per degree).
+    """
+    errors = []
+    warnings = []
+    rules_checked = []
+    history_known = history is not None
+    if history is None:
+        history = WithdrawalHistory()
+    limits = MAX_WITHDRAWALS if withdrawal_limits is None else withdrawal_limits
+
+    degree = transcript.degree
+    # Earlier semesters' withdrawals are on the transcript; this semester's are only on record
+    withdrawal_count = max(transcript.withdrawal_count + history.semester_count, history.total)
+    is_first_year = transcript.is_first_year
+    expected_graduate = transcript.expected_graduate
+    remaining_credits = transcript.remaining_credits
+
+    # Rule 1: Max withdrawal limits based on degree
+    if degree == 'بكالوريوس':
+        max_withdrawals = limits[degree]
+        rules_checked.append(RuleResult(
+            rule=f'الحد الأقصى للاعتذار عن مقررات (بكالوريوس - نظام فصلي): {max_withdrawals} مقررات',
+            status='pass' if withdrawal_count < max_withdrawals else 'fail',
+            detail=f'عدد مرات الاعتذار السابقة: {withdrawal_count} من أصل {max_withdrawals}'
+        ))
+        if withdrawal_count >= max_withdrawals:
+            errors.append(f'تجاوزت الحد الأقصى للاعتذار عن المقررات ({max_withdrawals} مقررات للبكالوريوس). عدد مرات الاعتذار السابقة: {withdrawal_count}')
+
+    elif degree == 'دبلوم متوسط':
+        max_withdrawals = limits[degree]
+        rules_checked.append(RuleResult(
+            rule=f'الحد الأقصى للاعتذار عن مقررات (دبلوم متوسط): {max_withdrawals} مقررات',
+            status='pass' if withdrawal_count < max_withdrawals else 'fail',
+            detail=f'عدد مرات الاعتذار السابقة: {withdrawal_count} من أصل {max_withdrawals}'
+        ))
+        if withdrawal_count >= max_withdrawals:
+            errors.append(f'تجاوزت الحد الأقصى للاعتذار عن المقررات ({max_withdrawals} مقررات للدبلوم المتوسط). عدد مرات الاعتذار السابقة: {withdrawal_count}')
+
+    elif degree == 'دبلوم مشارك':
+        max_withdrawals = limits[degree]
+        rules_checked.append(RuleResult(
+            rule=f'الحد الأقصى للاعتذار عن مقررات (دبلوم مشارك): {max_withdrawals} مقررات',
+            status='pass' if withdrawal_count < max_withdrawals else 'fail',
+            detail=f'عدد مرات الاعتذار السابقة: {withdrawal_count} من أصل {max_withdrawals}'
+        ))
+        if withdrawal_count >= max_withdrawals:
+            errors.append(f'تجاوزت الحد الأقصى للاعتذار عن المقررات ({max_withdrawals} مقررات للدبلوم المشارك). عدد مرات الاعتذار السابقة: {withdrawal_count}')
+
+    # Rule 2: Cannot be from first year courses
+    if is_first_year:
+        rules_checked.append(RuleResult(
+            rule='ألا يكون المقرر من مقررات السنة الدراسية الأولى',
+            status='fail',
+            detail='الطالب في السنة الأولى - لا يسمح بالاعتذار عن مقررات السنة الأولى'
+        ))
+        errors.append('لا يسمح بالاعتذار عن مقررات السنة الدراسية الأولى')
+    else:
+        rules_checked.append(RuleResult(
+            rule='ألا يكون المقرر من مقررات السنة الدراسية الأولى',
+            status='pass',
+            detail='الطالب ليس في السنة الأولى'
+        ))
+
+    # Rule 3: Expected graduates cannot withdraw
+    if expected_graduate:
+        rules_checked.append(RuleResult(
+            rule='لا يسمح للطالب المتوقع تخرجه الانسحاب من أي مقرر',
+            status='fail',
+            detail=f'الطالب متوقع تخرجه (الساعات المتبقية: {remaining_credits})'
+        ))
+        errors.append('لا يسمح للطالب المتوقع تخرجه بالاعتذار عن أي مقرر مسجل في الفصل الدراسي')
+    else:
+        rules_checked.append(RuleResult(
+            rule='لا يسمح للطالب المتوقع تخرجه الانسحاب من أي مقرر',
+            status='pass',
+            detail='الطالب غير متوقع تخرجه'
+        ))
+
+    # Rule 4: Check if course was previously withdrawn
+    withdrawn_courses = transcript.withdrawn_courses
+    previously_withdrawn = course_code in history.courses
+    if course_code and not previously_withdrawn:
+        for wc in withdrawn_courses:
+            if course_code in wc:
+                previously_withdrawn = True
+                break
+
+    if previously_withdrawn:
+        rules_checked.append(RuleResult(
+            rule='ألا يكون المقرر قد سبق الانسحاب منه سابقاً',
+            status='fail',
+            detail=f'المقرر {course_code} تم الاعتذار عنه مسبقاً'
+        ))
+        errors.append(f'المقرر {course_code} سبق الاعتذار عنه سابقاً')
+    else:
+        rules_checked.append(RuleResult(
+            rule='ألا يكون المقرر قد سبق الانسحاب منه سابقاً',
+            status='pass',
+            detail='لم يتم الاعتذار عن هذا المقرر مسبقاً'
+        ))
+
+    # Rule 5: Summer semester check
+    if semester and 'صيفي' in semester:
+        rules_checked.append(RuleResult(
+            rule='ألا يكون المقرر مسجلاً في الفصل الصيفي',
+            status='fail',
+            detail='لا يسمح بالاعتذار عن مقررات الفصل الصيفي'
+        ))
+        errors.append('لا يسمح بالاعتذار عن مقرر مسجل في الفصل الصيفي')
+    else:
+        rules_checked.append(RuleResult(
+            rule='ألا يكون المقرر مسجلاً في الفصل الصيفي',
+            status='pass',
+            detail='المقرر ليس في الفصل الصيفي'
+        ))
+
+    # Rule 6: Remaining time must be sufficient
+    rules_checked.append(RuleResult(
+        rule='أن تكون المدة النظامية المتبقية كافية لإنهاء متطلبات التخرج',
+        status='warning',
+        detail='يرجى التأكد من أن المدة النظامية المتبقية كافية لإنهاء متطلبات التخرج'
+    ))
+    warnings.append('يرجى التأكد من أن المدة النظامية المتبقية كافية لإنهاء متطلبات التخرج')
+
+    # Rule 7: Only 1 course per semester (needs the requests on record)
+    if not history_known:
+        rules_checked.append(RuleResult(
+            rule='يسمح بالانسحاب من مقرر واحد فقط خلال الفصل الدراسي',
+            status='warning',
+            detail='تأكد من عدم تقديم طلب اعتذار آخر في نفس الفصل'
+        ))
+    elif history.semester_count:
+        rules_checked.append(RuleResult(
+            rule='يسمح بالانسحاب من مقرر واحد فقط خلال الفصل الدراسي',
+            status='fail',
+            detail='يوجد طلب اعتذار آخر معتمد أو قيد المراجعة في نفس الفصل'
+        ))
+        errors.append('يسمح بالانسحاب من مقرر واحد فقط خلال الفصل الدراسي، ويوجد طلب اعتذار آخر في نفس الفصل')
+    else:
+        rules_checked.append(RuleResult(
+            rule='يسمح بالانسحاب من مقرر واحد فقط خلال الفصل الدراسي',
+            status='pass',
+            detail='لا يوجد طلب اعتذار آخر في نفس الفصل'
+        ))
+
+    # Rule 8: Must not be only registered course
+    rules_checked.append(RuleResult(
+        rule='ألا يكون المقرر الوحيد المسجل للطالب',
+        status='warning',
+        detail='تأكد من وجود مقررات أخرى مسجلة في الفصل الدراسي'
+    ))
+
+    # Rule 9: Co-requisite check
+    rules_checked.append(RuleResult(
+        rule='ألا يكون المقرر متزامناً مع مقرر آخر',
+        status='warning',
+        detail='تأكد من أن المقرر ليس متطلباً متزامناً مع مقرر آخر مسجل'
+    ))
+
+    is_eligible = len(errors) == 0
+
+    return {
+        'eligible': is_eligible,
+        'errors': errors,
+        'warnings': warnings,
+        'rules_checked': rules_checked,
+        'transcript_data': {
+            'student_name': transcript.student_name,
+            'student_id': transcript.student_id,
+            'major': transcript.department,
+            'department': transcript.department,
+            'degree': transcript.degree,
+            'gpa': transcript.gpa,
+            'withdrawal_count': withdrawal_count,
+            'remaining_credits': remaining_credits,
+            'is_first_year': is_first_year,
+            'expected_graduate': expected_graduate
+        }
+    }
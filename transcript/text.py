@@ -0,0 +1,76 @@
+"""Text normalization and the compiled patterns used to read transcripts.
+
+Every pattern the parser applies per line is compiled once here instead of
+going through re's internal cache lookup on each call.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+# ── Name cleanup ──
+DOUBLED_BIN = re.compile(r'\b(بن|ابن)\s+\1\b')
+MULTI_SPACE = re.compile(r'\s{2,}')
+
+# ── English labels (value appears on the line before the label) ──
+STUDENT_ID_LABEL = re.compile(r'^Student\s+Id\s*:')
+STUDENT_ID_VALUE = re.compile(r'^\d{7,10}$')
+STUDENT_NAME_LABEL = re.compile(r'^Student\s+Name\s*:')
+NAME_VALUE = re.compile(r'^[A-Za-z\u0600-\u06FF\s]+$')
+FACULTY_LABEL = re.compile(r'^Faculty\s*:')
+MAJOR_LABEL = re.compile(r'^Major\s*:')
+MAJOR_PREFIX = re.compile(r'^Major')
+DEGREE_BACHELOR = re.compile(r'Degree\s*:\s*Bachelor', re.IGNORECASE)
+DEGREE_DIPLOMA = re.compile(r'Degree\s*:\s*Diploma', re.IGNORECASE)
+
+# ── Arabic labels ──
+AR_NAME = re.compile(r'(?:الاسم|اسم الطالب|اسم الطالبة)\s*:\s*(.+)')
+AR_NAME_BEFORE_LABEL = re.compile(r'^(.+?):\s*(?:الاسم|اسم الطالب)')
+AR_COLLEGE = re.compile(r'الكلية\s*:\s*(.+)')
+AR_DEPARTMENT = re.compile(r'التخصص\s*:\s*(.+)')
+TRAILING_ID = re.compile(r'\d{7,}.*')
+ID_DIGITS = re.compile(r'(\d{7,10})')
+NINE_DIGIT_ID = re.compile(r'\b(\d{9})\b')
+DECIMAL = re.compile(r'(\d+\.\d+)')
+
+# ── Withdrawals and credits ──
+AR_WITHDRAWAL = re.compile(r'\bع\b')
+UPPERCASE = re.compile(r'[A-Z]')
+CREDITS_PLAN = re.compile(r'(?:مجموع الساعات|إجمالي الساعات|ساعات الخطة)[:\s]*(\d+)')
+CREDITS_COMPLETED = re.compile(r'(?:الساعات المكتسبة|الساعات المجتازة|مكتسبة)[:\s]*(\d+)')
+CREDITS_REMAINING = re.compile(r'(?:الساعات المتبقية)[:\s]*(\d+)')
+CREDITS_VALUE = re.compile(r'^(\d{1,3}\.\d{2})$')
+GPA_VALUE = re.compile(r'^(\d+\.\d{2})$')
+GPA_SHORT_VALUE = re.compile(r'^(\d\.\d{2})$')
+
+# ── Semesters ──
+EN_SEMESTER = re.compile(r'(First|Second|Summer)\s+Semester\s+(\d{4}/\d{4})', re.IGNORECASE)
+AR_SEMESTER = re.compile(r'هـ(\d{4}(?:/\d{4})?)\s+الفصل\s+(الأول|الثاني|الصيفي)')
+AR_SEMESTER_GENERIC = re.compile(r'(?:الفصل الأول|الفصل الثاني|الفصل الصيفي)')
+
+# ── Course table ──
+COURSE_CODE = re.compile(r'^[A-Z]{2,5}\s+\d{3,4}$')
+# English grades: A+ A B+ B C+ C D E W WF IP
+# Arabic grades:  أ ب ج د هـ ع  (with optional leading +)
+GRADE = re.compile(r'^([A-E][+-]?|W[F]?|IP|\+?[أبجد]|هـ|ع)$')
+INTEGER = re.compile(r'^\d+$')
+ARABIC_CHAR = re.compile(r'[\u0600-\u06FF]')
+LATIN_START = re.compile(r'^[A-Za-z]')
+
+
+@lru_cache(maxsize=4096)
+def normalize_line(line):
+    """NFKC-normalize one line; labels and headers repeat across transcripts."""
+    return unicodedata.normalize('NFKC', line)
+
+
+def normalize_text(text):
+    """Normalize Arabic Presentation Forms (U+FB50-U+FEFF) to standard Arabic.
+
+    Equivalent to unicodedata.normalize('NFKC', text). Text without
+    presentation forms passes the quick check and is returned as is (the
+    check stops at the first presentation-form code point); otherwise lines
+    are normalized through a memo.
+    """
+    if unicodedata.is_normalized('NFKC', text):
+        return text
+    return '\n'.join(map(normalize_line, text.split('\n')))
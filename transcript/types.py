@@ -0,0 +1,75 @@
+"""Result types of the transcript parser and validator.
+
+Parsed transcripts are cached for many students at once, so these are
+slotted dataclasses and the short repeated values (grades, course codes,
+semester names, degrees) are interned by the parser.
+"""
+from dataclasses import dataclass, field, asdict
+from typing import List, Optional, TypedDict
+
+
+@dataclass(slots=True)
+class Course:
+    code: str
+    name: str
+    grade: str
+    current: bool  # no grade yet: enrolled this semester
+
+    def to_dict(self):
+        return {'code': self.code, 'name': self.name, 'grade': self.grade, 'current': self.current}
+
+
+@dataclass(slots=True)
+class Transcript:
+    """Student fields, course list and current semester of one transcript PDF."""
+    student_name: str = ''
+    student_id: str = ''
+    college: str = ''
+    department: str = ''
+    degree: str = ''
+    gpa: float = 0.0
+    total_credits_completed: int = 0
+    total_credits_plan: int = 0
+    remaining_credits: int = 0
+    withdrawal_count: int = 0
+    withdrawn_courses: List[str] = field(default_factory=list)
+    semesters_count: int = 0
+    is_first_year: bool = False
+    expected_graduate: bool = False
+    courses: List[Course] = field(default_factory=list)
+    semester: str = ''  # Arabic semester name, e.g. 'الثاني'
+    year: str = ''  # e.g. '2025/2026'
+    raw_text: Optional[str] = None  # None when parsed with keep_raw_text=False
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class WithdrawalHistory:
+    """A student's withdrawal requests already on record (from the database).
+
+    Only requests that count as withdrawals are included: approved ones and
+    pending ones that passed validation.
+    """
+    total: int = 0
+    courses: frozenset = frozenset()  # course codes with a withdrawal on record
+    semester_count: int = 0  # withdrawals in the semester being requested
+
+
+@dataclass(slots=True)
+class RuleResult:
+    rule: str
+    status: str  # pass / fail / warning
+    detail: str
+
+    def to_dict(self):
+        return {'rule': self.rule, 'status': self.status, 'detail': self.detail}
+
+
+class ValidationResult(TypedDict):
+    eligible: bool
+    errors: List[str]
+    warnings: List[str]
+    rules_checked: List[RuleResult]
+    transcript_data: dict